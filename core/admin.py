@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Asset, Price
+from .models import Asset, Price, PriceObservation, ScheduledJob, SourceCircuit
 
 @admin.register(Asset)
 class AssetAdmin(admin.ModelAdmin):
@@ -28,6 +28,29 @@ class AssetAdmin(admin.ModelAdmin):
 
 @admin.register(Price)
 class PriceAdmin(admin.ModelAdmin):
-    list_display = ("asset", "date", "price_mru")
-    list_filter = ("asset",)
+    list_display = ("asset", "date", "price_mru", "source")
+    list_filter = ("asset", "source")
     date_hierarchy = "date"
+    ordering = ("-date",)
+
+
+@admin.register(PriceObservation)
+class PriceObservationAdmin(admin.ModelAdmin):
+    list_display = ("asset", "date", "source", "price_mru", "updated_at")
+    list_filter = ("asset", "source")
+    date_hierarchy = "date"
+    ordering = ("-date",)
+
+
+@admin.register(SourceCircuit)
+class SourceCircuitAdmin(admin.ModelAdmin):
+    list_display = ("source", "state", "failures", "retry_at", "updated_at")
+    list_filter = ("state",)
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    list_display = ("name", "schedule", "status", "last_slot", "finished_at", "duration", "run_count")
+    list_filter = ("status",)
+    readonly_fields = ("last_slot", "started_at", "finished_at", "duration", "error", "run_count", "updated_at")
@@ -0,0 +1,74 @@
+"""
+Requêtes concurrentes depuis les vues asynchrones
+
+L'ORM asynchrone de Django (aget, afirst, async for) exécute toutes les
+requêtes d'une vue dans un même thread: lancées avec asyncio.gather, elles
+resteraient sérialisées. Les blocs indépendants (un par actif, ou une série
+et ses indicateurs) sont donc exécutés chacun dans un thread du pool
+d'exécution, avec sa propre connexion, recyclée après le bloc
+(db.recycling_connections). Les variables de contexte (lectures sur
+réplica) suivent chaque bloc.
+
+Le nombre de blocs en cours est borné par processus, toutes requêtes
+confondues (ASYNC_QUERY_CONCURRENCY, défaut: la moitié du pool PostgreSQL),
+pour laisser au pool les connexions des requêtes elles-mêmes: des clients
+concurrents attendent leur tour au lieu d'épuiser le pool (PoolTimeout).
+
+ASYNC_PARALLEL_QUERIES=0 les exécute à la suite dans le thread de l'ORM
+(utilisé par check_query_budget pour capturer toutes les requêtes).
+"""
+import asyncio
+import os
+import weakref
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .db import recycling_connections
+
+PARALLEL = os.getenv("ASYNC_PARALLEL_QUERIES", "1") == "1"
+
+
+def _default_concurrency():
+    pool = settings.DATABASES["default"].get("OPTIONS", {}).get("pool")
+    if isinstance(pool, dict) and pool.get("max_size"):
+        return max(1, pool["max_size"] // 2)
+    return 4
+
+
+CONCURRENCY = int(os.getenv("ASYNC_QUERY_CONCURRENCY", 0)) or _default_concurrency()
+
+# Un sémaphore par boucle d'événements (une seule sous uvicorn)
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(CONCURRENCY)
+    return semaphore
+
+
+async def _run_in_thread(func):
+    async with _semaphore():
+        return await sync_to_async(recycling_connections(func), thread_sensitive=False)()
+
+
+async def gather_calls(*funcs):
+    """
+    Exécute des fonctions synchrones sans argument en parallèle (au plus
+    CONCURRENCY à la fois dans le processus)
+
+    Returns:
+        list: résultats dans l'ordre des fonctions
+    """
+    if not PARALLEL:
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(_run_in_thread(func) for func in funcs))
+
+
+async def gather_map(func, items):
+    """func(item) pour chaque item, en parallèle (résultats dans l'ordre)"""
+    return await gather_calls(*(partial(func, item) for item in items))
@@ -0,0 +1,77 @@
+"""
+Connexions PostgreSQL: état du pool / des connexions persistantes
+
+- pool_stats: statistiques du pool psycopg3 (POSTGRES_POOL=1) ou réglages
+  des connexions persistantes (CONN_MAX_AGE)
+- ping: latence d'un aller-retour SQL
+- releasing_connections: rend les connexions d'un thread worker en fin de
+  tâche (sinon elles restent empruntées au pool jusqu'à la fin du thread)
+- recycling_connections: idem pour les threads réutilisés des vues async,
+  comme en fin de requête (rendues au pool, ou gardées jusqu'à CONN_MAX_AGE)
+- direct_connection_params: paramètres psycopg d'une connexion dédiée, hors
+  Django (LISTEN, verrou consultatif de session)
+"""
+import functools
+import time
+
+from django.db import close_old_connections, connections
+
+
+def pool_stats(alias="default"):
+    """
+    État des connexions d'une base
+
+    Returns:
+        dict: {"mode": "pool"|"persistent"|"none", ...} (statistiques
+              psycopg_pool en mode pool)
+    """
+    wrapper = connections[alias]
+    pool = getattr(wrapper, "pool", None) if wrapper.vendor == "postgresql" else None
+    if pool is None:
+        max_age = wrapper.settings_dict.get("CONN_MAX_AGE") or 0
+        return {
+            "mode": "persistent" if max_age else "none",
+            "conn_max_age": max_age,
+            "health_checks": wrapper.settings_dict.get("CONN_HEALTH_CHECKS", False),
+        }
+    return dict(pool.get_stats(), mode="pool", name=pool.name)
+
+
+def ping(alias="default"):
+    """Latence (ms) d'un SELECT 1"""
+    started = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return (time.perf_counter() - started) * 1000
+
+
+def releasing_connections(func):
+    """Ferme (ou rend au pool) les connexions du thread courant après func"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return wrapper
+
+
+def recycling_connections(func):
+    """Recycle les connexions du thread courant après func (fin de requête)"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def direct_connection_params(alias="default"):
+    """Paramètres de psycopg.connect / AsyncConnection.connect pour une base"""
+    params = connections[alias].get_connection_params()
+    # Classe de curseur et adaptateurs propres aux connexions de Django
+    params.pop("cursor_factory", None)
+    params.pop("context", None)
+    return params
@@ -0,0 +1,151 @@
+"""
+Diffusion en direct des nouveaux prix (Server-Sent Events)
+
+Côté écriture, notify_prices publie un événement par actif touché
+(pg_notify sur le canal price_events) dans la transaction d'écriture:
+PostgreSQL ne le délivre qu'au commit, jamais pour une écriture annulée.
+
+Côté web, chaque processus ouvre une seule connexion LISTEN (psycopg
+asynchrone) dès le premier client SSE et la referme après le dernier;
+PriceEventHub redistribue chaque notification aux files des clients
+connectés. Un client trop lent perd les événements les plus anciens.
+"""
+import asyncio
+import json
+import logging
+import os
+
+import psycopg
+from django.db import connection
+from django.db.models import Q
+
+from .db import direct_connection_params
+from .models import Price
+from .registry import AssetRegistry
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "price_events"
+HEARTBEAT_INTERVAL = int(os.getenv("SSE_HEARTBEAT_INTERVAL", 15))
+# Délai de reconnexion conseillé aux navigateurs (EventSource)
+RETRY_MS = 5000
+
+
+def notify_prices(prices):
+    """
+    Publie les nouveaux prix (à appeler dans la transaction d'écriture)
+
+    Un événement par actif: son prix le plus récent parmi ceux écrits, avec
+    la variation (%) par rapport au prix précédent en base.
+
+    Args:
+        prices: {(asset_id, date): price_mru}
+    """
+    if connection.vendor != "postgresql" or not prices:
+        return
+
+    latest = {}
+    for (asset_id, day), price in prices.items():
+        if asset_id not in latest or day > latest[asset_id][0]:
+            latest[asset_id] = (day, price)
+
+    condition = Q()
+    for asset_id, (day, _) in latest.items():
+        condition |= Q(asset_id=asset_id, date__lt=day)
+    previous = dict(
+        Price.objects.filter(condition)
+        .order_by("asset_id", "-date")
+        .distinct("asset_id")
+        .values_list("asset_id", "price_mru")
+    )
+
+    payloads = []
+    for asset_id, (day, price) in latest.items():
+        before = previous.get(asset_id)
+        payloads.append(json.dumps({
+            "asset": AssetRegistry.get_by_id(asset_id).code,
+            "date": day.isoformat(),
+            "price": float(price),
+            "variation": round((float(price) - float(before)) / float(before) * 100, 4) if before else None,
+        }))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+            [CHANNEL, payloads],
+        )
+
+
+class PriceEventHub:
+    """Clients SSE du processus et connexion LISTEN partagée"""
+
+    QUEUE_SIZE = 100
+    MAX_RETRY_DELAY = 30
+
+    def __init__(self):
+        self._queues = set()
+        self._task = None
+
+    def subscribe(self):
+        """File d'événements d'un nouveau client (démarre l'écoute si besoin)"""
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._queues.add(queue)
+        if connection.vendor != "postgresql":
+            return queue
+        task = self._task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._task = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue):
+        """Retire un client (ferme la connexion LISTEN après le dernier)"""
+        self._queues.discard(queue)
+        if not self._queues and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, payload):
+        """Distribue une notification à tous les clients"""
+        for queue in list(self._queues):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    async def _listen(self):
+        params = direct_connection_params()
+        delay = 1
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(autocommit=True, **params) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    logger.info(f"📡 Écoute de {CHANNEL} ({len(self._queues)} client(s))")
+                    delay = 1
+                    async for notify in conn.notifies():
+                        self.publish(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Écoute {CHANNEL} interrompue: {e} (reconnexion dans {delay}s)")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.MAX_RETRY_DELAY)
+
+
+hub = PriceEventHub()
+
+
+async def event_stream():
+    """
+    Flux text/event-stream d'un client: événements `price` (JSON
+    {asset, date, price, variation}) et commentaires de maintien en vie
+    """
+    queue = hub.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: price\ndata: {payload}\n\n"
+    finally:
+        hub.unsubscribe(queue)
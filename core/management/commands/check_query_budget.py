@@ -0,0 +1,149 @@
+"""
+Management command: python manage.py check_query_budget
+Vérifie le nombre de requêtes SQL des vues et l'usage des index (EXPLAIN)
+"""
+import json
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from core import aio, views
+from core.models import Asset, Price
+from core.registry import AssetRegistry
+
+
+# Budget de requêtes par vue: base + par_actif × nombre d'actifs
+# Nombres mesurés (registre des actifs chargé, cotation MRU), cas le plus
+# coûteux: sans prix du jour, l'accueil lit aussi le dernier prix connu.
+# Vérifiés à l'égalité par core/tests.py (QueryBudgetTests).
+QUERY_BUDGETS = {
+    # Prix du jour, dernier prix, veille, J-7
+    "home": {"view": views.home, "path": "/", "base": 0, "per_asset": 4},
+    # Prix du jour, historique, 2 derniers prix, veille, 7 jours, barre intrajournalière
+    "asset_detail": {"view": views.asset_detail, "path": "/asset/{code}/", "base": 6, "per_asset": 0},
+    # Agrégats mensuels en une requête
+    "asset_export": {"view": views.asset_export, "path": "/asset/{code}/export/?days=3650", "base": 1, "per_asset": 0},
+    # Série de chaque actif
+    "comparison_view": {"view": views.comparison_view, "path": "/comparison/", "base": 0, "per_asset": 1},
+    "prediction_view": {"view": views.prediction_view, "path": "/prediction/?asset={code}", "base": 1, "per_asset": 0},
+}
+
+
+class Command(BaseCommand):
+    help = "Vérifie les budgets de requêtes SQL et l'usage des index des vues"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--view',
+            action='append',
+            choices=list(QUERY_BUDGETS),
+            help='Vue à vérifier (répétable, défaut: toutes)',
+        )
+        parser.add_argument(
+            '--asset',
+            default=None,
+            help='Actif utilisé pour asset_detail / prediction_view (défaut: premier actif)',
+        )
+        parser.add_argument(
+            '--no-explain',
+            action='store_true',
+            help='Ne pas vérifier les plans d\'exécution',
+        )
+        parser.add_argument(
+            '--verbose-sql',
+            action='store_true',
+            help='Afficher les requêtes capturées',
+        )
+
+    def handle(self, *args, **options):
+        asset = (
+            Asset.objects.filter(code=options['asset']).first()
+            if options['asset'] else Asset.objects.order_by('code').first()
+        )
+        if asset is None:
+            raise CommandError("Aucun actif en base: lancer init_data d'abord")
+
+        n_assets = Asset.objects.count()
+        explain = not options['no_explain'] and connection.vendor == "postgresql"
+        factory = RequestFactory()
+        failures = []
+        # Vues async: blocs exécutés à la suite sur la connexion capturée
+        aio.PARALLEL = False
+        # Registre des actifs chargé d'avance: hors budget des vues
+        AssetRegistry.all()
+
+        for name in options['view'] or list(QUERY_BUDGETS):
+            spec = QUERY_BUDGETS[name]
+            budget = spec["base"] + spec["per_asset"] * n_assets
+            path = spec["path"].format(code=asset.code)
+            request = factory.get(path)
+            kwargs = {"code": asset.code} if "{code}/" in spec["path"] else {}
+
+            # Les vues peuvent écrire (prix du jour): tout est annulé
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    response = _call_view(spec["view"], request, kwargs)
+                queries = [q["sql"] for q in ctx.captured_queries]
+                seq_scans = self.seq_scans(queries) if explain else []
+                transaction.set_rollback(True)
+
+            count = len(queries)
+            status = self.style.SUCCESS("✅") if count <= budget else self.style.ERROR("❌")
+            self.stdout.write(
+                f"{status} {name}: {count}/{budget} requêtes (HTTP {response.status_code})"
+            )
+            if options['verbose_sql']:
+                for sql in queries:
+                    self.stdout.write(f"      {sql[:200]}")
+            if count > budget:
+                failures.append(f"{name}: {count} requêtes > budget {budget}")
+            for sql in seq_scans:
+                self.stdout.write(self.style.ERROR(f"   ⚠️  Seq Scan sur {Price._meta.db_table}: {sql[:160]}"))
+                failures.append(f"{name}: seq scan")
+
+        if failures:
+            raise CommandError("Budget dépassé: " + "; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("✅ Tous les budgets sont respectés"))
+
+    @staticmethod
+    def seq_scans(queries):
+        """
+        Requêtes SELECT sur la table des prix qui ne peuvent utiliser aucun index
+
+        Le planner préfère un parcours séquentiel sur une petite table: on le
+        désactive le temps de l'EXPLAIN pour ne signaler que les requêtes sans
+        index utilisable, quelle que soit la volumétrie locale.
+        """
+        table = Price._meta.db_table
+        found = []
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for sql in queries:
+                if not sql.lstrip().upper().startswith("SELECT") or f'"{table}"' not in sql:
+                    continue
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                if _has_seq_scan(plan[0]["Plan"], table):
+                    found.append(sql)
+        return found
+
+
+def _call_view(view, request, kwargs):
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(request, **kwargs)
+    # Rendre les réponses paresseuses pour compter les requêtes des templates
+    if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+        response.render()
+    return response
+
+
+def _has_seq_scan(node, table):
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == table:
+        return True
+    return any(_has_seq_scan(child, table) for child in node.get("Plans", []))
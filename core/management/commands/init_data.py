@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from decimal import Decimal
 from datetime import datetime, timedelta
-from core.models import Asset, Price
+from core.models import Asset, Price, PriceObservation
+from scraper.store import DataStore
 import random
 
 
@@ -88,7 +89,10 @@ class Command(BaseCommand):
             
             # Générer 2 ans de données
             current_price = asset_info['base_price']
-            count = 0
+            rows = []
+            existing = set(
+                PriceObservation.objects.filter(asset=asset, source='init').values_list('date', flat=True)
+            )
             
             for day_offset in range(730):
                 date = two_years_ago + timedelta(days=day_offset)
@@ -101,18 +105,20 @@ class Command(BaseCommand):
                 if current_price < Decimal('0.01'):
                     current_price = asset_info['base_price']
                 
-                # Créer le prix
-                price, price_created = Price.objects.get_or_create(
-                    asset=asset,
-                    date=date,
-                    defaults={'price_mru': current_price}
-                )
-                
-                if price_created:
-                    count += 1
+                if date in existing:
+                    continue
+                rows.append({
+                    'asset_code': asset.code,
+                    'date': date,
+                    'price_mru': current_price,
+                    'source': 'init',
+                })
             
+            # Observations "init": ne remplacent jamais les prix des sources
+            # prioritaires (bcm, yahoo...) dans la série canonique
+            result = DataStore.store_prices_bulk(rows)
             self.stdout.write(
-                self.style.SUCCESS(f'   📊 {count} prix ajoutés (2 ans)')
+                self.style.SUCCESS(f'   📊 {result["stored"]} prix initiaux stockés (2 ans)')
             )
         
         self.stdout.write(self.style.SUCCESS('\n✅ Initialisation complète!'))
@@ -0,0 +1,53 @@
+"""
+Management command: python manage.py manage_price_partitions
+Crée les partitions annuelles futures de core_price et indexe en BRIN les
+années révolues
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import partitions
+
+
+class Command(BaseCommand):
+    help = "Maintenance des partitions annuelles de la table des prix"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years-ahead',
+            type=int,
+            default=1,
+            help='Partitions à créer au-delà de l\'année courante (défaut: 1)',
+        )
+        parser.add_argument(
+            '--no-brin',
+            action='store_true',
+            help='Ne pas créer les index BRIN des années révolues',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Lister les partitions sans rien modifier',
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            raise CommandError(
+                "core_price n'est pas partitionnée (PostgreSQL requis, migration 0008)"
+            )
+
+        if not options['list']:
+            result = partitions.maintain(
+                years_ahead=options['years_ahead'],
+                brin=not options['no_brin'],
+            )
+            for year in result['created']:
+                self.stdout.write(self.style.SUCCESS(f"🆕 Partition {year} créée"))
+            for year in result['brin']:
+                self.stdout.write(self.style.SUCCESS(f"🧱 Index BRIN ajouté sur {year}"))
+            if not result['created'] and not result['brin']:
+                self.stdout.write("✅ Partitions à jour")
+
+        self.stdout.write("\n📦 Partitions:")
+        for year, info in sorted(partitions.list_partitions().items()):
+            brin = " (BRIN)" if info['brin'] else ""
+            self.stdout.write(f"   {info['name']}: ~{info['rows']} lignes{brin}")
@@ -0,0 +1,99 @@
+"""
+Management command: python manage.py migrate_mongo_layout --to bucket
+Recopie les prix MongoDB d'un schéma vers un autre (flat, bucket, timeseries)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from sync.layouts import LAYOUTS, get_layout, month_key
+from sync.mongo_client import MONGO_DB, get_client
+
+
+class Command(BaseCommand):
+    help = "Migre la collection des prix MongoDB vers un autre schéma"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='source',
+            choices=list(LAYOUTS),
+            default='flat',
+            help='Schéma source (défaut: flat)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='target',
+            choices=list(LAYOUTS),
+            required=True,
+            help='Schéma cible',
+        )
+        parser.add_argument(
+            '--batch-months',
+            type=int,
+            default=200,
+            help='Mois (actif, mois) écrits par lot (défaut: 200)',
+        )
+        parser.add_argument(
+            '--drop-source',
+            action='store_true',
+            help='Supprimer la collection source après une migration vérifiée',
+        )
+
+    def handle(self, *args, **options):
+        if options['source'] == options['target']:
+            raise CommandError("Schémas source et cible identiques")
+
+        try:
+            db = get_client()[MONGO_DB]
+        except Exception as e:
+            raise CommandError(f"MongoDB non accessible: {e}")
+
+        source = get_layout(db, options['source'])
+        target = get_layout(db, options['target'])
+        target.ensure()
+
+        self.stdout.write(self.style.SUCCESS("=" * 60))
+        self.stdout.write(self.style.SUCCESS(
+            f"🗂️  Migration MongoDB: {source.NAME} ({source.COLLECTION}) → "
+            f"{target.NAME} ({target.COLLECTION})"
+        ))
+        self.stdout.write(self.style.SUCCESS("=" * 60))
+
+        # Points triés par actif puis date: chaque mois arrive complet
+        cursor = source.collection.aggregate(
+            source.points_pipeline() + [{"$sort": {"asset_code": 1, "date": 1}}],
+            allowDiskUse=True,
+        )
+
+        months = {}
+        current = None
+        read = 0
+        written = 0
+        for point in cursor:
+            read += 1
+            key = (point["asset_code"], month_key(point["date"]))
+            if key != current and len(months) >= options['batch_months']:
+                written += target.replace_months(months)
+                months = {}
+                self.stdout.write(f"   {written} points écrits...")
+            months.setdefault(key, []).append(point)
+            current = key
+        if months:
+            written += target.replace_months(months)
+
+        source_count = source.count()
+        target_count = target.count()
+        self.stdout.write(f"📥 Points lus: {read}")
+        self.stdout.write(f"📤 Points écrits: {written}")
+        self.stdout.write(f"📦 {source.COLLECTION}: {source_count} | {target.COLLECTION}: {target_count}")
+
+        if written != read or target_count != source_count:
+            self.stdout.write(self.style.ERROR("❌ Écart entre source et cible: source conservée"))
+            return
+
+        if options['drop_source']:
+            source.collection.drop()
+            self.stdout.write(self.style.WARNING(f"🗑️  Collection {source.COLLECTION} supprimée"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Migration terminée. Définir MONGO_PRICES_LAYOUT={target.NAME} pour la synchronisation."
+        ))
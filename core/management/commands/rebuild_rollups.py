@@ -0,0 +1,35 @@
+"""
+Management command: python manage.py rebuild_rollups
+Recalcule entièrement les agrégats hebdomadaires et mensuels des prix
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import rollups
+from core.models import Asset
+
+
+class Command(BaseCommand):
+    help = "Recalcule les agrégats semaine / mois (PriceRollup) à partir des prix journaliers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--assets',
+            nargs='+',
+            default=None,
+            help='Codes des actifs à recalculer (défaut: tous)',
+        )
+
+    def handle(self, *args, **options):
+        assets = Asset.objects.order_by('code')
+        if options['assets']:
+            assets = assets.filter(code__in=options['assets'])
+        codes = dict(assets.values_list('id', 'code'))
+        if not codes:
+            raise CommandError("Aucun actif correspondant")
+
+        result = rollups.rebuild(asset_ids=list(codes))
+        for asset_id, periods in result.items():
+            self.stdout.write(self.style.SUCCESS(f"📐 {codes[asset_id]}: {periods} périodes"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(result.values())} périodes recalculées sur {len(result)} actifs"
+        ))
@@ -0,0 +1,274 @@
+"""
+Management command: python manage.py restore_from_mongo
+Restaure les prix PostgreSQL depuis la copie MongoDB (curseurs parallèles)
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import rollups, sources
+from core.models import Asset, PriceObservation
+from core.registry import AssetRegistry
+from sync.layouts import LAYOUTS, get_layout
+from sync.mongo_client import MONGO_DB, get_client
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Restaure les prix PostgreSQL depuis MongoDB (observations COPY + upsert, puis prix canonique)"
+
+    QUANT = Decimal("0.0001")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--assets',
+            nargs='+',
+            default=None,
+            help='Codes des actifs à restaurer (défaut: tous ceux présents dans MongoDB)',
+        )
+        parser.add_argument('--start', type=date.fromisoformat, default=None, help='Date de début (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, default=None, help='Date de fin (YYYY-MM-DD)')
+        parser.add_argument(
+            '--partition',
+            choices=['asset', 'year'],
+            default='asset',
+            help='Découpage des curseurs parallèles (défaut: asset)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Curseurs MongoDB / connexions PostgreSQL en parallèle (défaut: 4)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Lignes par chargement COPY (défaut: 5000)',
+        )
+        parser.add_argument(
+            '--layout',
+            choices=list(LAYOUTS),
+            default=None,
+            help='Schéma MongoDB à lire (défaut: MONGO_PRICES_LAYOUT)',
+        )
+        parser.add_argument(
+            '--source',
+            default='init',
+            help='Source des observations restaurées (défaut: init); le prix canonique suit PRICE_SOURCE_PRIORITY',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les documents sans écrire dans PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            layout = get_layout(get_client()[MONGO_DB], options['layout'])
+        except Exception as e:
+            raise CommandError(f"MongoDB non accessible: {e}")
+
+        start, end = options['start'], options['end']
+        self.source = options['source']
+        self.batch_size = options['batch_size']
+
+        self.stdout.write(self.style.SUCCESS("=" * 60))
+        self.stdout.write(self.style.SUCCESS(
+            f"♻️  Restauration MongoDB ({layout.NAME}) → PostgreSQL"
+        ))
+        self.stdout.write(self.style.SUCCESS("=" * 60))
+
+        # Inventaire par actif: libellés, volumes et bornes de dates
+        inventory = self.inventory(layout, options['assets'], start, end)
+        if not inventory:
+            self.stdout.write(self.style.WARNING("⚠️  Aucun document à restaurer"))
+            return
+
+        asset_ids = self.ensure_assets(inventory)
+        total = sum(info["n"] for info in inventory.values())
+        for code, info in sorted(inventory.items()):
+            self.stdout.write(f"   {code}: {info['n']} documents ({info['first']} → {info['last']})")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"🔍 Dry-run: {total} documents, rien écrit"))
+            return
+
+        partitions = self.partitions(inventory, options['partition'], start, end)
+        workers = max(1, min(options['workers'], len(partitions)))
+        self.stdout.write(f"🧵 {len(partitions)} partitions sur {workers} workers")
+
+        started = time.perf_counter()
+        restored = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.restore_partition, layout, asset_ids, *part): part
+                for part in partitions
+            }
+            for future in as_completed(futures):
+                code, part_start, part_end = futures[future]
+                label = f"{code} {part_start or '…'} → {part_end or '…'}"
+                try:
+                    count = future.result()
+                    restored += count
+                    self.stdout.write(self.style.SUCCESS(f"✅ {label}: {count} prix"))
+                except Exception as e:
+                    failed.append(label)
+                    self.stdout.write(self.style.ERROR(f"❌ {label}: {e}"))
+
+        # Agrégats semaine / mois recalculés une fois, après tous les workers
+        # (les lots ne les rafraîchissent pas: resolve(propagate=False))
+        if restored:
+            rollups.rebuild(asset_ids=[asset_ids[code] for code in inventory])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 {restored}/{total} prix restaurés en {elapsed:.1f}s "
+            f"({restored / elapsed if elapsed else 0:.0f} lignes/s)"
+        ))
+        if failed:
+            raise CommandError(f"{len(failed)} partitions en échec: {', '.join(failed)}")
+
+    def inventory(self, layout, codes, start, end):
+        """Actifs présents dans MongoDB: {code: {label, category, n, first, last}}"""
+        pipeline = layout.points_pipeline(None, start, end)
+        if codes:
+            pipeline.append({"$match": {"asset_code": {"$in": codes}}})
+        pipeline.append({"$group": {
+            "_id": "$asset_code",
+            "label": {"$first": "$asset_label"},
+            "category": {"$first": "$asset_category"},
+            "n": {"$sum": 1},
+            "first": {"$min": "$date"},
+            "last": {"$max": "$date"},
+        }})
+        return {
+            doc["_id"]: doc
+            for doc in layout.collection.aggregate(pipeline, allowDiskUse=True)
+        }
+
+    def ensure_assets(self, inventory):
+        """Crée les actifs absents de PostgreSQL; retourne {code: id}"""
+        existing = dict(
+            Asset.objects.filter(code__in=list(inventory)).values_list("code", "id")
+        )
+        missing = [
+            Asset(
+                code=code,
+                label=info.get("label") or code,
+                category=info.get("category") or "fx",
+            )
+            for code, info in inventory.items() if code not in existing
+        ]
+        if missing:
+            Asset.objects.bulk_create(missing, ignore_conflicts=True)
+            # bulk_create n'émet pas post_save: invalidation explicite du registre
+            AssetRegistry.invalidate()
+            self.stdout.write(self.style.WARNING(
+                f"🆕 Actifs créés: {', '.join(a.code for a in missing)}"
+            ))
+            existing = dict(
+                Asset.objects.filter(code__in=list(inventory)).values_list("code", "id")
+            )
+        return existing
+
+    @staticmethod
+    def partitions(inventory, mode, start, end):
+        """Liste de (code, début, fin) couvrant la plage demandée"""
+        if mode == "asset":
+            return [(code, start, end) for code in sorted(inventory)]
+
+        parts = []
+        for code, info in sorted(inventory.items()):
+            first_year = int(info["first"][:4])
+            last_year = int(info["last"][:4])
+            for year in range(first_year, last_year + 1):
+                part_start = max(start, date(year, 1, 1)) if start else date(year, 1, 1)
+                part_end = min(end, date(year, 12, 31)) if end else date(year, 12, 31)
+                parts.append((code, part_start, part_end))
+        return parts
+
+    def restore_partition(self, layout, asset_ids, code, start, end):
+        """Lit une partition MongoDB et la charge par lots (thread worker)"""
+        asset_id = asset_ids[code]
+        restored = 0
+        batch = []
+        try:
+            cursor = layout.collection.aggregate(
+                layout.points_pipeline(code, start, end),
+                batchSize=self.batch_size,
+                allowDiskUse=True,
+            )
+            for doc in cursor:
+                batch.append((
+                    asset_id,
+                    datetime.strptime(doc["date"], "%Y-%m-%d").date(),
+                    Decimal(str(doc["price_mru"])).quantize(self.QUANT),
+                ))
+                if len(batch) >= self.batch_size:
+                    restored += self.load(batch)
+                    batch = []
+            if batch:
+                restored += self.load(batch)
+            return restored
+        finally:
+            connection.close()
+
+    def load(self, rows):
+        """
+        Charge un lot: COPY dans une table temporaire, INSERT ... ON CONFLICT
+        des observations de la source, puis prix canonique (même transaction)
+        """
+        if connection.vendor != "postgresql":
+            return self.load_bulk(rows)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE restore_prices "
+                "(asset_id bigint, date date, price_mru numeric(14, 4)) ON COMMIT DROP"
+            )
+            with cursor.copy("COPY restore_prices (asset_id, date, price_mru) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+            cursor.execute(
+                f"""
+                INSERT INTO {PriceObservation._meta.db_table}
+                    (asset_id, date, source, price_mru, created_at, updated_at)
+                SELECT DISTINCT ON (asset_id, date)
+                    asset_id, date, %s, price_mru, now(), now()
+                FROM restore_prices
+                ON CONFLICT (asset_id, source, date) DO UPDATE
+                SET price_mru = EXCLUDED.price_mru, updated_at = EXCLUDED.updated_at
+                RETURNING asset_id, date
+                """,
+                [self.source],
+            )
+            keys = cursor.fetchall()
+            # Données venues de Mongo: ni outbox ni notification; agrégats
+            # recalculés une fois en fin de restauration
+            sources.resolve(keys, propagate=False)
+            return len(keys)
+
+    def load_bulk(self, rows):
+        """Repli hors PostgreSQL: upsert des observations via bulk_create"""
+        unique = {(asset_id, day): price for asset_id, day, price in rows}
+        with transaction.atomic():
+            PriceObservation.objects.bulk_create(
+                [
+                    PriceObservation(asset_id=asset_id, date=day, price_mru=price, source=self.source)
+                    for (asset_id, day), price in unique.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["asset", "source", "date"],
+                update_fields=["price_mru", "updated_at"],
+            )
+            sources.resolve(unique, propagate=False)
+        return len(unique)
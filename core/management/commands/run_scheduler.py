@@ -0,0 +1,61 @@
+"""
+Management command: python manage.py run_scheduler
+Planificateur des tâches de fond (cron, gigue, rattrapage, leader unique)
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import ScheduledJob
+from core.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    help = "Planificateur des tâches de fond (un seul leader parmi tous les processus)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Attente max en secondes entre deux tours (défaut: SCHEDULER_POLL_INTERVAL ou 30)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exécuter les tâches échues (si leader) puis quitter',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Lister les tâches, leur prochaine échéance et leur dernier état',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler(poll_interval=options.get('interval'))
+
+        if options['list']:
+            self.list_jobs(scheduler)
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"⏰ Planificateur: {len(scheduler.jobs)} tâches"))
+        try:
+            scheduler.run(once=options.get('once', False))
+        except Exception as e:
+            raise CommandError(f"Planificateur interrompu: {e}")
+        self.stdout.write(self.style.SUCCESS("✅ Planificateur arrêté"))
+
+    def list_jobs(self, scheduler):
+        now = timezone.now()
+        states = {state.name: state for state in ScheduledJob.objects.all()}
+        for job in scheduler.jobs:
+            state = states.get(job.name)
+            next_slot = job.cron.next_after(now)
+            self.stdout.write(f"📋 {job.name} [{job.cron}] → {job.command}")
+            self.stdout.write(f"   prochaine échéance: {next_slot:%Y-%m-%d %H:%M}" if next_slot else "   prochaine échéance: aucune")
+            if state and state.status:
+                self.stdout.write(
+                    f"   dernier état: {state.get_status_display()} "
+                    f"(échéance {state.last_slot:%Y-%m-%d %H:%M}, {state.run_count} exécutions)"
+                )
+                if state.error:
+                    self.stdout.write(self.style.ERROR(f"   erreur: {state.error[:200]}"))
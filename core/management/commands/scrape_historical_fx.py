@@ -3,11 +3,21 @@ Management command: python manage.py scrape_historical_fx
 Récupère l'historique complet 2 ans de l'API BCM
 """
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from functools import partial
 from datetime import datetime, timedelta
 from decimal import Decimal
 import requests
+import json
 import logging
-from core.models import Asset, Price
+import time
+from core.registry import AssetRegistry
+from scraper.cache import cached_get, payload_cache
+from scraper.backfill import BackfillCheckpoint, daterange_chunks
+from scraper.fetchers import FXFetcher
+from scraper.gaps import find_gaps
+from scraper.retry import RetryPolicy, RetryScheduler, RetryTask
+from scraper.store import DataStore
 import urllib3
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -18,6 +28,10 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = "Scrape l'historique 2 ans des devises depuis l'API BCM"
     
+    SOURCE = FXFetcher.SOURCE
+    TIMEOUT = 15
+    RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=2, max_delay=30)
+    
     def add_arguments(self, parser):
         parser.add_argument(
             '--days',
@@ -25,9 +39,41 @@ class Command(BaseCommand):
             default=730,
             help='Nombre de jours à récupérer (défaut: 730 = 2 ans)',
         )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=90,
+            help='Taille des segments demandés à la BCM en jours (défaut: 90)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Nombre de requêtes BCM simultanées (défaut: 4)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Récupérer toute la fenêtre, pas seulement les dates manquantes',
+        )
+        parser.add_argument(
+            '--replay',
+            action='store_true',
+            help='Re-parser les payloads BCM en cache, sans réseau',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignorer les checkpoints et tout re-télécharger',
+        )
     
     def handle(self, *args, **options):
         days = options.get('days', 730)
+        chunk_days = max(1, options.get('chunk_days', 90))
+        workers = max(1, options.get('workers', 4))
+        
+        if options.get('replay'):
+            return self.replay()
         
         self.stdout.write("=" * 70)
         self.stdout.write(self.style.SUCCESS("🚀 Scraping Historique BCM (2 ans)"))
@@ -38,54 +84,103 @@ class Command(BaseCommand):
         start_date = today - timedelta(days=days)
         
         self.stdout.write(f"📅 Période: {start_date} → {today} ({days} jours)")
+        self.stdout.write(f"🧩 Chunks de {chunk_days} jours, {workers} workers")
         self.stdout.write("")
         
-        # Devises à scraper
-        currencies = {
-            "USD": "Dollar US",
-            "EUR": "Euro",
-            "CNY": "Yuan Chinois",
-        }
+        # Devises à scraper (déclarées par le fetcher BCM)
+        currencies = FXFetcher.CURRENCIES
         
         total_stored = 0
         total_failed = 0
         
+        # Intervalles manquants par devise (une seule requête sur Price)
+        if options.get('full'):
+            gaps = {code: [(start_date, today)] for code in currencies}
+        else:
+            gaps = find_gaps(self.SOURCE, list(currencies), start_date, today)
+        
+        # Préparer les chunks restants par devise (reprise sur checkpoints)
+        pending = []
         for currency_code, currency_label in currencies.items():
-            self.stdout.write(f"\n📌 Scraping {currency_code} ({currency_label})...")
-            
-            try:
-                prices_data = self.fetch_historical_prices(
-                    currency_code,
-                    start_date,
-                    today
-                )
-                
-                if not prices_data:
-                    self.stdout.write(
-                        self.style.WARNING(f"⚠️  Aucune donnée pour {currency_code}")
-                    )
-                    total_failed += len(prices_data) if prices_data else 1
-                    continue
-                
-                # Stocker les prix
-                stored, failed = self.store_prices(currency_code, prices_data)
-                
+            asset = AssetRegistry.get(currency_code)
+            if asset is None:
                 self.stdout.write(
-                    self.style.SUCCESS(f"✅ {currency_code}: {stored} prix stockés")
+                    self.style.ERROR(f"❌ Actif {currency_code} introuvable")
+                )
+                total_failed += 1
+                continue
+            
+            if options.get('restart'):
+                BackfillCheckpoint.reset(self.SOURCE, asset)
+            
+            chunks = [
+                chunk
+                for gap_start, gap_end in gaps.get(currency_code, [])
+                for chunk in daterange_chunks(gap_start, gap_end, chunk_days)
+            ]
+            done = BackfillCheckpoint.completed_ranges(self.SOURCE, asset)
+            todo = [c for c in chunks if not BackfillCheckpoint.is_covered(*c, done)]
+            
+            self.stdout.write(
+                f"📌 {currency_code} ({currency_label}): "
+                f"{len(todo)}/{len(chunks)} chunks à récupérer"
+            )
+            pending.extend((asset, chunk_start, chunk_end) for chunk_start, chunk_end in todo)
+        
+        # Récupération concurrente (réseau uniquement), stockage dans le thread
+        # principal; les chunks en échec sont replanifiés (backoff + jitter)
+        # et le circuit "bcm" coupe les appels si la BCM est indisponible
+        tasks = [
+            RetryTask(
+                (asset, chunk_start, chunk_end),
+                partial(self.fetch_historical_prices, asset.code, chunk_start, chunk_end),
+                circuit=self.SOURCE,
+                # Un chunk vide (jours fériés) est une réponse valide
+                is_valid=lambda data: data is not None,
+            )
+            for asset, chunk_start, chunk_end in pending
+        ]
+        totals = {"stored": 0, "failed": total_failed}
+        
+        def store(task):
+            asset, chunk_start, chunk_end = task.key
+            label = f"{asset.code} {chunk_start} → {chunk_end}"
+            
+            if task.status != "success":
+                self.stdout.write(self.style.ERROR(f"❌ Erreur {label}: {task.error}"))
+                BackfillCheckpoint.mark_failed(
+                    self.SOURCE, asset, chunk_start, chunk_end, task.error
                 )
-                if failed > 0:
-                    self.stdout.write(
-                        self.style.WARNING(f"⚠️  {failed} prix échoués")
+                totals["failed"] += 1
+                return
+            
+            try:
+                # Stockage + checkpoint atomiques: un chunk est soit
+                # entièrement enregistré, soit retenté au prochain run
+                with transaction.atomic():
+                    stored, failed = self.store_prices(asset.code, task.result)
+                    BackfillCheckpoint.mark_done(
+                        self.SOURCE, asset, chunk_start, chunk_end, stored
                     )
-                
-                total_stored += stored
-                total_failed += failed
-                
             except Exception as e:
+                self.stdout.write(self.style.ERROR(f"❌ Erreur stockage {label}: {e}"))
+                totals["failed"] += 1
+                return
+            
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ {label}: {stored} prix stockés")
+            )
+            if failed > 0:
                 self.stdout.write(
-                    self.style.ERROR(f"❌ Erreur {currency_code}: {e}")
+                    self.style.WARNING(f"⚠️  {failed} prix échoués")
                 )
-                total_failed += 1
+            
+            totals["stored"] += stored
+            totals["failed"] += failed
+        
+        RetryScheduler(self.RETRY_POLICY, max_workers=workers).run(tasks, on_result=store)
+        total_stored = totals["stored"]
+        total_failed = totals["failed"]
         
         # Résumé final
         self.stdout.write("\n" + "=" * 70)
@@ -96,6 +191,36 @@ class Command(BaseCommand):
         self.stdout.write(f"📊 Total: {total_stored + total_failed}")
         self.stdout.write("=" * 70)
     
+    def replay(self):
+        """Re-parse et re-stocke tous les payloads BCM en cache (hors ligne)"""
+        payload_cache.replay = True
+        entries = payload_cache.entries("bcm")
+        
+        self.stdout.write("=" * 70)
+        self.stdout.write(self.style.SUCCESS(f"💾 Replay BCM: {len(entries)} payloads en cache"))
+        self.stdout.write("=" * 70)
+        
+        total_stored = 0
+        total_failed = 0
+        started = time.perf_counter()
+        
+        for entry in entries:
+            currency_code = entry["request"]["params"].get("currency")
+            try:
+                data = json.loads(payload_cache.read(entry))
+                stored, failed = self.store_prices(currency_code, data)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"❌ Payload {entry['digest'][:12]}: {e}"))
+                total_failed += 1
+                continue
+            total_stored += stored
+            total_failed += failed
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"✅ Stockés: {total_stored}")
+        self.stdout.write(f"❌ Échoués: {total_failed}")
+        self.stdout.write(f"⏱️  Durée: {elapsed:.2f}s")
+    
     def fetch_historical_prices(self, currency_code, start_date, end_date):
         """
         Récupère les prix historiques depuis l'API BCM
@@ -108,7 +233,7 @@ class Command(BaseCommand):
         Returns:
             list: [{'date': date, 'taux': float}, ...]
         """
-        url = "https://connect.bcm.mr/api/cours_change_reference"
+        url = FXFetcher.BASE_URL
         
         params = {
             "from": start_date.isoformat(),
@@ -119,13 +244,13 @@ class Command(BaseCommand):
         logger.info(f"🔍 Requête: {url} {params}")
         
         try:
-            response = requests.get(
+            response = cached_get(
+                "bcm",
                 url,
                 params=params,
-                timeout=15,
+                timeout=self.TIMEOUT,
                 verify=False
             )
-            response.raise_for_status()
             
             data = response.json()
             
@@ -158,12 +283,12 @@ class Command(BaseCommand):
         Returns:
             tuple: (stored_count, failed_count)
         """
-        try:
-            asset = Asset.objects.get(code=currency_code)
-        except Asset.DoesNotExist:
+        asset = AssetRegistry.get(currency_code)
+        if asset is None:
             logger.error(f"Actif {currency_code} introuvable")
             return 0, len(prices_data)
         
+        rows = []
         stored = 0
         failed = 0
         
@@ -203,21 +328,21 @@ class Command(BaseCommand):
                     failed += 1
                     continue
                 
-                # Upsert
-                price, created = Price.objects.update_or_create(
-                    asset=asset,
-                    date=price_date,
-                    defaults={'price_mru': price_mru, 'source': 'bcm'}
-                )
-                
-                stored += 1
-                
-                if stored % 50 == 0:
-                    logger.debug(f"  {stored} prix traités...")
+                rows.append({
+                    'asset_code': currency_code,
+                    'date': price_date,
+                    'price_mru': price_mru,
+                    'source': 'bcm',
+                })
             
             except Exception as e:
                 logger.error(f"Erreur stockage {currency_code}/{item}: {e}")
                 failed += 1
                 continue
         
+        # Upsert en une écriture (avec événements outbox, même transaction)
+        result = DataStore.store_prices_bulk(rows)
+        stored = result['stored']
+        failed += result['failed']
+        
         return stored, failed
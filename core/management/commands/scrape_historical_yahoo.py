@@ -6,13 +6,18 @@ from django.core.management.base import BaseCommand, CommandError
 from datetime import datetime, timedelta
 from decimal import Decimal
 import logging
-import requests
-import csv
-import io
 import random
-from tenacity import retry, stop_after_attempt, wait_exponential
-from core.models import Asset, Price
-from django.db import transaction
+import time
+from functools import partial
+from core.models import Price
+from core.registry import AssetRegistry
+from scraper.backfill import daterange_chunks
+from scraper.cache import payload_cache
+from scraper.fetchers import YahooFetcher
+from scraper.normalize import parse_close_csv
+from scraper.retry import RetryScheduler, RetryTask
+from scraper.gaps import find_gaps
+from scraper.store import DataStore
 
 logger = logging.getLogger(__name__)
 
@@ -27,12 +32,25 @@ class Command(BaseCommand):
    default=730,
    help='Nombre de jours  rcuprer (dfaut: 730 = 2 ans)'
   )
+  parser.add_argument(
+   '--full',
+   action='store_true',
+   help='Rcuprer toute la fentre, pas seulement les dates manquantes'
+  )
+  parser.add_argument(
+   '--workers',
+   type=int,
+   default=4,
+   help='Nombre de tlchargements simultans (dfaut: 4)'
+  )
+  parser.add_argument(
+   '--replay',
+   action='store_true',
+   help='Re-parser les payloads Yahoo en cache, sans rseau'
+  )
 
  def handle(self, *args, **options):
   days = options.get('days', 730)
-  if days < 730:
-   days = 730
-   self.stdout.write(self.style.WARNING(" Minimum 730 jours (2 ans) requis  utilisation de 730 jours."))
 
   self.stdout.write("=" * 70)
   self.stdout.write(self.style.SUCCESS(" Scraping Yahoo Finance (historique)"))
@@ -44,32 +62,54 @@ class Command(BaseCommand):
   self.stdout.write(f" Priode: {start_date}  {today} ({days} jours)")
   self.stdout.write("")
 
-  # Mapping assets -> Yahoo symbols
-  mapping = {
-   'GOLD': 'GC=F',  # Gold futures
-   'COPPER': 'HG=F', # Copper futures
-   'BTC': 'BTC-USD', # Bitcoin
-   'IRON': 'TIO=F', # Iron ore futures (CME TIO)
-  }
+  # Mapping assets -> Yahoo symbols (dclar par le fetcher)
+  mapping = YahooFetcher.SYMBOLS
 
-  total_stored = 0
-  total_failed = 0
+  if options.get('replay'):
+   return self.replay(mapping)
 
-  for asset_code, symbol in mapping.items():
-   self.stdout.write(f"\n Scraping {asset_code} (Yahoo: {symbol})...")
+  # Intervalles manquants par actif (une seule requte sur Price)
+  if options.get('full'):
+   gaps = {code: [(start_date, today)] for code in mapping}
+  else:
+   gaps = find_gaps('yahoo', list(mapping), start_date, today)
 
+  # Un tlchargement par intervalle manquant, en parallle; les checs sont
+  # replanifis (backoff + jitter) pendant que les autres continuent
+  tasks = []
+  for asset_code, symbol in mapping.items():
+   intervals = gaps.get(asset_code, [])
+   self.stdout.write(f" {asset_code} (Yahoo: {symbol}): {len(intervals)} intervalles manquants")
+   for gap_start, gap_end in intervals:
+    tasks.append(RetryTask(
+     (asset_code, gap_start, gap_end),
+     partial(self.fetch_rows, asset_code, symbol, gap_start, gap_end),
+     circuit=YahooFetcher.SOURCE,
+    ))
+
+  totals = {"stored": 0, "failed": 0}
+
+  def store(task):
+   asset_code, gap_start, gap_end = task.key
+   if task.status != "success":
+    self.stdout.write(self.style.ERROR(f" Erreur {asset_code} {gap_start}  {gap_end}: {task.status} ({task.error})"))
+    totals["failed"] += 1
+    return
    try:
-    stored, failed = self.fetch_and_store(asset_code, symbol, start_date, today)
-    self.stdout.write(self.style.SUCCESS(f" {asset_code}: {stored} prix stocks"))
-    if failed > 0:
-     self.stdout.write(self.style.WARNING(f" {failed} prix chous"))
-
-    total_stored += stored
-    total_failed += failed
-
+    stored, failed = self.store_rows(asset_code, task.result)
    except Exception as e:
-    self.stdout.write(self.style.ERROR(f" Erreur {asset_code}: {e}"))
-    total_failed += 1
+    self.stdout.write(self.style.ERROR(f" Erreur {asset_code} {gap_start}  {gap_end}: {e}"))
+    totals["failed"] += 1
+    return
+   self.stdout.write(self.style.SUCCESS(f" {asset_code} {gap_start}  {gap_end}: {stored} prix stocks"))
+   if failed > 0:
+    self.stdout.write(self.style.WARNING(f" {failed} prix chous"))
+   totals["stored"] += stored
+   totals["failed"] += failed
+
+  RetryScheduler(YahooFetcher.RETRY_POLICY, max_workers=options.get('workers', 4)).run(tasks, on_result=store)
+  total_stored = totals["stored"]
+  total_failed = totals["failed"]
 
   # Rsum
   self.stdout.write("\n" + "=" * 70)
@@ -80,203 +120,138 @@ class Command(BaseCommand):
   self.stdout.write(f" Total: {total_stored + total_failed}")
   self.stdout.write("=" * 70)
 
- @retry(stop=stop_after_attempt(6), wait=wait_exponential(multiplier=1, min=2, max=30))
- def fetch_yf(self, yahoo_symbol, start_date, end_date):
-  """
-  Rcupre l'historique via yfinance avec retries exponentiels.
+ def replay(self, mapping):
   """
-  import yfinance as yf
-  yf_start = start_date.isoformat()
-  yf_end = (end_date + timedelta(days=1)).isoformat()
-  df = yf.download(yahoo_symbol, start=yf_start, end=yf_end, interval='1d', progress=False)
-  if df is None or df.empty:
-   raise ValueError("yfinance returned no data")
-  return df
-
- @retry(stop=stop_after_attempt(6), wait=wait_exponential(multiplier=1, min=2, max=30))
- def request_with_retry(self, url, headers, timeout=20):
-  """Requests wrapper that retries on network errors and treats 429 as retryable."""
-  resp = requests.get(url, headers=headers, timeout=timeout)
-  if resp.status_code == 429:
-   raise requests.RequestException(f"429 Too Many Requests for url: {url}")
-  resp.raise_for_status()
-  return resp
-
- def fetch_and_store(self, asset_code, yahoo_symbol, start_date, end_date):
+  Re-parse et re-stocke les payloads Yahoo/yfinance en cache (hors ligne)
   """
-  Tlcharge l'historique CSV depuis Yahoo et stocke les prix en MRU
-  """
-  # Construire les timestamps Unix (secondes)
-  def to_unix(d):
-   return int(datetime(d.year, d.month, d.day).timestamp())
+  payload_cache.replay = True
+  symbols = {symbol: code for code, symbol in mapping.items()}
+  entries = payload_cache.entries("yfinance") + payload_cache.entries("yahoo")
 
-  period1 = to_unix(start_date)
-  # Yahoo API endpoint expects period2 as end of _next_ day to include end_date
-  period2 = to_unix(end_date + timedelta(days=1))
+  self.stdout.write("=" * 70)
+  self.stdout.write(self.style.SUCCESS(f" Replay Yahoo: {len(entries)} payloads en cache"))
+  self.stdout.write("=" * 70)
 
-  url = (
-   f"https://query1.finance.yahoo.com/v7/finance/download/{yahoo_symbol}"
-   f"?period1={period1}&period2={period2}&interval=1d&events=history&includeAdjustedClose=true"
-  )
+  total_stored = 0
+  total_failed = 0
+  started = time.perf_counter()
+
+  for entry in entries:
+   symbol = entry["request"]["params"].get("symbol") or entry["request"].get("url", "").rsplit("/", 1)[-1]
+   asset_code = symbols.get(symbol)
+   if asset_code is None:
+    continue
+   try:
+    rows = parse_close_csv(payload_cache.read(entry).decode("utf-8"))
+    stored, failed = self.store_rows(asset_code, rows)
+   except Exception as e:
+    self.stdout.write(self.style.ERROR(f" Payload {entry['digest'][:12]}: {e}"))
+    total_failed += 1
+    continue
+   total_stored += stored
+   total_failed += failed
 
-  logger.info(f" Requte Yahoo: {url}")
+  elapsed = time.perf_counter() - started
+  self.stdout.write(f" Stocks: {total_stored}")
+  self.stdout.write(f" chous: {total_failed}")
+  self.stdout.write(f" Dure: {elapsed:.2f}s")
+
+ def fetch_rows(self, asset_code, yahoo_symbol, start_date, end_date):
+  """
+  Tlcharge l'historique d'un intervalle (yfinance, repli CSV par chunks)
 
+  Lve une exception si un chunk choue: l'intervalle est alors replanifi
+  en entier (les chunks dj reus sont servis par le cache).
+  """
   # Try yfinance first (handles cookies/crumbs and is more reliable)
   logger.info("Tentative via yfinance...")
-  df = None
   try:
-   df = self.fetch_yf(yahoo_symbol, start_date, end_date)
+   rows = parse_close_csv(YahooFetcher.history_csv(yahoo_symbol, start_date, end_date))
+   if rows:
+    logger.info(f" yfinance: {len(rows)} enregistrements reus pour {yahoo_symbol}")
+    return rows
   except Exception as e:
    logger.warning(f"yfinance failed for {yahoo_symbol}: {e}")
-   df = None
-
-  if df is not None and not df.empty:
-   logger.info(f" yfinance: {len(df)} enregistrements reus pour {yahoo_symbol}")
-   stored = 0
-   failed = 0
-
-   asset = Asset.objects.filter(code=asset_code).first()
-   if asset is None:
-    logger.error(f"Actif {asset_code} introuvable")
-    return 0, 0
-
-   is_multi = hasattr(df, "columns") and hasattr(df.columns, "names")
-   for idx, row in df.iterrows():
-    price_date = idx.date()
-    if is_multi:
-     close_val = row.get(('Close', yahoo_symbol))
-     if close_val is None and 'Close' in df.columns.get_level_values(0):
-      close_series = row.xs('Close')
-      close_val = close_series.iloc[0] if hasattr(close_series, 'iloc') else close_series
-    else:
-     close_val = row.get('Close')
-    if close_val is None or str(close_val) in ('nan','NaN'):
-     failed += 1
-     continue
-    try:
-     close_usd = Decimal(str(close_val))
-    except Exception:
-     failed += 1
-     continue
-
-    usd_price = Price.objects.filter(asset__code='USD', date=price_date).first()
-    if not usd_price:
-     usd_price = Price.objects.filter(asset__code='USD', date__lt=price_date).order_by('-date').first()
-    if not usd_price:
-     failed += 1
-     continue
-
-    try:
-     price_mru = (close_usd * usd_price.price_mru).quantize(Decimal('0.01'))
-     with transaction.atomic():
-      Price.objects.update_or_create(asset=asset, date=price_date, defaults={'price_mru': price_mru, 'source': 'yahoo'})
-     stored += 1
-    except Exception as e:
-     logger.error(f"Erreur stockage {asset_code}/{price_date}: {e}")
-     failed += 1
-     continue
-
-   return stored, failed
-  else:
-   logger.warning(f"yfinance ne renvoie pas de donnes pour {yahoo_symbol}, fallback vers CSV")
-
-  # Headers et retries pour limiter les 429
-  headers = {
-   'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
-   'Accept': '*/*',
-  }
-
-  # Tlcharger en morceaux (chunks) pour viter les throttles
-  def daterange_chunks(s_date, e_date, chunk_days=90):
-   cur = s_date
-   while cur <= e_date:
-    chunk_end = min(e_date, cur + timedelta(days=chunk_days - 1))
-    yield cur, chunk_end
-    cur = chunk_end + timedelta(days=1)
 
+  logger.warning(f"yfinance ne renvoie pas de donnes pour {yahoo_symbol}, fallback vers CSV")
+
+  rows = []
+
+  # Tlcharger par chunk
+  for chunk_start, chunk_end in daterange_chunks(start_date, end_date, chunk_days=180):
+   resp = YahooFetcher.download_csv(yahoo_symbol, chunk_start, chunk_end)
+
+   # Pause courte entre chunks pour rduire la charge (inutile si servi par le cache)
+   if not resp.from_cache:
+    time.sleep(4)
+
+   # Lire CSV pour ce chunk
+   chunk_rows = parse_close_csv(resp.text)
+   logger.info(f" Chunk {chunk_start}{chunk_end}: {len(chunk_rows)} enregistrements reus")
+   rows.extend(chunk_rows)
+
+  return rows
+
+ def store_rows(self, asset_code, rows):
+  """
+  Stocke des lignes CSV Yahoo (Date, Close en USD) converties en MRU
+  """
+  to_store = []
   stored = 0
   failed = 0
 
-  asset = Asset.objects.filter(code=asset_code).first()
+  asset = AssetRegistry.get(asset_code)
   if asset is None:
    logger.error(f"Actif {asset_code} introuvable")
    return 0, 0
 
-  # Tlcharger par chunk
-  for chunk_start, chunk_end in daterange_chunks(start_date, end_date, chunk_days=180):
-   period1_chunk = to_unix(chunk_start)
-   period2_chunk = to_unix(chunk_end + timedelta(days=1))
-   url_chunk = (
-    f"https://query1.finance.yahoo.com/v7/finance/download/{yahoo_symbol}"
-    f"?period1={period1_chunk}&period2={period2_chunk}&interval=1d&events=history&includeAdjustedClose=true"
-   )
+  for r in rows:
+   date_str = r.get('Date')
+   close_str = r.get('Close')
+
+   if not date_str or not close_str or close_str in ('', 'null', 'NaN', 'nan'):
+    failed += 1
+    continue
 
    try:
-    resp = self.request_with_retry(url_chunk, headers=headers, timeout=20)
-   except Exception as e:
-    logger.error(f"Erreur requte Yahoo {asset_code} chunk {chunk_start}{chunk_end}: {e}")
+    price_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+   except ValueError:
+    failed += 1
+    continue
+
+   try:
+    close_usd = Decimal(str(close_str))
+   except Exception:
     failed += 1
     continue
 
-   # Pause courte entre chunks pour rduire la charge
-   import time
-   time.sleep(4)
+   # Chercher le taux USD->MRU pour la mme date (ou dernier disponible avant)
+   usd_price = Price.objects.filter(asset__code='USD', date=price_date).first()
+   if not usd_price:
+    usd_price = Price.objects.filter(asset__code='USD', date__lt=price_date).order_by('-date').first()
 
-   # Lire CSV pour ce chunk
-   csvfile = io.StringIO(resp.text)
-   reader = csv.DictReader(csvfile)
-   rows = list(reader)
-   logger.info(f" Chunk {chunk_start}{chunk_end}: {len(rows)} enregistrements reus")
-   # traiter lignes du chunk
-   for r in rows:
-    date_str = r.get('Date')
-    close_str = r.get('Close')
-
-    if not date_str or not close_str or close_str in ('', 'null', 'NaN'):
-     failed += 1
-     continue
-
-    try:
-     price_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-    except ValueError:
-     failed += 1
-     continue
-
-    try:
-     close_usd = Decimal(str(close_str))
-    except Exception:
-     failed += 1
-     continue
-
-    # Chercher le taux USD->MRU pour la mme date (ou dernier disponible avant)
-    usd_price = Price.objects.filter(asset__code='USD', date=price_date).first()
-    if not usd_price:
-     usd_price = Price.objects.filter(asset__code='USD', date__lt=price_date).order_by('-date').first()
-
-    if not usd_price:
-     # Pas de taux USD disponible -> on ne peut pas convertir
-     failed += 1
-     continue
-
-    # Calculer MRU
-    try:
-     price_mru = (close_usd * usd_price.price_mru).quantize(Decimal('0.01'))
-    except Exception:
-     failed += 1
-     continue
-
-    # Upsert
-    try:
-     with transaction.atomic():
-      price_obj, created = Price.objects.update_or_create(
-       asset=asset,
-       date=price_date,
-       defaults={'price_mru': price_mru, 'source': 'yahoo'}
-      )
-     stored += 1
-    except Exception as e:
-     logger.error(f"Erreur stockage {asset_code}/{price_date}: {e}")
-     failed += 1
-     continue
+   if not usd_price:
+    # Pas de taux USD disponible -> on ne peut pas convertir
+    failed += 1
+    continue
+
+   # Calculer MRU
+   try:
+    price_mru = (close_usd * usd_price.price_mru).quantize(Decimal('0.01'))
+   except Exception:
+    failed += 1
+    continue
+
+   to_store.append({
+    'asset_code': asset_code,
+    'date': price_date,
+    'price_mru': price_mru,
+    'source': 'yahoo',
+   })
+
+  # Upsert en une écriture (avec événements outbox, même transaction)
+  result = DataStore.store_prices_bulk(to_store)
+  stored = result['stored']
+  failed += result['failed']
 
   return stored, failed
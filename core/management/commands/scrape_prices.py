@@ -16,6 +16,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Synchroniser aussi avec MongoDB après le scraping',
         )
+        parser.add_argument(
+            '--replay',
+            action='store_true',
+            help='Re-parser les derniers payloads en cache, sans réseau',
+        )
     
     def handle(self, *args, **options):
         self.stdout.write("=" * 60)
@@ -30,6 +35,11 @@ class Command(BaseCommand):
             )
             raise CommandError("Configuration invalide")
         
+        if options.get('replay'):
+            from scraper.cache import payload_cache
+            payload_cache.replay = True
+            self.stdout.write(self.style.WARNING("💾 Mode replay: payloads en cache uniquement"))
+        
         # Scraper
         result = ScraperRunner.scrape_all()
         exit_code = result.get("exit_code")
@@ -40,6 +50,9 @@ class Command(BaseCommand):
         self.stdout.write("=" * 60)
         self.stdout.write(f"✅ Récupérés: {result.get('total_fetched', 0)}")
         self.stdout.write(f"✅ Stockés: {result.get('total_stored', 0)}")
+        rollup = result.get('rollup') or {}
+        if rollup.get('bars'):
+            self.stdout.write(f"🕯️ Barres journalières: {rollup['bars']} ({rollup.get('prices', 0)} clôtures)")
         self.stdout.write(f"❌ Échoués: {result.get('total_failed', 0)}")
         self.stdout.write(f"📌 Code sortie: {exit_code}")
         self.stdout.write("=" * 60)
@@ -49,7 +62,7 @@ class Command(BaseCommand):
             try:
                 from sync.sync_prices import SyncService
                 self.stdout.write("\n🔄 Synchronisation avec MongoDB...")
-                sync_result = SyncService.sync_prices_to_mongo()
+                sync_result = SyncService.sync_changes()
                 self.stdout.write(
                     self.style.SUCCESS(f"✅ Sync: {sync_result['synced']} documents")
                 )
@@ -16,24 +16,41 @@ class Command(BaseCommand):
         parser.add_argument(
             '--days',
             type=int,
-            default=7,
-            help='Nombre de jours à synchroniser en mode glissant (défaut: 7)',
+            default=None,
+            help='Fenêtre glissante en jours (défaut: incrémental depuis le dernier run)',
         )
         parser.add_argument(
             '--full',
             action='store_true',
             help='Synchroniser toutes les données (pas de fenêtre glissante)',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Documents par bulk_write (défaut: MONGO_SYNC_BATCH_SIZE ou 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Workers parallèles, un actif par tâche (défaut: MONGO_SYNC_WORKERS ou 4)',
+        )
         parser.add_argument(
             '--verify',
             action='store_true',
             help='Vérifier la cohérence après la sync',
         )
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Réparer les plages en écart (implique --verify)',
+        )
     
     def handle(self, *args, **options):
-        days = options.get('days', 7)
+        days = options.get('days')
         full_sync = options.get('full', False)
-        verify = options.get('verify', False)
+        verify = options.get('verify', False) or options.get('repair', False)
         
         self.stdout.write(self.style.SUCCESS("=" * 70))
         self.stdout.write(self.style.SUCCESS("🔄 SYNCHRONISATION PostgreSQL → MongoDB"))
@@ -41,12 +58,24 @@ class Command(BaseCommand):
         
         if full_sync:
             self.stdout.write(self.style.WARNING(f"⚠️  Mode FULL SYNC (toutes les données)"))
-            days = 99999  # Très grand nombre de jours
-        else:
+            result = SyncService.sync_prices_to_mongo(
+                days_back=None,
+                batch_size=options.get('batch_size'),
+                workers=options.get('workers'),
+            )
+        elif days is not None:
             self.stdout.write(f"📅 Fenêtre glissante: {days} jours")
-        
-        # Exécuter la synchronisation
-        result = SyncService.sync_prices_to_mongo(days_back=days)
+            result = SyncService.sync_prices_to_mongo(
+                days_back=days,
+                batch_size=options.get('batch_size'),
+                workers=options.get('workers'),
+            )
+        else:
+            self.stdout.write("📈 Mode incrémental (high-water mark)")
+            result = SyncService.sync_changes(
+                batch_size=options.get('batch_size'),
+                workers=options.get('workers'),
+            )
         
         # Afficher les résultats
         if result['success']:
@@ -54,8 +83,12 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f"✅ Synchronisation réussie")
             )
             self.stdout.write(f"   Synchronisés: {result['synced']}")
+            self.stdout.write(f"   Supprimés: {result.get('deleted', 0)}")
             self.stdout.write(f"   Échoués: {result['failed']}")
             self.stdout.write(f"   Total MongoDB: {result.get('total_in_mongo', 'N/A')}")
+            self.stdout.write(
+                f"   Débit: {result.get('throughput', 0)} docs/s ({result.get('elapsed', 0)}s)"
+            )
         else:
             self.stdout.write(
                 self.style.ERROR(f"❌ Erreur: {result.get('error', 'Erreur inconnue')}")
@@ -64,7 +97,7 @@ class Command(BaseCommand):
         # Vérifier la cohérence si demandé
         if verify:
             self.stdout.write("\n" + self.style.WARNING("🔍 Vérification cohérence..."))
-            consistency = SyncService.verify_consistency()
+            consistency = SyncService.verify_consistency(repair=options.get('repair', False))
             
             if consistency['success']:
                 pg = consistency.get('pg_count', 'N/A')
@@ -78,6 +111,17 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.SUCCESS("   ✅ Cohérence OK"))
                 else:
                     self.stdout.write(self.style.WARNING("   ⚠️  Incohérence détectée"))
+                    for bucket in consistency.get('buckets', [])[:20]:
+                        self.stdout.write(f"      - {bucket}")
+                    rows = consistency.get('rows', {})
+                    self.stdout.write(
+                        f"   Manquants: {rows.get('missing', 0)}, en trop: {rows.get('extra', 0)}, "
+                        f"différents: {rows.get('different', 0)}"
+                    )
+                    if options.get('repair'):
+                        self.stdout.write(
+                            self.style.SUCCESS(f"   🔧 Réparés: {consistency.get('repaired', 0)}")
+                        )
             else:
                 self.stdout.write(
                     self.style.ERROR(f"   ❌ Erreur vérification")
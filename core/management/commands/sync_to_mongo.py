@@ -13,25 +13,52 @@ class Command(BaseCommand):
         parser.add_argument(
             '--days',
             type=int,
-            default=7,
-            help='Nombre de jours à synchroniser (défaut: 7)',
+            default=None,
+            help='Fenêtre glissante en jours (défaut: incrémental depuis le dernier run)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Documents par bulk_write (défaut: MONGO_SYNC_BATCH_SIZE ou 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Workers parallèles, un actif par tâche (défaut: MONGO_SYNC_WORKERS ou 4)',
         )
         parser.add_argument(
             '--verify',
             action='store_true',
             help='Vérifier la cohérence après sync',
         )
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Réparer les plages en écart (implique --verify)',
+        )
     
     def handle(self, *args, **options):
-        days = options.get('days', 7)
-        verify = options.get('verify', False)
+        days = options.get('days')
+        verify = options.get('verify', False) or options.get('repair', False)
         
         self.stdout.write("=" * 60)
         self.stdout.write(self.style.SUCCESS("📊 Sync PostgreSQL → MongoDB"))
         self.stdout.write("=" * 60)
         
-        # Synchroniser
-        result = SyncService.sync_prices_to_mongo(days_back=days)
+        # Synchroniser (incrémental sauf fenêtre explicite)
+        if days is not None:
+            result = SyncService.sync_prices_to_mongo(
+                days_back=days,
+                batch_size=options.get('batch_size'),
+                workers=options.get('workers'),
+            )
+        else:
+            result = SyncService.sync_changes(
+                batch_size=options.get('batch_size'),
+                workers=options.get('workers'),
+            )
         
         if not result['success']:
             self.stdout.write(
@@ -44,14 +71,16 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("📊 RÉSUMÉ SYNC"))
         self.stdout.write("=" * 60)
         self.stdout.write(f"✅ Synchronisés: {result['synced']}")
+        self.stdout.write(f"🗑️ Supprimés: {result.get('deleted', 0)}")
         self.stdout.write(f"❌ Échoués: {result['failed']}")
         self.stdout.write(f"📦 Total MongoDB: {result.get('total_in_mongo', 0)}")
+        self.stdout.write(f"⚡ Débit: {result.get('throughput', 0)} docs/s")
         self.stdout.write("=" * 60)
         
         # Vérification optionnelle
         if verify:
             self.stdout.write("\n🔍 Vérification de la cohérence...")
-            check_result = SyncService.verify_consistency()
+            check_result = SyncService.verify_consistency(repair=options.get('repair', False))
             if check_result['success']:
                 if check_result.get('consistent'):
                     self.stdout.write(self.style.SUCCESS("✅ Cohérence OK"))
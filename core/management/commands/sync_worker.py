@@ -0,0 +1,47 @@
+"""
+Management command: python manage.py sync_worker
+Réplique en continu les changements de prix (outbox) vers MongoDB
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from sync.runner import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Worker de synchronisation continue PostgreSQL → MongoDB (outbox)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Événements par lot (défaut: OUTBOX_BATCH_SIZE ou 500)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Attente en secondes quand l\'outbox est vide (défaut: OUTBOX_POLL_INTERVAL ou 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Vider l\'outbox puis quitter',
+        )
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(
+            batch_size=options.get('batch_size'),
+            poll_interval=options.get('interval'),
+        )
+
+        self.stdout.write(self.style.SUCCESS("🔄 Worker outbox PostgreSQL → MongoDB"))
+        try:
+            totals = worker.run(once=options.get('once', False))
+        except Exception as e:
+            raise CommandError(f"Worker outbox interrompu: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totals.get('events', 0)} événements traités "
+            f"({totals.get('synced', 0)} upserts, {totals.get('deleted', 0)} suppressions)"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_price_created_at_price_source_price_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('chunk_start', models.DateField()),
+                ('chunk_end', models.DateField()),
+                ('status', models.CharField(choices=[('done', 'Terminé'), ('failed', 'Échoué')], max_length=10)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.asset')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'asset', 'chunk_start', 'chunk_end'), name='unique_backfill_chunk')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_backfillprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceCircuit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20, unique=True)),
+                ('state', models.CharField(choices=[('closed', 'Fermé'), ('open', 'Ouvert'), ('half_open', 'Semi-ouvert')], default='closed', max_length=10)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('opened_count', models.PositiveIntegerField(default=0)),
+                ('retry_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
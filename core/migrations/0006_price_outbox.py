@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_sync_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_code', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('op', models.CharField(choices=[('upsert', 'Création / mise à jour'), ('delete', 'Suppression')], default='upsert', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_price_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='price',
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['asset', 'source', '-date'], include=('price_mru',), name='price_asset_source_date_idx'),
+        ),
+    ]
@@ -0,0 +1,111 @@
+"""
+Conversion de core_price en table partitionnée par plage de dates (une
+partition par année + une partition par défaut)
+
+PostgreSQL impose que la clé primaire d'une table partitionnée contienne la
+clé de partition: la clé primaire devient (id, date). Pour Django, `id`
+reste la clé primaire (unique via la séquence). La contrainte
+unique_asset_date (asset_id, date) et les index existants sont recréés sous
+leurs noms d'origine. Migration sans effet hors PostgreSQL; le retour
+arrière est neutre (la table partitionnée reste compatible avec le modèle).
+"""
+from datetime import date
+
+from django.db import migrations
+
+
+TABLE = "core_price"
+
+
+def partition_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+        if row is None or row[0] == "p":
+            return  # Déjà partitionnée
+
+        # Index hors contraintes (à recréer à l'identique) et contraintes
+        cursor.execute(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE tablename = %s AND indexname NOT IN (
+                SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass
+            )
+            """,
+            [TABLE, TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, contype FROM pg_constraint WHERE conrelid = %s::regclass",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        fk_name = next((name for name, kind in constraints if kind == "f"), "core_price_asset_id_fk_core_asset_id")
+
+        cursor.execute(f"SELECT min(date), max(id) FROM {TABLE}")
+        first_date, max_id = cursor.fetchone()
+
+        # 1. Libérer les noms: ancienne table, index et contraintes
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_old")
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:55]}_old"')
+        for name, _ in constraints:
+            cursor.execute(f'ALTER TABLE {TABLE}_old RENAME CONSTRAINT "{name}" TO "{name[:55]}_old"')
+
+        # 2. Table partitionnée
+        cursor.execute(f"CREATE SEQUENCE {TABLE}_part_id_seq")
+        cursor.execute(
+            f"""
+            CREATE TABLE {TABLE} (
+                id bigint NOT NULL DEFAULT nextval('{TABLE}_part_id_seq'),
+                date date NOT NULL,
+                price_mru numeric(14, 4) NOT NULL,
+                asset_id bigint NOT NULL,
+                source varchar(20) NOT NULL,
+                created_at timestamp with time zone NOT NULL,
+                updated_at timestamp with time zone NOT NULL,
+                CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, date),
+                CONSTRAINT unique_asset_date UNIQUE (asset_id, date),
+                CONSTRAINT "{fk_name}" FOREIGN KEY (asset_id)
+                    REFERENCES core_asset (id) DEFERRABLE INITIALLY DEFERRED
+            ) PARTITION BY RANGE (date)
+            """
+        )
+        cursor.execute(f"ALTER SEQUENCE {TABLE}_part_id_seq OWNED BY {TABLE}.id")
+
+        first_year = (first_date or date.today()).year
+        for year in range(first_year, date.today().year + 2):
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_y{year} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+        cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+        # 3. Données et séquence
+        columns = "id, date, price_mru, asset_id, source, created_at, updated_at"
+        cursor.execute(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {TABLE}_old")
+        if max_id:
+            cursor.execute(f"SELECT setval('{TABLE}_part_id_seq', %s)", [max_id])
+
+        cursor.execute(f"DROP TABLE {TABLE}_old")
+        cursor.execute(f"ALTER SEQUENCE {TABLE}_part_id_seq RENAME TO {TABLE}_id_seq")
+
+
+class Migration(migrations.Migration):
+
+    atomic = True
+
+    dependencies = [
+        ('core', '0007_price_covering_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_partition_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncstate',
+            name='high_water_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('ticks', models.PositiveIntegerField(default=0)),
+                ('first_ts', models.DateTimeField()),
+                ('last_ts', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.asset')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('asset', 'date'), name='unique_bar_asset_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceTick',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ts', models.DateTimeField()),
+                ('price_mru', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('source', models.CharField(max_length=20)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.asset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['asset', 'ts'], name='tick_asset_ts_idx')],
+                'constraints': [models.UniqueConstraint(fields=('asset', 'source', 'ts'), name='unique_tick')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_price_ticks_daily_bars'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('week', 'Semaine'), ('month', 'Mois')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('avg', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_date', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.asset')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('asset', 'resolution', 'period_start'), name='unique_rollup_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_prices(apps, schema_editor):
+    """Chaque prix existant devient l'observation de sa source"""
+    Price = apps.get_model("core", "Price")
+    PriceObservation = apps.get_model("core", "PriceObservation")
+    columns = "asset_id, date, source, price_mru, created_at, updated_at"
+    schema_editor.execute(
+        f"INSERT INTO {PriceObservation._meta.db_table} ({columns}) "
+        f"SELECT {columns} FROM {Price._meta.db_table}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_price_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(choices=[('bcm', 'API Banque Centrale Mauritanie'), ('yahoo', 'Yahoo Finance'), ('api', 'API Externe'), ('sim', 'Simulation'), ('init', 'Données Initiales')], max_length=20)),
+                ('price_mru', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='price',
+            name='price_asset_source_date_idx',
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='source_priority',
+            field=models.CharField(blank=True, help_text='Sources séparées par des virgules, de la plus fiable à la moins fiable', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='price',
+            name='source',
+            field=models.CharField(choices=[('bcm', 'API Banque Centrale Mauritanie'), ('yahoo', 'Yahoo Finance'), ('api', 'API Externe'), ('sim', 'Simulation'), ('init', 'Données Initiales')], default='api', help_text='Source de la donnée de prix', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['asset', '-date'], include=('price_mru',), name='price_asset_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='priceobservation',
+            name='asset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.asset'),
+        ),
+        migrations.AddIndex(
+            model_name='priceobservation',
+            index=models.Index(fields=['asset', 'date'], name='observation_asset_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='priceobservation',
+            constraint=models.UniqueConstraint(fields=('asset', 'source', 'date'), name='unique_observation'),
+        ),
+        migrations.RunPython(copy_prices, migrations.RunPython.noop),
+    ]
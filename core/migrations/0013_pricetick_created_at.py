@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_scheduled_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricetick',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='pricetick',
+            index=models.Index(fields=['created_at', 'id'], name='tick_created_idx'),
+        ),
+    ]
@@ -11,14 +11,22 @@ class Asset(models.Model):
             ("crypto", "Crypto"),
         ],
     )
+    # Sources par ordre de préférence pour le prix canonique (vide: PRICE_SOURCE_PRIORITY)
+    source_priority = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Sources séparées par des virgules, de la plus fiable à la moins fiable",
+    )
 
     def __str__(self):
         return self.code
 
 
 class Price(models.Model):
+    """Prix canonique du jour, résolu parmi les observations selon la priorité des sources"""
     SOURCE_CHOICES = [
         ("bcm", "API Banque Centrale Mauritanie"),
+        ("yahoo", "Yahoo Finance"),
         ("api", "API Externe"),
         ("sim", "Simulation"),
         ("init", "Données Initiales"),
@@ -34,16 +42,244 @@ class Price(models.Model):
         help_text="Source de la donnée de prix"
     )
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
-        ordering = ["-date"]
+        # Pas d'ordering par défaut: chaque requête trie explicitement
         constraints = [
             models.UniqueConstraint(
                 fields=["asset", "date"],
                 name="unique_asset_date"
             )
         ]
+        indexes = [
+            # Accueil / détail: filtre asset, tri -date, lecture du prix seul
+            models.Index(
+                fields=["asset", "-date"],
+                include=["price_mru"],
+                name="price_asset_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.asset.code} {self.date}"
+
+
+class PriceObservation(models.Model):
+    """Prix brut observé par une source (les sources ne s'écrasent pas entre elles)"""
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    date = models.DateField()
+    source = models.CharField(max_length=20, choices=Price.SOURCE_CHOICES)
+    price_mru = models.DecimalField(max_digits=14, decimal_places=4)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["asset", "source", "date"],
+                name="unique_observation"
+            )
+        ]
+        indexes = [
+            # Résolution du prix canonique: toutes les sources d'un (actif, date)
+            models.Index(fields=["asset", "date"], name="observation_asset_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.asset.code} {self.date} {self.source} {self.price_mru}"
+
+
+class BackfillProgress(models.Model):
+    """Checkpoint d'un segment (chunk) de backfill historique"""
+    STATUS_CHOICES = [
+        ("done", "Terminé"),
+        ("failed", "Échoué"),
+    ]
+
+    source = models.CharField(max_length=20)
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    chunk_start = models.DateField()
+    chunk_end = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "asset", "chunk_start", "chunk_end"],
+                name="unique_backfill_chunk"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.source}/{self.asset.code} {self.chunk_start}→{self.chunk_end} ({self.status})"
+
+
+class SourceCircuit(models.Model):
+    """État persistant du circuit breaker d'une source externe (bcm, yahoo, ...)"""
+    STATE_CHOICES = [
+        ("closed", "Fermé"),
+        ("open", "Ouvert"),
+        ("half_open", "Semi-ouvert"),
+    ]
+
+    source = models.CharField(max_length=20, unique=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default="closed")
+    failures = models.PositiveIntegerField(default=0)
+    opened_count = models.PositiveIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.state})"
+
+
+class PriceDeletion(models.Model):
+    """Trace d'un prix supprimé, pour propager la suppression (sync incrémentale)"""
+    asset_code = models.CharField(max_length=10)
+    date = models.DateField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.asset_code} {self.date} (supprimé)"
+
+
+class SyncState(models.Model):
+    """Point de reprise (high-water mark) d'un processus de synchronisation"""
+    name = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    # Point de reprise par identifiant (flux append-only, ex: PriceTick)
+    high_water_id = models.BigIntegerField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
+
+
+class PriceOutbox(models.Model):
+    """Événement de changement d'un prix, écrit dans la transaction du prix (outbox)"""
+    OP_CHOICES = [
+        ("upsert", "Création / mise à jour"),
+        ("delete", "Suppression"),
+    ]
+
+    asset_code = models.CharField(max_length=10)
+    date = models.DateField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES, default="upsert")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.op} {self.asset_code} {self.date}"
+
+
+class PriceTick(models.Model):
+    """Cotation intrajournalière (append-only, ingérée en bulk)"""
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    ts = models.DateTimeField()
+    price_mru = models.DecimalField(max_digits=14, decimal_places=4)
+    source = models.CharField(max_length=20)
+    # Instant d'insertion: point de reprise du rollup (scraper.rollup)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Une re-collecte du même instant n'ajoute pas de doublon
+            models.UniqueConstraint(
+                fields=["asset", "source", "ts"],
+                name="unique_tick"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["asset", "ts"], name="tick_asset_ts_idx"),
+            models.Index(fields=["created_at", "id"], name="tick_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.asset.code} {self.ts:%Y-%m-%d %H:%M} {self.price_mru}"
+
+
+class DailyBar(models.Model):
+    """Barre OHLC journalière calculée à partir des ticks"""
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    date = models.DateField()
+    open = models.DecimalField(max_digits=14, decimal_places=4)
+    high = models.DecimalField(max_digits=14, decimal_places=4)
+    low = models.DecimalField(max_digits=14, decimal_places=4)
+    close = models.DecimalField(max_digits=14, decimal_places=4)
+    ticks = models.PositiveIntegerField(default=0)
+    first_ts = models.DateTimeField()
+    last_ts = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["asset", "date"],
+                name="unique_bar_asset_date"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.asset.code} {self.date} O{self.open} H{self.high} L{self.low} C{self.close}"
+
+
+class PriceRollup(models.Model):
+    """Agrégat hebdomadaire / mensuel des prix journaliers (vues longues périodes)"""
+    RESOLUTION_CHOICES = [
+        ("week", "Semaine"),
+        ("month", "Mois"),
+    ]
+
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    resolution = models.CharField(max_length=5, choices=RESOLUTION_CHOICES)
+    # Lundi de la semaine ou premier jour du mois
+    period_start = models.DateField()
+    open = models.DecimalField(max_digits=14, decimal_places=4)
+    high = models.DecimalField(max_digits=14, decimal_places=4)
+    low = models.DecimalField(max_digits=14, decimal_places=4)
+    close = models.DecimalField(max_digits=14, decimal_places=4)
+    avg = models.DecimalField(max_digits=14, decimal_places=4)
+    count = models.PositiveIntegerField(default=0)
+    last_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["asset", "resolution", "period_start"],
+                name="unique_rollup_period"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.asset.code} {self.resolution} {self.period_start} C{self.close}"
+
+
+class ScheduledJob(models.Model):
+    """État d'une tâche planifiée (core/scheduler.py): dernière échéance tenue et exécution"""
+    STATUS_CHOICES = [
+        ("running", "En cours"),
+        ("success", "Réussie"),
+        ("failed", "Échouée"),
+        ("skipped", "Échéance ignorée"),
+    ]
+
+    name = models.CharField(max_length=50, unique=True)
+    schedule = models.CharField(max_length=100)
+    # Échéance cron réservée en dernier: une seule exécution par échéance
+    last_slot = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    run_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.schedule}) {self.status or '-'}"
@@ -0,0 +1,22 @@
+"""
+Outbox des changements de prix
+
+Les écritures de prix ajoutent un événement (actif, date) dans PriceOutbox
+au sein de la même transaction; le worker sync/runner.py le consomme et
+réplique l'état courant de la ligne vers MongoDB.
+"""
+from .models import PriceOutbox
+
+
+def enqueue_price_changes(keys, op="upsert"):
+    """
+    Ajoute des événements à l'outbox (à appeler dans la transaction d'écriture)
+
+    Args:
+        keys: Itérable de (asset_code, date)
+        op: upsert ou delete
+    """
+    events = [PriceOutbox(asset_code=code, date=day, op=op) for code, day in keys]
+    if events:
+        PriceOutbox.objects.bulk_create(events)
+    return len(events)
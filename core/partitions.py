@@ -0,0 +1,120 @@
+"""
+Maintenance des partitions annuelles de core_price (PostgreSQL)
+
+- Création des partitions futures (les lignes tombées entre-temps dans la
+  partition par défaut y sont déplacées)
+- Index BRIN sur `date` pour les partitions des années révolues, qui ne
+  reçoivent plus d'écritures et sont parcourues par plages
+"""
+import logging
+import re
+from datetime import date
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+TABLE = "core_price"
+PARTITION_RE = re.compile(rf"^{TABLE}_y(\d{{4}})$")
+
+
+def is_partitioned():
+    """Indique si core_price est une table partitionnée"""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def list_partitions():
+    """
+    Partitions annuelles existantes
+
+    Returns:
+        dict: {année: {"name": str, "rows": int (estimation), "brin": bool}}
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, c.reltuples::bigint,
+                   EXISTS (
+                       SELECT 1 FROM pg_index i
+                       JOIN pg_class ic ON ic.oid = i.indexrelid
+                       JOIN pg_am am ON am.oid = ic.relam
+                       WHERE i.indrelid = c.oid AND am.amname = 'brin'
+                   )
+            FROM pg_inherits inh
+            JOIN pg_class c ON c.oid = inh.inhrelid
+            WHERE inh.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = {}
+    for name, tuples, brin in rows:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions[int(match.group(1))] = {"name": name, "rows": max(tuples, 0), "brin": brin}
+    return partitions
+
+
+def create_partition(year):
+    """
+    Crée la partition d'une année, en y déplaçant les lignes déjà présentes
+    dans la partition par défaut
+    """
+    name = f"{TABLE}_y{year}"
+    start, end = f"{year}-01-01", f"{year + 1}-01-01"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {TABLE}_default WHERE date >= %s AND date < %s RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved",
+            [start, end],
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    logger.info(f"🆕 Partition {name} créée ({moved} lignes déplacées depuis la partition par défaut)")
+    return moved
+
+
+def add_brin_index(year):
+    """Index BRIN sur date pour une partition figée"""
+    name = f"{TABLE}_y{year}"
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name}_date_brin ON {name} USING brin (date)")
+    logger.info(f"🧱 Index BRIN créé sur {name}")
+
+
+def maintain(years_ahead=1, brin=True):
+    """
+    Crée les partitions manquantes jusqu'à l'année courante + years_ahead
+    et indexe en BRIN les années révolues
+
+    Returns:
+        dict: {"created": [années], "brin": [années]}
+    """
+    partitions = list_partitions()
+    current = date.today().year
+    first = min(partitions) if partitions else current
+
+    created = []
+    for year in range(first, current + years_ahead + 1):
+        if year not in partitions:
+            create_partition(year)
+            created.append(year)
+
+    indexed = []
+    if brin:
+        for year, info in sorted(list_partitions().items()):
+            if year < current and not info["brin"]:
+                add_brin_index(year)
+                indexed.append(year)
+
+    return {"created": created, "brin": indexed}
@@ -0,0 +1,113 @@
+"""
+Registre des actifs en mémoire (code -> Asset), partagé par le processus
+
+Chargé paresseusement en une requête, puis servi sans requête: scraper,
+services et vues résolvent les actifs par code ou identifiant via des
+dictionnaires. Invalidé par les signaux post_save / post_delete d'Asset
+(core/signals.py); les autres processus le rechargent au plus tard après
+ASSET_REGISTRY_TTL secondes. Un code inconnu déclenche un rechargement,
+limité à un par MISS_RELOAD_INTERVAL.
+"""
+import logging
+import os
+import threading
+import time
+
+from .models import Asset
+
+logger = logging.getLogger(__name__)
+
+
+class AssetRegistry:
+    """Index des actifs par code et par identifiant (instantané immuable)"""
+
+    TTL = int(os.getenv("ASSET_REGISTRY_TTL", 300))
+    MISS_RELOAD_INTERVAL = 5
+
+    _lock = threading.Lock()
+    _snapshot = None
+    _loaded_at = 0.0
+    _miss_reload_at = 0.0
+
+    @classmethod
+    def _load(cls):
+        by_code = {}
+        by_id = {}
+        for asset in Asset.objects.order_by("category", "code").iterator(chunk_size=2000):
+            by_code[asset.code] = asset
+            by_id[asset.id] = asset
+        # Tuple remplacé d'un bloc: les lecteurs n'ont jamais d'état partiel
+        cls._snapshot = (by_code, by_id, tuple(by_code.values()))
+        cls._loaded_at = time.monotonic()
+        logger.debug(f"📇 Registre des actifs chargé: {len(by_code)} actifs")
+        return cls._snapshot
+
+    @classmethod
+    def _get_snapshot(cls):
+        snapshot = cls._snapshot
+        if snapshot is None or time.monotonic() - cls._loaded_at > cls.TTL:
+            with cls._lock:
+                snapshot = cls._snapshot
+                if snapshot is None or time.monotonic() - cls._loaded_at > cls.TTL:
+                    snapshot = cls._load()
+        return snapshot
+
+    @classmethod
+    def _reload_on_miss(cls):
+        """Recharge pour un code inconnu (actif créé par un autre processus)"""
+        now = time.monotonic()
+        with cls._lock:
+            if now - cls._miss_reload_at < cls.MISS_RELOAD_INTERVAL:
+                return False
+            cls._miss_reload_at = now
+            cls._load()
+        return True
+
+    @classmethod
+    def invalidate(cls):
+        """Vide le registre (rechargé au prochain accès)"""
+        with cls._lock:
+            cls._snapshot = None
+
+    @classmethod
+    def get(cls, code):
+        """Actif d'un code, ou None"""
+        asset = cls._get_snapshot()[0].get(code)
+        if asset is None and code and cls._reload_on_miss():
+            asset = cls._get_snapshot()[0].get(code)
+        return asset
+
+    @classmethod
+    def get_by_id(cls, asset_id):
+        """Actif d'un identifiant, ou None"""
+        asset = cls._get_snapshot()[1].get(asset_id)
+        if asset is None and asset_id and cls._reload_on_miss():
+            asset = cls._get_snapshot()[1].get(asset_id)
+        return asset
+
+    @classmethod
+    def ids(cls, codes):
+        """
+        Identifiants des codes connus
+
+        Returns:
+            dict: {code: id} (codes inconnus absents)
+        """
+        codes = [code for code in codes if code]
+        by_code = cls._get_snapshot()[0]
+        if any(code not in by_code for code in codes) and cls._reload_on_miss():
+            by_code = cls._get_snapshot()[0]
+        return {code: by_code[code].id for code in codes if code in by_code}
+
+    @classmethod
+    def codes(cls):
+        """Ensemble des codes connus"""
+        return set(cls._get_snapshot()[0])
+
+    @classmethod
+    def all(cls, category=None):
+        """Actifs triés par (catégorie, code), optionnellement d'une catégorie"""
+        assets = cls._get_snapshot()[2]
+        if category:
+            return [asset for asset in assets if asset.category == category]
+        return list(assets)
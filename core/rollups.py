@@ -0,0 +1,224 @@
+"""
+Agrégats hebdomadaires et mensuels des prix journaliers (PriceRollup)
+
+Chaque écriture de prix (DataStore, signaux ORM, restauration) recalcule,
+dans sa transaction, uniquement les périodes qui contiennent les dates
+modifiées: open/high/low/close/moyenne sur tous les prix de la période.
+Les vues longues périodes lisent ces agrégats au lieu des lignes journalières
+(choose_resolution).
+"""
+import logging
+import os
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Price, PriceRollup
+
+logger = logging.getLogger(__name__)
+
+
+RESOLUTIONS = ("week", "month")
+# Nombre de points au-delà duquel on passe à la résolution plus grossière
+MAX_POINTS = int(os.getenv("ROLLUP_MAX_POINTS", 400))
+QUANT = Decimal("0.0001")
+
+
+def period_start(day, resolution):
+    """Début de la période contenant `day` (lundi ou premier du mois)"""
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def period_end(start, resolution):
+    """Fin (exclue) de la période commençant à `start`"""
+    if resolution == "week":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def choose_resolution(days, max_points=None):
+    """
+    Résolution la plus fine dont le nombre de points tient dans max_points
+
+    Returns:
+        str: day, week ou month
+    """
+    max_points = max_points or MAX_POINTS
+    if days <= max_points:
+        return "day"
+    if days / 7 <= max_points:
+        return "week"
+    return "month"
+
+
+def _merge_ranges(ranges):
+    """Fusionne des intervalles [début, fin) qui se chevauchent ou se touchent"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def refresh(keys):
+    """
+    Recalcule les agrégats des périodes touchées (à appeler dans la
+    transaction d'écriture)
+
+    Args:
+        keys: Itérable de (asset_id, date) modifiés (créés, mis à jour ou supprimés)
+
+    Returns:
+        int: nombre de périodes recalculées
+    """
+    buckets = set()
+    ranges = {}
+    for asset_id, day in keys:
+        for resolution in RESOLUTIONS:
+            start = period_start(day, resolution)
+            if (asset_id, resolution, start) not in buckets:
+                buckets.add((asset_id, resolution, start))
+                ranges.setdefault(asset_id, []).append((start, period_end(start, resolution)))
+    if not buckets:
+        return 0
+
+    # Une seule lecture: plages fusionnées couvrant toutes les périodes touchées
+    condition = Q()
+    for asset_id, asset_ranges in ranges.items():
+        for start, end in _merge_ranges(asset_ranges):
+            condition |= Q(asset_id=asset_id, date__gte=start, date__lt=end)
+
+    aggregates = {}
+    rows = Price.objects.filter(condition).order_by("asset_id", "date").values_list(
+        "asset_id", "date", "price_mru"
+    )
+    for asset_id, day, price in rows.iterator(chunk_size=5000):
+        for resolution in RESOLUTIONS:
+            key = (asset_id, resolution, period_start(day, resolution))
+            if key not in buckets:
+                continue
+            agg = aggregates.get(key)
+            if agg is None:
+                aggregates[key] = {
+                    "open": price, "high": price, "low": price, "close": price,
+                    "total": price, "count": 1, "last_date": day,
+                }
+                continue
+            agg["high"] = max(agg["high"], price)
+            agg["low"] = min(agg["low"], price)
+            agg["close"] = price
+            agg["total"] += price
+            agg["count"] += 1
+            agg["last_date"] = day
+
+    if aggregates:
+        PriceRollup.objects.bulk_create(
+            [
+                PriceRollup(
+                    asset_id=asset_id, resolution=resolution, period_start=start,
+                    open=agg["open"], high=agg["high"], low=agg["low"], close=agg["close"],
+                    avg=(agg["total"] / agg["count"]).quantize(QUANT),
+                    count=agg["count"], last_date=agg["last_date"],
+                )
+                for (asset_id, resolution, start), agg in aggregates.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["asset", "resolution", "period_start"],
+            update_fields=["open", "high", "low", "close", "avg", "count", "last_date", "updated_at"],
+        )
+
+    # Périodes vidées par des suppressions
+    empty = Q()
+    for asset_id, resolution, start in buckets - set(aggregates):
+        empty |= Q(asset_id=asset_id, resolution=resolution, period_start=start)
+    if empty:
+        PriceRollup.objects.filter(empty).delete()
+
+    return len(buckets)
+
+
+def rebuild(asset_ids=None):
+    """
+    Recalcule tous les agrégats (initialisation ou réparation)
+
+    Returns:
+        dict: {asset_id: nombre de périodes}
+    """
+    prices = Price.objects.all()
+    if asset_ids is not None:
+        prices = prices.filter(asset_id__in=asset_ids)
+    asset_ids = sorted(set(prices.values_list("asset_id", flat=True)))
+
+    result = {}
+    for asset_id in asset_ids:
+        days = Price.objects.filter(asset_id=asset_id).values_list("date", flat=True)
+        with transaction.atomic():
+            PriceRollup.objects.filter(asset_id=asset_id).delete()
+            result[asset_id] = refresh((asset_id, day) for day in days.iterator(chunk_size=5000))
+        logger.info(f"📐 Agrégats recalculés: actif {asset_id}, {result[asset_id]} périodes")
+    return result
+
+
+def series(asset_ids, resolution, start=None, end=None):
+    """
+    Agrégats de plusieurs actifs, du plus ancien au plus récent
+
+    Returns:
+        dict: {asset_id: [{"date", "price_mru", "open", "high", "low", "avg", "count"}]}
+    """
+    rollups = PriceRollup.objects.filter(asset_id__in=asset_ids, resolution=resolution)
+    if start:
+        rollups = rollups.filter(period_start__gte=period_start(start, resolution))
+    if end:
+        rollups = rollups.filter(period_start__lte=end)
+
+    result = {asset_id: [] for asset_id in asset_ids}
+    rows = rollups.order_by("asset_id", "period_start").values_list(
+        "asset_id", "period_start", "open", "high", "low", "close", "avg", "count"
+    )
+    for asset_id, start_day, open_, high, low, close, avg, count in rows:
+        result[asset_id].append({
+            "date": start_day,
+            "price_mru": float(close),
+            "open": float(open_),
+            "high": float(high),
+            "low": float(low),
+            "avg": float(avg),
+            "count": count,
+        })
+    return result
+
+
+def aggregate(points, resolution):
+    """
+    Agrégats d'une série journalière en mémoire (ex: prix déjà convertis
+    dans une devise), au format de series()
+
+    Args:
+        points: [{"date": date, "price_mru": float}] triés par date
+
+    Returns:
+        list[dict]: [{"date", "price_mru", "open", "high", "low", "avg", "count"}]
+    """
+    result = []
+    total = 0.0
+    for point in points:
+        start = period_start(point["date"], resolution)
+        price = float(point["price_mru"])
+        if not result or result[-1]["date"] != start:
+            result.append({"date": start, "open": price, "high": price, "low": price, "count": 0})
+            total = 0.0
+        bucket = result[-1]
+        bucket["price_mru"] = price
+        bucket["high"] = max(bucket["high"], price)
+        bucket["low"] = min(bucket["low"], price)
+        bucket["count"] += 1
+        total += price
+        bucket["avg"] = total / bucket["count"]
+    return result
@@ -0,0 +1,162 @@
+"""
+Routage des lectures analytiques vers les réplicas PostgreSQL
+
+Les lectures ne partent vers un réplica qu'à l'intérieur d'un bloc
+replica_reads() (comparaison, prédiction, exports, tableau de bord); tout le
+reste (scraper, admin, écritures) reste sur le primaire. Après une écriture
+dans la même requête, les lectures suivantes restent sur le primaire
+(read-your-writes). Un réplica dont le retard (dernier Price.updated_at)
+dépasse REPLICA_MAX_LAG est écarté.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+
+logger = logging.getLogger(__name__)
+
+
+_use_replica = ContextVar("use_replica", default=False)
+_pinned = ContextVar("pinned_to_primary", default=False)
+
+_lag_cache = {}
+_lag_lock = threading.Lock()
+
+
+def replica_aliases():
+    """Alias des bases réplicas configurées (POSTGRES_REPLICA_HOSTS)"""
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+class replica_reads(ContextDecorator):
+    """
+    Autorise les lectures sur réplica (bloc with, ou décorateur de fonction
+    synchrone ou de vue async: la portée couvre toute la coroutine)
+    """
+
+    def __enter__(self):
+        self._token = _use_replica.set(True)
+        return self
+
+    def __exit__(self, *exc):
+        _use_replica.reset(self._token)
+        return False
+
+    def _recreate_cm(self):
+        # Une instance par appel: un décorateur partagé entre requêtes concurrentes
+        return type(self)()
+
+    def __call__(self, func):
+        if not iscoroutinefunction(func):
+            return super().__call__(func)
+
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            with self._recreate_cm():
+                return await func(*args, **kwargs)
+        return inner
+
+
+@contextmanager
+def request_scope():
+    """Portée d'une requête: l'épinglage au primaire repart de zéro"""
+    token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def pin_to_primary():
+    """Force les lectures suivantes de la portée courante sur le primaire"""
+    _pinned.set(True)
+
+
+def replica_lag(alias):
+    """
+    Retard d'un réplica en secondes: écart entre le dernier Price.updated_at
+    du primaire et celui du réplica (None si le réplica est injoignable)
+    """
+    from .models import Price
+
+    try:
+        primary = Price.objects.using("default").aggregate(last=Max("updated_at"))["last"]
+        replica = Price.objects.using(alias).aggregate(last=Max("updated_at"))["last"]
+    except Exception as e:
+        logger.warning(f"⚠️ Réplica {alias} injoignable: {e}")
+        connections[alias].close()
+        return None
+    if primary is None:
+        return 0.0
+    if replica is None:
+        return float("inf")
+    return max(0.0, (primary - replica).total_seconds())
+
+
+def healthy_replicas():
+    """Réplicas dont le retard est acceptable (vérification mise en cache)"""
+    now = time.monotonic()
+    healthy = []
+    for alias in replica_aliases():
+        with _lag_lock:
+            checked_at, lag = _lag_cache.get(alias, (None, None))
+        if checked_at is None or now - checked_at > settings.REPLICA_LAG_CHECK_INTERVAL:
+            lag = replica_lag(alias)
+            with _lag_lock:
+                _lag_cache[alias] = (now, lag)
+            if lag is not None and lag > settings.REPLICA_MAX_LAG:
+                logger.warning(f"⚠️ Réplica {alias} écarté (retard: {lag:.0f}s)")
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            healthy.append(alias)
+    return healthy
+
+
+class ReplicaRouter:
+    """Lectures analytiques vers les réplicas, écritures et le reste vers le primaire"""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or _pinned.get():
+            return "default"
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else "default"
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données sur le primaire et les réplicas
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaPinningMiddleware:
+    """Réinitialise l'épinglage au primaire au début de chaque requête (WSGI ou ASGI)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_scope():
+            return await self.get_response(request)
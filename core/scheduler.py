@@ -0,0 +1,358 @@
+"""
+Planificateur des tâches de fond (scraping, maintenance)
+
+Chaque tâche est une commande de gestion lancée selon une expression cron
+(5 champs, fuseau TIME_ZONE). Un seul processus, parmi tous les réplicas
+web et workers, exécute les tâches: le leader, qui détient le verrou
+consultatif PostgreSQL pg_try_advisory_lock sur une connexion dédiée (le
+verrou tombe avec la connexion si le processus meurt; un autre le reprend
+au tour suivant). Les autres processus restent en attente.
+
+- Gigue: chaque échéance est décalée d'un délai aléatoire (0 à
+  SCHEDULER_JITTER secondes), identique dans tous les processus.
+- Rattrapage: une échéance manquée (arrêt, redémarrage) est exécutée dès
+  la reprise si elle date de moins de SCHEDULER_CATCHUP secondes; plusieurs
+  échéances manquées ne donnent qu'une exécution.
+- Une échéance est réservée en base (ScheduledJob.last_slot) avant
+  exécution: jamais deux exécutions pour la même échéance.
+"""
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import time as dtime
+
+import psycopg
+from django.core.management import call_command
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .db import direct_connection_params
+from .models import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+JITTER = int(os.getenv("SCHEDULER_JITTER", 60))
+CATCHUP = int(os.getenv("SCHEDULER_CATCHUP", 6 * 3600))
+
+
+def _parse_field(text, low, high):
+    """Valeurs d'un champ cron: *, n, a-b, liste a,b et pas /n"""
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+            if step < 1:
+                raise ValueError(f"pas invalide: {text}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(bound) for bound in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"valeur hors limites [{low}-{high}]: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """Expression cron (minute heure jour mois jour_semaine) ou alias @daily..."""
+
+    ALIASES = {
+        "@hourly": "0 * * * *",
+        "@daily": "0 0 * * *",
+        "@weekly": "0 0 * * 0",
+        "@monthly": "0 0 1 * *",
+    }
+    # Recherche d'échéance bornée (29 février compris)
+    SEARCH_DAYS = 5 * 366
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = self.ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Expression cron invalide: {expression!r} (5 champs attendus)")
+        try:
+            minutes = _parse_field(fields[0], 0, 59)
+            hours = _parse_field(fields[1], 0, 23)
+            self.days = _parse_field(fields[2], 1, 31)
+            self.months = _parse_field(fields[3], 1, 12)
+            # 0 et 7: dimanche
+            self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7)}
+        except ValueError as e:
+            raise ValueError(f"Expression cron invalide: {expression!r} ({e})")
+        self.times = sorted((hour, minute) for hour in hours for minute in minutes)
+        # Comme cron: si jour du mois et jour de semaine sont tous deux
+        # restreints, l'un OU l'autre suffit
+        self._any_day = fields[2].startswith("*")
+        self._any_weekday = fields[4].startswith("*")
+
+    def __str__(self):
+        return self.expression
+
+    def matches_day(self, day):
+        if day.month not in self.months:
+            return False
+        in_month = day.day in self.days
+        in_week = day.isoweekday() % 7 in self.weekdays
+        if self._any_day:
+            return in_week
+        if self._any_weekday:
+            return in_month
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """Première échéance strictement après `moment` (None si aucune)"""
+        local = timezone.localtime(moment).replace(second=0, microsecond=0, tzinfo=None)
+        start = local + timedelta(minutes=1)
+        for offset in range(self.SEARCH_DAYS):
+            day = start.date() + timedelta(days=offset)
+            if not self.matches_day(day):
+                continue
+            for hour, minute in self.times:
+                candidate = datetime.combine(day, dtime(hour, minute))
+                if candidate >= start:
+                    return timezone.make_aware(candidate)
+        return None
+
+    def previous(self, moment):
+        """Dernière échéance à `moment` ou avant (None si aucune)"""
+        local = timezone.localtime(moment).replace(second=0, microsecond=0, tzinfo=None)
+        for offset in range(self.SEARCH_DAYS):
+            day = local.date() - timedelta(days=offset)
+            if not self.matches_day(day):
+                continue
+            for hour, minute in reversed(self.times):
+                candidate = datetime.combine(day, dtime(hour, minute))
+                if candidate <= local:
+                    return timezone.make_aware(candidate)
+        return None
+
+
+class Job:
+    """Tâche planifiée: commande de gestion lancée selon une expression cron"""
+
+    def __init__(self, name, schedule, command, options=None, jitter=None, catchup=None):
+        self.name = name
+        self.cron = CronExpression(schedule)
+        self.command = command
+        self.options = options or {}
+        self.jitter = JITTER if jitter is None else jitter
+        self.catchup = CATCHUP if catchup is None else catchup
+
+    def delay(self, slot):
+        """Gigue (s) d'une échéance, la même dans tous les processus"""
+        return random.Random(f"{self.name}:{slot.isoformat()}").uniform(0, self.jitter)
+
+    def run(self):
+        call_command(self.command, **self.options)
+
+
+def default_jobs():
+    """
+    Tâches du projet; chaque horaire est surchargeable par variable
+    d'environnement (`off` désactive la tâche)
+    """
+    specs = [
+        ("scrape_prices", "SCHEDULE_SCRAPE_PRICES", "0 8 * * *", "scrape_prices", {"sync": True}),
+        ("scrape_yahoo_today", "SCHEDULE_SCRAPE_YAHOO", "30 8 * * *", "scrape_yahoo_today", {"days": 3}),
+        ("manage_price_partitions", "SCHEDULE_PRICE_PARTITIONS", "0 3 1 * *", "manage_price_partitions", {}),
+    ]
+    jobs = []
+    for name, variable, default, command, options in specs:
+        schedule = os.getenv(variable, default)
+        if schedule.strip().lower() != "off":
+            jobs.append(Job(name, schedule, command, options))
+    return jobs
+
+
+class Scheduler:
+    """Boucle du planificateur: élection du leader, échéances et rattrapage"""
+
+    LOCK_NAME = "core.scheduler"
+    POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", 30))
+
+    def __init__(self, jobs=None, poll_interval=None):
+        self.jobs = default_jobs() if jobs is None else jobs
+        self.poll_interval = poll_interval or self.POLL_INTERVAL
+        self.stop_event = threading.Event()
+        self._lock_conn = None
+
+    @property
+    def is_leader(self):
+        return self._lock_conn is not None or connection.vendor != "postgresql"
+
+    def acquire_leadership(self):
+        """
+        Prend ou conserve le rôle de leader
+
+        Returns:
+            bool: True si ce processus est le leader (toujours vrai hors
+                  PostgreSQL: un seul processus en développement)
+        """
+        if connection.vendor != "postgresql":
+            return True
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.execute("SELECT 1")
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ Connexion du verrou perdue, leadership abandonné: {e}")
+                self.release_leadership()
+
+        conn = None
+        try:
+            conn = psycopg.connect(autocommit=True, **direct_connection_params())
+            acquired = conn.execute(
+                "SELECT pg_try_advisory_lock(hashtext(%s))", [self.LOCK_NAME]
+            ).fetchone()[0]
+        except Exception as e:
+            logger.warning(f"⚠️ Élection du leader impossible: {e}")
+            acquired = False
+        if not acquired:
+            if conn is not None:
+                conn.close()
+            return False
+        self._lock_conn = conn
+        logger.info(f"👑 Leader du planificateur (pid {os.getpid()})")
+        return True
+
+    def release_leadership(self):
+        """Rend le verrou (fermer la session le libère)"""
+        if self._lock_conn is None:
+            return
+        try:
+            self._lock_conn.close()
+        except Exception:
+            pass
+        self._lock_conn = None
+
+    def run_pending(self, now=None):
+        """
+        Exécute les tâches dont l'échéance (gigue comprise) est passée
+
+        Returns:
+            int: nombre de tâches exécutées
+        """
+        now = now or timezone.now()
+        executed = 0
+        for job in self.jobs:
+            if self.stop_event.is_set():
+                break
+            slot = job.cron.previous(now)
+            if slot is None:
+                continue
+            state, _ = ScheduledJob.objects.get_or_create(
+                name=job.name, defaults={"schedule": job.cron.expression}
+            )
+            if state.last_slot and slot <= state.last_slot:
+                continue
+
+            if (now - slot).total_seconds() > job.catchup:
+                # Échéance manquée trop ancienne: ignorée, la suivante sera tenue
+                if self.claim(job, slot, status="skipped"):
+                    logger.warning(f"⏭️ {job.name}: échéance {slot:%Y-%m-%d %H:%M} trop ancienne, ignorée")
+                continue
+            if now < slot + timedelta(seconds=job.delay(slot)):
+                continue
+            if self.claim(job, slot):
+                self.execute(job, slot)
+                executed += 1
+        return executed
+
+    def claim(self, job, slot, status="running"):
+        """Réserve une échéance (False si déjà tenue par un autre processus)"""
+        updates = {"last_slot": slot, "status": status, "schedule": job.cron.expression}
+        if status == "running":
+            updates["started_at"] = timezone.now()
+        claimed = ScheduledJob.objects.filter(
+            Q(last_slot__isnull=True) | Q(last_slot__lt=slot), name=job.name
+        ).update(**updates)
+        return claimed == 1
+
+    def execute(self, job, slot):
+        """Lance une tâche et enregistre son résultat"""
+        logger.info(f"⏰ {job.name}: échéance {slot:%Y-%m-%d %H:%M} ({job.command})")
+        started = time.monotonic()
+        status, error = "success", ""
+        try:
+            job.run()
+        except Exception as e:
+            status, error = "failed", str(e)
+            logger.error(f"❌ {job.name}: {e}")
+        finally:
+            close_old_connections()
+        duration = time.monotonic() - started
+        ScheduledJob.objects.filter(name=job.name).update(
+            status=status,
+            error=error,
+            finished_at=timezone.now(),
+            duration=duration,
+            run_count=F("run_count") + 1,
+        )
+        if status == "success":
+            logger.info(f"✅ {job.name} terminé en {duration:.1f}s")
+
+    def next_wakeup(self, now=None):
+        """Attente (s) jusqu'à la prochaine échéance, bornée par POLL_INTERVAL"""
+        now = now or timezone.now()
+        wait = self.poll_interval
+        for job in self.jobs:
+            slot = job.cron.next_after(now)
+            if slot is not None:
+                due = slot + timedelta(seconds=job.delay(slot))
+                wait = min(wait, (due - now).total_seconds())
+        return max(wait, 1)
+
+    def run(self, once=False):
+        """
+        Boucle principale jusqu'à l'arrêt (SIGTERM/SIGINT)
+
+        Args:
+            once: Un seul tour (exécute les tâches échues si leader) puis s'arrête
+        """
+        self.install_signal_handlers()
+        logger.info(f"🚀 Planificateur démarré ({len(self.jobs)} tâches)")
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    if self.acquire_leadership():
+                        self.run_pending()
+                except Exception as e:
+                    logger.error(f"❌ Erreur du planificateur: {e}")
+                    if once:
+                        raise
+                finally:
+                    close_old_connections()
+                if once:
+                    break
+                self.stop_event.wait(self.next_wakeup() if self.is_leader else self.poll_interval)
+        finally:
+            self.release_leadership()
+        logger.info("🛑 Planificateur arrêté")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def install_signal_handlers(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+
+def start_in_background():
+    """
+    Planificateur dans un thread démon (processus web, SCHEDULER_AUTOSTART=1):
+    le démarrage n'attend jamais une tâche, et seul le leader en exécute
+    """
+    scheduler = Scheduler()
+    threading.Thread(target=scheduler.run, name="scheduler", daemon=True).start()
+    return scheduler
@@ -0,0 +1,196 @@
+"""
+Backends de lecture des prix (séries et agrégats)
+
+PRICE_READ_BACKEND choisit la source des lectures analytiques:
+- postgres: base principale (défaut)
+- mongo: copie MongoDB, agrégats calculés par pipeline côté serveur
+
+En cas d'erreur MongoDB, la lecture est rejouée sur PostgreSQL et MongoDB
+est ignoré pendant PRICE_READ_MONGO_COOLDOWN secondes.
+"""
+import logging
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Min
+
+from ..models import Price
+
+logger = logging.getLogger(__name__)
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+class PostgresPriceBackend:
+    """Lectures sur la base PostgreSQL principale"""
+
+    name = "postgres"
+
+    def series(self, asset_code, start=None, end=None, limit=None, newest_first=False):
+        """
+        Série de prix d'un actif
+
+        Returns:
+            list[dict]: [{"date": date, "price_mru": float}, ...]
+        """
+        prices = Price.objects.filter(asset__code=asset_code)
+        if start:
+            prices = prices.filter(date__gte=start)
+        if end:
+            prices = prices.filter(date__lte=end)
+        prices = prices.order_by("-date" if newest_first else "date")
+        if limit:
+            prices = prices[:limit]
+        return [
+            {"date": day, "price_mru": float(price)}
+            for day, price in prices.values_list("date", "price_mru")
+        ]
+
+    def window_stats(self, asset_codes, start=None, end=None):
+        """
+        Min / max / moyenne / nombre de prix par actif sur une fenêtre
+
+        Returns:
+            dict: {code: {"min", "max", "avg", "count"}}
+        """
+        prices = Price.objects.filter(asset__code__in=list(asset_codes))
+        if start:
+            prices = prices.filter(date__gte=start)
+        if end:
+            prices = prices.filter(date__lte=end)
+        rows = prices.order_by().values("asset__code").annotate(
+            low=Min("price_mru"), high=Max("price_mru"),
+            mean=Avg("price_mru"), n=Count("id"),
+        )
+        return {
+            row["asset__code"]: {
+                "min": float(row["low"]),
+                "max": float(row["high"]),
+                "avg": float(row["mean"]),
+                "count": row["n"],
+            }
+            for row in rows
+        }
+
+    def latest(self, asset_codes):
+        """
+        Dernier prix connu de chaque actif
+
+        Returns:
+            dict: {code: {"date": date, "price_mru": float}}
+        """
+        rows = Price.objects.filter(asset__code__in=list(asset_codes)).order_by(
+            "asset__code", "-date"
+        ).distinct("asset__code").values_list("asset__code", "date", "price_mru")
+        return {
+            code: {"date": day, "price_mru": float(price)}
+            for code, day, price in rows
+        }
+
+
+class MongoPriceBackend:
+    """Lectures sur la copie MongoDB (pipelines d'agrégation)"""
+
+    name = "mongo"
+
+    def _layout(self):
+        from sync.layouts import get_layout
+        from sync.mongo_client import MONGO_DB, get_client
+
+        return get_layout(get_client()[MONGO_DB])
+
+    def series(self, asset_code, start=None, end=None, limit=None, newest_first=False):
+        layout = self._layout()
+        pipeline = layout.points_pipeline(asset_code, start, end)
+        pipeline.append({"$sort": {"date": -1 if newest_first else 1}})
+        if limit:
+            pipeline.append({"$limit": limit})
+        return [
+            {"date": _as_date(doc["date"]), "price_mru": doc["price_mru"]}
+            for doc in layout.collection.aggregate(pipeline)
+        ]
+
+    def window_stats(self, asset_codes, start=None, end=None):
+        layout = self._layout()
+        pipeline = layout.points_pipeline(list(asset_codes), start, end) + [
+            {"$group": {
+                "_id": "$asset_code",
+                "min": {"$min": "$price_mru"},
+                "max": {"$max": "$price_mru"},
+                "avg": {"$avg": "$price_mru"},
+                "count": {"$sum": 1},
+            }},
+        ]
+        return {
+            doc.pop("_id"): doc
+            for doc in layout.collection.aggregate(pipeline)
+        }
+
+    def latest(self, asset_codes):
+        layout = self._layout()
+        # Tri (asset_code, date) couvert par l'index unique du schéma flat
+        pipeline = layout.points_pipeline(list(asset_codes)) + [
+            {"$sort": {"asset_code": 1, "date": -1}},
+            {"$group": {
+                "_id": "$asset_code",
+                "date": {"$first": "$date"},
+                "price_mru": {"$first": "$price_mru"},
+            }},
+        ]
+        return {
+            doc["_id"]: {"date": _as_date(doc["date"]), "price_mru": doc["price_mru"]}
+            for doc in layout.collection.aggregate(pipeline)
+        }
+
+
+class FallbackPriceReader:
+    """Lit via le backend configuré, avec repli sur PostgreSQL"""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.disabled_until = 0
+
+    def _read(self, method, *args, **kwargs):
+        if self.primary is not self.fallback and time.monotonic() >= self.disabled_until:
+            try:
+                return getattr(self.primary, method)(*args, **kwargs)
+            except Exception as e:
+                self.disabled_until = time.monotonic() + settings.PRICE_READ_MONGO_COOLDOWN
+                logger.warning(
+                    f"⚠️ Lecture {self.primary.name} indisponible ({e}), "
+                    f"repli sur {self.fallback.name}"
+                )
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    def series(self, *args, **kwargs):
+        return self._read("series", *args, **kwargs)
+
+    def window_stats(self, *args, **kwargs):
+        return self._read("window_stats", *args, **kwargs)
+
+    def latest(self, *args, **kwargs):
+        return self._read("latest", *args, **kwargs)
+
+
+BACKENDS = {
+    "postgres": PostgresPriceBackend,
+    "mongo": MongoPriceBackend,
+}
+
+_postgres = PostgresPriceBackend()
+_readers = {}
+
+
+def get_price_reader(name=None):
+    """Lecteur de prix du backend demandé (défaut: PRICE_READ_BACKEND)"""
+    name = name or settings.PRICE_READ_BACKEND
+    if name not in _readers:
+        if name not in BACKENDS:
+            raise ValueError(f"Backend de lecture inconnu: {name}")
+        primary = _postgres if name == "postgres" else BACKENDS[name]()
+        _readers[name] = FallbackPriceReader(primary, _postgres)
+    return _readers[name]
@@ -1,13 +1,24 @@
-from django.db.models import Q
-from ..models import Asset, Price
+from asgiref.sync import sync_to_async
+
+from .. import rollups
+from ..aio import gather_map
+from ..registry import AssetRegistry
+from ..routers import replica_reads
+from .backends import get_price_reader
+from .crossrate import CrossRate, rollup_series
 from datetime import timedelta
+from functools import partial
 from django.utils import timezone
 
 
+@replica_reads()
 def compare_assets(asset_codes, days=30):
     """
     Compare les prix de plusieurs actifs sur une période
     
+    Les agrégats (min, max, moyenne) sont calculés par le backend de
+    lecture (SQL ou pipeline MongoDB), pas en Python.
+    
     Args:
         asset_codes: liste des codes d'actifs
         days: nombre de jours à comparer
@@ -16,27 +27,112 @@ def compare_assets(asset_codes, days=30):
         dict: données de comparaison
     """
     start_date = timezone.now().date() - timedelta(days=days)
-    assets = Asset.objects.filter(code__in=asset_codes)
+    assets = [asset for asset in map(AssetRegistry.get, asset_codes) if asset is not None]
+    reader = get_price_reader()
+    stats = reader.window_stats([asset.code for asset in assets], start=start_date)
     
     comparison = {}
     for asset in assets:
-        prices = Price.objects.filter(
+        if asset.code not in stats:
+            continue
+        comparison[asset.code] = dict(
+            stats[asset.code],
             asset=asset,
-            date__gte=start_date
-        ).order_by('date')
-        
-        if prices:
-            comparison[asset.code] = {
-                'asset': asset,
-                'prices': list(prices),
-                'min': prices.order_by('price_mru').first(),
-                'max': prices.order_by('-price_mru').first(),
-                'avg': sum(p.price_mru for p in prices) / len(prices),
-            }
+            prices=reader.series(asset.code, start=start_date),
+        )
     
     return comparison
 
 
+@replica_reads()
+def compare_recent(assets, limit=365, days=None, quote=None):
+    """
+    Derniers prix (au plus `limit`) ou prix des `days` derniers jours, et
+    statistiques de chaque actif
+    
+    Sur une longue période, les agrégats semaine / mois (PriceRollup)
+    remplacent les prix journaliers (rollups.choose_resolution).
+    
+    Args:
+        assets: actifs à comparer
+        limit: nombre maximum de prix par actif (sans `days`)
+        days: période en jours (optionnel)
+        quote: devise de cotation (défaut MRU, voir services.crossrate)
+    
+    Returns:
+        dict: {code: {"asset", "resolution", "current_price", "min", "max", "avg",
+               "dates", "values"}}
+    """
+    plan = _plan_recent(assets, limit, days, quote)
+    return _collect(_summarize(plan, asset) for asset in plan["assets"])
+
+
+@replica_reads()
+async def acompare_recent(assets, limit=365, days=None, quote=None):
+    """compare_recent pour les vues async: séries des actifs lues en parallèle"""
+    plan = await sync_to_async(_plan_recent)(assets, limit, days, quote)
+    return _collect(await gather_map(partial(_summarize, plan), plan["assets"]))
+
+
+def _plan_recent(assets, limit, days, quote):
+    """Résolution, agrégats et cours de la devise communs à tous les actifs"""
+    assets = list(assets)
+    resolution = rollups.choose_resolution(days) if days else "day"
+    start_date = timezone.now().date() - timedelta(days=days) if days else None
+    # Cours de la devise chargés une fois pour tous les actifs (depuis le
+    # début de la première période pour les agrégats)
+    fx_start = rollups.period_start(start_date, resolution) if resolution != "day" else start_date
+    fx = CrossRate(quote, start=fx_start)
+    by_asset = None
+    if resolution != "day":
+        # Agrégats déjà exprimés dans la devise (prix convertis avant agrégation)
+        by_asset = rollup_series([asset.id for asset in assets], resolution, start_date, fx)
+    return {
+        "assets": assets,
+        "limit": limit,
+        "resolution": resolution,
+        "start_date": start_date,
+        "by_asset": by_asset,
+        "reader": get_price_reader(),
+        "fx": fx,
+    }
+
+
+def _summarize(plan, asset):
+    """Série convertie et statistiques d'un actif (None sans prix)"""
+    resolution, start_date, reader = plan["resolution"], plan["start_date"], plan["reader"]
+    if resolution != "day":
+        series = plan["by_asset"][asset.id]
+    else:
+        if start_date:
+            series = reader.series(asset.code, start=start_date)
+        else:
+            series = reader.series(asset.code, limit=plan["limit"], newest_first=True)
+            series.reverse()
+        series = plan["fx"].convert(series)
+    if not series:
+        return None
+    values = [point["price_mru"] for point in series]
+    # Agrégats: extrêmes de chaque période, moyenne pondérée par le nombre de prix
+    counts = [point.get("count", 1) for point in series]
+    means = [point.get("avg", point["price_mru"]) for point in series]
+    return asset.code, {
+        "asset": asset,
+        "resolution": resolution,
+        "current_price": values[-1],
+        "min": min(point.get("low", point["price_mru"]) for point in series),
+        "max": max(point.get("high", point["price_mru"]) for point in series),
+        "avg": sum(m * c for m, c in zip(means, counts)) / sum(counts),
+        "dates": [str(point["date"]) for point in series],
+        "values": values,
+    }
+
+
+def _collect(summaries):
+    """{code: statistiques} dans l'ordre des actifs"""
+    return dict(summary for summary in summaries if summary is not None)
+
+
 def calculate_variation(current_price, previous_price):
     """Calcule la variation en pourcentage"""
     if not previous_price or previous_price == 0:
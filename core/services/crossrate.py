@@ -0,0 +1,185 @@
+"""
+Taux croisés: séries d'un actif exprimées dans une devise de cotation
+
+Les prix sont stockés en MRU. Un actif coté dans une devise (USD, EUR, CNY)
+s'obtient en divisant son prix MRU par le cours MRU de la devise à la même
+date; à défaut de cours ce jour-là, le dernier cours connu s'applique
+(jointure « as-of », un seul passage sur les deux séries triées).
+Les cours de la devise et les séries converties sont mis en cache par
+(actif, devise, plage).
+
+En semaine / mois, chaque prix journalier est converti à son propre cours
+avant agrégation (rollup_series): convertir les agrégats MRU au cours du
+début de période fausserait clôture, extrêmes et moyenne.
+"""
+import os
+from bisect import bisect_right
+
+from django.core.cache import cache
+
+from .. import rollups
+from ..models import Price
+from ..registry import AssetRegistry
+
+BASE = "MRU"
+QUOTE_CATEGORY = "fx"
+CACHE_TTL = int(os.getenv("CROSSRATE_CACHE_TTL", 60))
+# Champs de prix convertis (agrégats semaine / mois compris)
+PRICE_FIELDS = ("price_mru", "open", "high", "low", "avg")
+
+
+def available_quotes():
+    """Devises de cotation proposées: MRU puis les devises suivies"""
+    return [BASE] + [asset.code for asset in AssetRegistry.all(QUOTE_CATEGORY)]
+
+
+def normalize_quote(quote):
+    """Devise de cotation valide (MRU par défaut)"""
+    quote = (quote or BASE).upper()
+    return quote if quote in available_quotes() else BASE
+
+
+class CrossRate:
+    """Cours MRU d'une devise de cotation à partir d'une date"""
+
+    def __init__(self, quote, start=None):
+        self.quote = normalize_quote(quote)
+        self.dates, self.rates = ([], []) if self.quote == BASE else self._load(self.quote, start)
+
+    @staticmethod
+    def _load(quote, start):
+        key = f"crossrate:rates:{quote}:{start}"
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        asset = AssetRegistry.get(quote)
+        prices = Price.objects.filter(asset=asset)
+        rows = []
+        if start:
+            # Dernier cours avant la plage: base de la jointure as-of
+            before = prices.filter(date__lt=start).order_by("-date").values_list("date", "price_mru").first()
+            if before:
+                rows.append(before)
+            prices = prices.filter(date__gte=start)
+        rows.extend(prices.order_by("date").values_list("date", "price_mru"))
+
+        series = ([day for day, _ in rows], [float(rate) for _, rate in rows])
+        cache.set(key, series, CACHE_TTL)
+        return series
+
+    @property
+    def identity(self):
+        return self.quote == BASE
+
+    def rate(self, day):
+        """Dernier cours connu à `day` (None avant le premier cours)"""
+        if self.identity:
+            return 1.0
+        index = bisect_right(self.dates, day)
+        return self.rates[index - 1] if index else None
+
+    def price(self, value, day):
+        """Prix MRU converti à une date (None sans cours)"""
+        rate = self.rate(day)
+        return float(value) / rate if rate else None
+
+    def convert(self, points):
+        """
+        Convertit une série triée par date (jointure as-of en un passage)
+
+        Les points antérieurs au premier cours de la devise sont écartés.
+
+        Args:
+            points: [{"date": date, "price_mru": float, ...}]
+
+        Returns:
+            list[dict]: mêmes points, champs de prix convertis
+        """
+        if self.identity:
+            return points
+        converted = []
+        index, count, rate = 0, len(self.dates), None
+        for point in points:
+            while index < count and self.dates[index] <= point["date"]:
+                rate = self.rates[index]
+                index += 1
+            if not rate:
+                continue
+            converted.append(dict(
+                point,
+                **{field: float(point[field]) / rate for field in PRICE_FIELDS if field in point},
+            ))
+        return converted
+
+
+def rollup_series(asset_ids, resolution, start, fx):
+    """
+    Agrégats semaine / mois de plusieurs actifs dans la devise de `fx`
+
+    En MRU, lecture directe de PriceRollup; sinon agrégation des prix
+    journaliers convertis chacun au cours de sa date, mise en cache par
+    (actif, devise, résolution, début de période): seuls les actifs absents
+    du cache sont relus.
+
+    Returns:
+        dict: {asset_id: [{"date", "price_mru", "open", "high", "low", "avg", "count"}]}
+    """
+    if fx.identity:
+        return rollups.series(asset_ids, resolution, start=start)
+
+    first = rollups.period_start(start, resolution) if start else None
+    keys = {
+        asset_id: f"crossrate:rollup:{asset_id}:{fx.quote}:{resolution}:{first}"
+        for asset_id in asset_ids
+    }
+    cached = cache.get_many(list(keys.values()))
+    result = {asset_id: cached[key] for asset_id, key in keys.items() if key in cached}
+    missing = [asset_id for asset_id in asset_ids if asset_id not in result]
+    if missing:
+        days = {asset_id: [] for asset_id in missing}
+        prices = Price.objects.filter(asset_id__in=missing)
+        if first:
+            prices = prices.filter(date__gte=first)
+        rows = prices.order_by("asset_id", "date").values_list("asset_id", "date", "price_mru")
+        for asset_id, day, price in rows.iterator(chunk_size=5000):
+            days[asset_id].append({"date": day, "price_mru": price})
+        computed = {
+            asset_id: rollups.aggregate(fx.convert(points), resolution)
+            for asset_id, points in days.items()
+        }
+        cache.set_many({keys[asset_id]: points for asset_id, points in computed.items()}, CACHE_TTL)
+        result.update(computed)
+    return {asset_id: result[asset_id] for asset_id in asset_ids}
+
+
+def history(asset, resolution, start, quote=BASE):
+    """
+    Historique d'un actif à une résolution (jour, semaine, mois), converti
+    dans la devise de cotation
+
+    Returns:
+        list[dict]: [{"date", "price_mru", ...}] du plus ancien au plus récent
+    """
+    quote = normalize_quote(quote)
+    key = f"crossrate:history:{asset.code}:{quote}:{resolution}:{start}"
+    if quote != BASE:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if resolution == "day":
+        points = list(
+            Price.objects.filter(asset=asset, date__gte=start).order_by("date").values("date", "price_mru")
+        )
+        if quote == BASE:
+            return points
+        points = CrossRate(quote, start).convert(points)
+    else:
+        fx = CrossRate(quote, rollups.period_start(start, resolution))
+        points = rollup_series([asset.id], resolution, start, fx)[asset.id]
+        if quote == BASE:
+            return points
+
+    cache.set(key, points, CACHE_TTL)
+    return points
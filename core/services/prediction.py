@@ -1,4 +1,5 @@
 from ..models import Price
+from ..routers import replica_reads
 from datetime import timedelta
 from django.utils import timezone
 from statistics import mean, stdev
@@ -235,6 +236,7 @@ def create_features(values, window=7):
     return features, targets
 
 
+@replica_reads()
 def predict_price(asset, days_ahead=7):
     """
     Prédiction avec Random Forest + indicateurs techniques
@@ -425,16 +427,17 @@ def predict_price(asset, days_ahead=7):
     return result
 
 
+@replica_reads()
 def get_predictions_multiple(asset_codes, days_ahead=7):
     """Récupère les prédictions pour plusieurs actifs"""
-    from ..models import Asset
+    from ..registry import AssetRegistry
     predictions = {}
     
     for code in asset_codes:
-        try:
-            asset = Asset.objects.get(code=code)
-            predictions[code] = predict_price(asset, days_ahead)
-        except Asset.DoesNotExist:
+        asset = AssetRegistry.get(code)
+        if asset is None:
             predictions[code] = {'error': f'Actif {code} non trouvé'}
+            continue
+        predictions[code] = predict_price(asset, days_ahead)
     
     return predictions
@@ -1,4 +1,6 @@
-from ..models import Price, Asset
+from ..models import Price
+from ..registry import AssetRegistry
+from .backends import get_price_reader
 from decimal import Decimal
 from django.utils import timezone
 from datetime import timedelta
@@ -12,21 +14,17 @@ def get_latest_prices(category=None):
         category: catégorie optionnelle (fx, metal, crypto)
     
     Returns:
-        list: derniers prix
+        list: [{"asset": Asset, "date": date, "price_mru": float}, ...]
     """
-    query = Price.objects.all()
+    assets = AssetRegistry.all(category)
     
-    if category:
-        query = query.filter(asset__category=category)
+    # Dernier prix de chaque actif en une seule requête / un seul pipeline
+    latest = get_price_reader().latest([asset.code for asset in assets])
     
-    # Récupérer le dernier prix pour chaque actif
-    latest_prices = []
-    for asset in Asset.objects.filter(category=category) if category else Asset.objects.all():
-        price = Price.objects.filter(asset=asset).order_by('-date').first()
-        if price:
-            latest_prices.append(price)
-    
-    return latest_prices
+    return [
+        dict(latest[asset.code], asset=asset)
+        for asset in assets if asset.code in latest
+    ]
 
 
 def get_price_history(asset_code, days=30):
@@ -59,16 +57,13 @@ def calculate_price_change(asset_code, days=7):
         dict: changement et pourcentage
     """
     start_date = timezone.now().date() - timedelta(days=days)
-    prices = Price.objects.filter(
-        asset__code=asset_code,
-        date__gte=start_date
-    ).order_by('date')
+    prices = get_price_reader().series(asset_code, start=start_date)
     
     if len(prices) < 2:
         return {'error': 'Pas assez de données'}
     
-    first_price = float(prices.first().price_mru)
-    last_price = float(prices.last().price_mru)
+    first_price = prices[0]["price_mru"]
+    last_price = prices[-1]["price_mru"]
     change = last_price - first_price
     change_percent = (change / first_price) * 100 if first_price != 0 else 0
     
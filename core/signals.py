@@ -0,0 +1,35 @@
+"""
+Signaux de l'app core
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import live, rollups
+from .models import Asset, Price, PriceDeletion
+from .outbox import enqueue_price_changes
+from .registry import AssetRegistry
+
+
+@receiver(post_save, sender=Price)
+def record_price_change(sender, instance, **kwargs):
+    """Ajoute l'écriture ORM unitaire (save, update_or_create) à l'outbox, aux agrégats et au flux SSE"""
+    code = (AssetRegistry.get_by_id(instance.asset_id) or instance.asset).code
+    enqueue_price_changes([(code, instance.date)])
+    rollups.refresh([(instance.asset_id, instance.date)])
+    live.notify_prices({(instance.asset_id, instance.date): instance.price_mru})
+
+
+@receiver(post_delete, sender=Price)
+def record_price_deletion(sender, instance, **kwargs):
+    """Enregistre une trace de suppression (dans la même transaction)"""
+    code = instance.asset.code
+    PriceDeletion.objects.create(asset_code=code, date=instance.date)
+    enqueue_price_changes([(code, instance.date)], op="delete")
+    rollups.refresh([(instance.asset_id, instance.date)])
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_delete, sender=Asset)
+def invalidate_asset_registry(sender, **kwargs):
+    """Un actif créé, modifié ou supprimé invalide le registre en mémoire"""
+    AssetRegistry.invalidate()
@@ -0,0 +1,103 @@
+"""
+Observations par source et prix canonique
+
+Chaque source (bcm, yahoo, api, init, sim) écrit ses propres observations
+(PriceObservation). À l'ingestion, le prix canonique (Price) de chaque
+(actif, date) touché est recalculé: l'observation de la source la mieux
+classée l'emporte (Asset.source_priority, sinon PRICE_SOURCE_PRIORITY).
+Les lectures interrogent directement Price, sans filtre de source. Les
+prix modifiés sont publiés aux clients SSE au commit (core.live).
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from . import live, rollups
+from .models import Price, PriceObservation
+from .outbox import enqueue_price_changes
+from .registry import AssetRegistry
+
+
+def priority_for(source_priority):
+    """Ordre des sources d'un actif (champ Asset.source_priority, vide = défaut)"""
+    custom = [source.strip() for source in (source_priority or "").split(",") if source.strip()]
+    return custom or settings.PRICE_SOURCE_PRIORITY
+
+
+def rank(priority, source):
+    """Rang d'une source (les sources absentes de la liste passent en dernier)"""
+    return priority.index(source) if source in priority else len(priority)
+
+
+def resolve(keys, propagate=True):
+    """
+    Recalcule le prix canonique des (actif, date) touchés (à appeler dans la
+    transaction d'écriture des observations)
+
+    Seuls les prix dont la valeur ou la source gagnante change sont réécrits,
+    ajoutés à l'outbox, répercutés sur les agrégats semaine / mois et
+    notifiés aux clients SSE.
+
+    Args:
+        keys: Itérable de (asset_id, date)
+        propagate: False pour un chargement en masse (restauration depuis
+            MongoDB): prix réécrits sans outbox, agrégats ni notification;
+            l'appelant recalcule les agrégats une fois à la fin
+            (rollups.rebuild)
+
+    Returns:
+        int: nombre de prix canoniques modifiés
+    """
+    days_by_asset = {}
+    for asset_id, day in keys:
+        days_by_asset.setdefault(asset_id, set()).add(day)
+    if not days_by_asset:
+        return 0
+
+    assets = {}
+    for asset_id in days_by_asset:
+        asset = AssetRegistry.get_by_id(asset_id)
+        assets[asset_id] = (asset.code, priority_for(asset.source_priority))
+    condition = Q()
+    for asset_id, days in days_by_asset.items():
+        condition |= Q(asset_id=asset_id, date__in=sorted(days))
+
+    # À rang égal (sources hors liste), l'observation la plus récente l'emporte
+    best = {}
+    observations = PriceObservation.objects.filter(condition).order_by("updated_at").values_list(
+        "asset_id", "date", "source", "price_mru"
+    )
+    for asset_id, day, source, price in observations:
+        source_rank = rank(assets[asset_id][1], source)
+        current = best.get((asset_id, day))
+        if current is None or source_rank <= current[0]:
+            best[(asset_id, day)] = (source_rank, source, price)
+
+    current = {
+        (asset_id, day): (source, price)
+        for asset_id, day, source, price in Price.objects.filter(condition).values_list(
+            "asset_id", "date", "source", "price_mru"
+        )
+    }
+    changed = {
+        key: (source, price)
+        for key, (_, source, price) in best.items()
+        if current.get(key) != (source, price)
+    }
+    if not changed:
+        return 0
+
+    Price.objects.bulk_create(
+        [
+            Price(asset_id=asset_id, date=day, source=source, price_mru=price)
+            for (asset_id, day), (source, price) in changed.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["asset", "date"],
+        update_fields=["price_mru", "source", "updated_at"],
+    )
+    if not propagate:
+        return len(changed)
+    enqueue_price_changes((assets[asset_id][0], day) for asset_id, day in changed)
+    rollups.refresh(changed)
+    live.notify_prices({key: price for key, (_, price) in changed.items()})
+    return len(changed)
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from . import aio
+from .models import Asset, Price, PriceObservation, PriceOutbox, PriceRollup
+from .registry import AssetRegistry
+
+
+class PriceTestCase(TestCase):
+    """Données de base: une devise et un métal avec quelques jours de prix"""
+
+    def setUp(self):
+        AssetRegistry.invalidate()
+        # Blocs des vues async exécutés dans le thread du test (transaction du test)
+        patcher = mock.patch.object(aio, "PARALLEL", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.today = timezone.now().date()
+        self.usd = Asset.objects.create(code="USD", label="Dollar US", category="fx")
+        self.gold = Asset.objects.create(code="GOLD", label="Or (once)", category="metal")
+        for offset in range(10):
+            day = self.today - timedelta(days=offset)
+            Price.objects.create(asset=self.usd, date=day, price_mru=Decimal("40") + offset, source="bcm")
+            Price.objects.create(asset=self.gold, date=day, price_mru=Decimal("80000") + offset, source="yahoo")
+
+
+class HomeViewTests(PriceTestCase):
+    def test_home_renders_rows(self):
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'data-asset="USD" data-date="{self.today:%Y-%m-%d}"')
+        self.assertContains(response, f'data-asset="GOLD" data-date="{self.today:%Y-%m-%d}"')
+
+
+class AssetDetailViewTests(PriceTestCase):
+    def test_detail_without_today_price_writes_nothing(self):
+        Price.objects.filter(date=self.today).delete()
+        count = Price.objects.count()
+        response = self.client.get("/asset/USD/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["display_date"], self.today)
+        self.assertEqual(Price.objects.count(), count)
+
+    def test_unknown_asset_is_404(self):
+        self.assertEqual(self.client.get("/asset/NOPE/").status_code, 404)
+
+
+class QueryBudgetTests(PriceTestCase):
+    """Nombre exact de requêtes SQL des vues (budgets de check_query_budget)"""
+
+    def test_views_match_query_budgets(self):
+        from .management.commands.check_query_budget import QUERY_BUDGETS
+
+        # Cas le plus coûteux: pas encore de prix du jour
+        Price.objects.filter(date=self.today).delete()
+        AssetRegistry.all()
+        n_assets = Asset.objects.count()
+        for name, spec in QUERY_BUDGETS.items():
+            budget = spec["base"] + spec["per_asset"] * n_assets
+            with self.subTest(view=name), self.assertNumQueries(budget):
+                response = self.client.get(spec["path"].format(code="USD"))
+                self.assertEqual(response.status_code, 200)
+
+
+class CrossRateTests(TestCase):
+    def setUp(self):
+        AssetRegistry.invalidate()
+        cache.clear()
+        self.usd = Asset.objects.create(code="USD", label="Dollar US", category="fx")
+        self.gold = Asset.objects.create(code="GOLD", label="Or (once)", category="metal")
+        # Cours du dollar croissant dans le mois, or constant en MRU
+        for day in range(1, 11):
+            Price.objects.create(asset=self.usd, date=date(2024, 3, day), price_mru=Decimal(30 + day), source="bcm")
+            Price.objects.create(asset=self.gold, date=date(2024, 3, day), price_mru=Decimal("80000"), source="yahoo")
+
+    def test_month_points_convert_each_day_at_its_rate(self):
+        from .services import crossrate
+
+        [point] = crossrate.history(self.gold, "month", date(2024, 3, 1), "USD")
+        self.assertEqual(point["date"], date(2024, 3, 1))
+        self.assertAlmostEqual(point["open"], 80000 / 31)
+        self.assertAlmostEqual(point["price_mru"], 80000 / 40)
+        self.assertAlmostEqual(point["high"], 80000 / 31)
+        self.assertAlmostEqual(point["low"], 80000 / 40)
+        self.assertAlmostEqual(point["avg"], sum(80000 / (30 + day) for day in range(1, 11)) / 10)
+        self.assertEqual(point["count"], 10)
+
+    def test_converted_rollups_are_cached(self):
+        from .services import crossrate
+
+        fx = crossrate.CrossRate("USD", date(2024, 3, 1))
+        first = crossrate.rollup_series([self.gold.id], "week", date(2024, 3, 1), fx)
+        with self.assertNumQueries(0):
+            again = crossrate.rollup_series([self.gold.id], "week", date(2024, 3, 1), fx)
+        self.assertEqual(again, first)
+
+    def test_rate_is_as_of_last_known_day(self):
+        from .services import crossrate
+
+        fx = crossrate.CrossRate("USD", date(2024, 3, 1))
+        self.assertEqual(fx.rate(date(2024, 3, 5)), 35.0)
+        self.assertEqual(fx.rate(date(2024, 4, 1)), 40.0)
+        self.assertIsNone(fx.rate(date(2024, 2, 28)))
+
+
+class RestoreFromMongoTests(PriceTestCase):
+    def test_load_writes_observations_then_canonical_price(self):
+        from .management.commands.restore_from_mongo import Command
+
+        command = Command()
+        command.source = "init"
+        day = self.today - timedelta(days=30)
+        outbox, rollups = PriceOutbox.objects.count(), PriceRollup.objects.count()
+        self.assertEqual(command.load([(self.usd.id, day, Decimal("41.5000"))]), 1)
+        self.assertTrue(PriceObservation.objects.filter(asset=self.usd, date=day, source="init").exists())
+        price = Price.objects.get(asset=self.usd, date=day)
+        self.assertEqual((price.source, price.price_mru), ("init", Decimal("41.5000")))
+        # Ni outbox (pas de réécriture vers Mongo) ni agrégats par lot
+        self.assertEqual(PriceOutbox.objects.count(), outbox)
+        self.assertEqual(PriceRollup.objects.count(), rollups)
+
+
+class GatherConcurrencyTests(SimpleTestCase):
+    def test_blocks_in_flight_are_capped_across_requests(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def block(item):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return item
+
+        async def requests():
+            return await asyncio.gather(*(aio.gather_map(block, range(5)) for _ in range(3)))
+
+        with mock.patch.object(aio, "PARALLEL", True), mock.patch.object(aio, "CONCURRENCY", 2):
+            results = asyncio.run(requests())
+        self.assertEqual(results, [list(range(5))] * 3)
+        self.assertLessEqual(peak[0], 2)
@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     path("", views.home, name="home"),
     path("asset/<str:code>/", views.asset_detail, name="asset_detail"),
+    path("asset/<str:code>/export/", views.asset_export, name="asset_export"),
     path("comparison/", views.comparison_view, name="comparison"),
     path("prediction/", views.prediction_view, name="prediction"),
+    path("health/db/", views.health_db, name="health_db"),
+    path("stream/prices/", views.price_stream, name="price_stream"),
 ]
@@ -1,75 +1,89 @@
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
-from django.db import transaction
-from .models import Asset, Price
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from . import db, live, rollups
+from .aio import gather_calls, gather_map
+from .models import Asset, DailyBar, Price
+from .registry import AssetRegistry
+from .routers import replica_aliases, replica_lag, replica_reads
 from .services.pricing import get_latest_prices, get_price_history
-from .services.comparison import compare_assets, calculate_variation
+from .services import crossrate
+from .services.comparison import compare_assets, acompare_recent, calculate_variation
 from .services.prediction import predict_price, get_predictions_multiple
 from datetime import datetime, timedelta
+from functools import partial
 from django.utils import timezone
+import csv
 import json
 
 
-def home(request):
-    """Vue d'accueil avec les derniers prix et variations"""
-    assets = Asset.objects.all().order_by('category', 'code')
-    data = []
-    today = timezone.now().date()
-    yahoo_assets = {"BTC", "GOLD", "COPPER", "IRON"}
+def _get_asset_or_404(code):
+    """Actif du registre en mémoire, ou 404"""
+    asset = AssetRegistry.get(code)
+    if asset is None:
+        raise Http404(f"Actif {code} introuvable")
+    return asset
+
+
+def _home_row(asset, today):
+    """Dernier prix et variations J-1 / J-7 d'un actif"""
+    # Série canonique: la source prioritaire est résolue à l'ingestion
+    price_qs = Price.objects.filter(asset=asset)
 
-    for asset in assets:
-        price_qs = Price.objects.filter(asset=asset)
-        if asset.code in yahoo_assets:
-            price_qs = price_qs.filter(source="yahoo")
+    # Chercher d'abord le prix d'aujourd'hui
+    today_price = price_qs.filter(date=today).first()
+    
+    # Si pas de prix aujourd'hui, prendre le dernier disponible
+    if today_price:
+        last = today_price
+    else:
+        last = price_qs.order_by("-date").first()
+    
+    # Chercher les prix précédents pour les variations
+    display_date = last.date if last else None
 
-        # Chercher d'abord le prix d'aujourd'hui
-        today_price = price_qs.filter(date=today).first()
+    if last:
+        # Variation J-1 (hier)
+        yesterday = today - timedelta(days=1)
+        prev_j1 = price_qs.filter(date=yesterday).first()
         
-        # Si pas de prix aujourd'hui, prendre le dernier disponible
-        if today_price:
-            last = today_price
-        else:
-            last = price_qs.order_by("-date").first()
+        # Si pas hier, chercher les 8 derniers prix après aujourd'hui
+        if not prev_j1:
+            all_prices = price_qs.order_by("-date")[:10]
+            if len(all_prices) > 1:
+                prev_j1 = all_prices[1]
         
-        # Chercher les prix précédents pour les variations
-        display_date = last.date if last else None
-        if asset.code in yahoo_assets and not today_price and last:
-            display_date = today
-
-        if last:
-            # Variation J-1 (hier)
-            yesterday = today - timedelta(days=1)
-            prev_j1 = price_qs.filter(date=yesterday).first()
-            
-            # Si pas hier, chercher les 8 derniers prix après aujourd'hui
-            if not prev_j1:
-                all_prices = price_qs.order_by("-date")[:10]
-                if len(all_prices) > 1:
-                    prev_j1 = all_prices[1]
-            
-            variation_j1 = None
-            if prev_j1:
-                variation_j1 = calculate_variation(float(last.price_mru), float(prev_j1.price_mru))
-            
-            # Variation J-7
-            last_week = today - timedelta(days=7)
-            prev_j7 = price_qs.filter(date__lte=last_week).order_by("-date").first()
-            
-            variation_j7 = None
-            if prev_j7:
-                variation_j7 = calculate_variation(float(last.price_mru), float(prev_j7.price_mru))
-        else:
-            variation_j1 = None
-            variation_j7 = None
-
-        data.append({
-            "asset": asset,
-            "price": last,
-            "display_date": display_date,
-            "variation_j1": variation_j1,
-            "variation_j7": variation_j7,
-            "variation": variation_j1 or variation_j7,
-        })
+        variation_j1 = None
+        if prev_j1:
+            variation_j1 = calculate_variation(float(last.price_mru), float(prev_j1.price_mru))
+        
+        # Variation J-7
+        last_week = today - timedelta(days=7)
+        prev_j7 = price_qs.filter(date__lte=last_week).order_by("-date").first()
+        
+        variation_j7 = None
+        if prev_j7:
+            variation_j7 = calculate_variation(float(last.price_mru), float(prev_j7.price_mru))
+    else:
+        variation_j1 = None
+        variation_j7 = None
+
+    return {
+        "asset": asset,
+        "price": last,
+        "display_date": display_date,
+        "variation_j1": variation_j1,
+        "variation_j7": variation_j7,
+        "variation": variation_j1 or variation_j7,
+    }
+
+
+@replica_reads()
+async def home(request):
+    """Vue d'accueil avec les derniers prix et variations (actifs lus en parallèle)"""
+    assets = await sync_to_async(AssetRegistry.all)()
+    today = timezone.now().date()
+    data = await gather_map(partial(_home_row, today=today), assets)
 
     # Grouper par catégorie
     devises = [d for d in data if d['asset'].category == 'fx']
@@ -84,86 +98,98 @@ def home(request):
     })
 
 
-def asset_detail(request, code):
+@replica_reads()
+async def asset_detail(request, code):
     """Vue d?tail d'un actif avec filtres de dates"""
-    asset = get_object_or_404(Asset, code=code)
+    asset = await sync_to_async(_get_asset_or_404)(code)
     today = timezone.now().date()
-    yahoo_assets = {"BTC", "GOLD", "COPPER", "IRON"}
 
     # Filtres de dates
     days = int(request.GET.get('days', 365))  # Par d?faut 1 an
     start_date = timezone.now().date() - timedelta(days=days)
 
+    # Devise de cotation (?quote=USD): prix MRU divisés par le cours de la devise
+    quote = await sync_to_async(crossrate.normalize_quote)(request.GET.get('quote'))
+    quotes = await sync_to_async(crossrate.available_quotes)()
+
     price_qs = Price.objects.filter(asset=asset)
-    if asset.code in yahoo_assets:
-        price_qs = price_qs.filter(source="yahoo")
 
-    # Forcer un prix "aujourd'hui" si absent (copie du dernier connu)
-    today_price = price_qs.filter(date=today).first()
-    if not today_price:
-        last = price_qs.order_by("-date").first()
-        if last:
-            try:
-                with transaction.atomic():
-                    Price.objects.update_or_create(
-                        asset=asset,
-                        date=today,
-                        defaults={"price_mru": last.price_mru, "source": last.source},
-                    )
-            except Exception:
-                pass
-            today_price = price_qs.filter(date=today).first()
-
-    prices = price_qs.filter(date__gte=start_date).order_by('date')
+    # Sans prix "aujourd'hui", le dernier connu est affiché à la date du jour
+    # (lecture seule: aucun prix n'est écrit par une requête GET)
+    today_price = await price_qs.filter(date=today).afirst()
+
+    # Longue période: agrégats semaine / mois plutôt que chaque ligne journalière
+    resolution = rollups.choose_resolution(days)
+    yesterday = today - timedelta(days=1)
+
+    # Lectures indépendantes en parallèle: cours de la devise, historique,
+    # derniers prix, 7 jours et barre intrajournalière
+    fx, prices, recent, yesterday_price, last_7d, intraday = await gather_calls(
+        partial(crossrate.CrossRate, quote, start=min(start_date, today - timedelta(days=7))),
+        partial(crossrate.history, asset, resolution, start_date, quote),
+        partial(list, price_qs.order_by("-date")[:2]),
+        price_qs.filter(date=yesterday).first,
+        partial(list, price_qs.filter(date__gte=today - timedelta(days=7))),
+        DailyBar.objects.filter(asset=asset).order_by("-date").first,
+    )
 
     # Prix courant align? avec l'accueil
-    last = today_price or price_qs.order_by("-date").first()
-    current_price = float(last.price_mru) if last else 0
+    last = today_price or (recent[0] if recent else None)
+    current_price = (fx.price(last.price_mru, last.date) or 0) if last else 0
     display_date = today if (not today_price and last) else (last.date if last else None)
 
     # Variation 24h
-    yesterday = today - timedelta(days=1)
-    prev_j1 = price_qs.filter(date=yesterday).first()
-    if not prev_j1:
-        recent = price_qs.order_by("-date")[:2]
-        prev_j1 = recent[1] if len(recent) > 1 else None
-    price_change = calculate_variation(current_price, float(prev_j1.price_mru)) if prev_j1 else 0
+    prev_j1 = yesterday_price or (recent[1] if len(recent) > 1 else None)
+    price_change = calculate_variation(current_price, fx.price(prev_j1.price_mru, prev_j1.date)) if prev_j1 else 0
 
     # Min / max 7 jours
-    last_7d = price_qs.filter(date__gte=today - timedelta(days=7))
-    if last_7d.exists():
-        values_7d = [float(p.price_mru) for p in last_7d]
+    values_7d = [v for v in (fx.price(p.price_mru, p.date) for p in last_7d) if v is not None]
+    if values_7d:
         min_7d = min(values_7d)
         max_7d = max(values_7d)
     else:
         min_7d = 0
         max_7d = 0
 
+    # Range intrajournalier (dernière barre OHLC issue des ticks)
+    if intraday and not fx.identity:
+        rate = fx.rate(intraday.date)
+        if rate:
+            for field in ("open", "high", "low", "close"):
+                setattr(intraday, field, float(getattr(intraday, field)) / rate)
+        else:
+            intraday = None
+
     # Calculer min et max
     min_price = float('inf')
     max_price = 0.0
     for p in prices:
-        price_val = float(p.price_mru)
-        if price_val < min_price:
-            min_price = price_val
-        if price_val > max_price:
-            max_price = price_val
+        low = float(p.get("low", p["price_mru"]))
+        high = float(p.get("high", p["price_mru"]))
+        if low < min_price:
+            min_price = low
+        if high > max_price:
+            max_price = high
 
     if min_price == float('inf'):
         min_price = 0
 
     # Pr?parer les donn?es pour le graphique
-    chart_dates = [str(p.date) for p in prices]
-    chart_prices = [float(p.price_mru) for p in prices]
+    chart_dates = [str(p["date"]) for p in prices]
+    chart_prices = [float(p["price_mru"]) for p in prices]
 
     return render(request, "core/asset_detail.html", {
         "asset": asset,
         "prices": prices,
         "days": days,
+        "resolution": resolution,
+        "quote": quote,
+        "quotes": quotes,
         "current_price": current_price,
         "price_change": price_change,
         "min_7d": min_7d,
         "max_7d": max_7d,
+        "intraday": intraday,
         "display_date": display_date,
         "min_price": min_price,
         "max_price": max_price,
@@ -172,34 +198,76 @@ def asset_detail(request, code):
     })
 
 
-def comparison_view(request):
+EXPORT_FIELDS = ["date", "open", "high", "low", "close", "avg", "count"]
+
+
+@replica_reads()
+async def asset_export(request, code):
+    """Export CSV / JSON de l'historique d'un actif (résolution adaptée à la période)"""
+    asset = await sync_to_async(_get_asset_or_404)(code)
+    days = int(request.GET.get('days', 365))
+    export_format = request.GET.get('format', 'csv')
+    resolution = request.GET.get('resolution')
+    if resolution not in ("day",) + rollups.RESOLUTIONS:
+        resolution = rollups.choose_resolution(days)
+    start_date = timezone.now().date() - timedelta(days=days)
+    quote = await sync_to_async(crossrate.normalize_quote)(request.GET.get('quote'))
+    history = await sync_to_async(crossrate.history)(asset, resolution, start_date, quote)
+
+    # Jour: un prix par ligne (open = high = low = close); semaine / mois: agrégats
+    rows = []
+    for p in history:
+        close = float(p["price_mru"])
+        rows.append({
+            "date": str(p["date"]),
+            "open": p.get("open", close),
+            "high": p.get("high", close),
+            "low": p.get("low", close),
+            "close": close,
+            "avg": p.get("avg", close),
+            "count": p.get("count", 1),
+        })
+
+    if export_format == "json":
+        return JsonResponse({"asset": asset.code, "quote": quote, "resolution": resolution, "prices": rows})
+
+    response = HttpResponse(content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{asset.code}{quote}_{resolution}_{days}j.csv"'
+    writer = csv.DictWriter(response, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return response
+
+
+@replica_reads()
+async def comparison_view(request):
     """Vue de comparaison par catégorie"""
     category_type = request.GET.get('type', 'all')  # all, devises, metaux
+    days = int(request.GET['days']) if request.GET.get('days') else None
+    quote = await sync_to_async(crossrate.normalize_quote)(request.GET.get('quote'))
+    quotes = await sync_to_async(crossrate.available_quotes)()
     
     # Récupérer les actifs par catégorie
     if category_type == 'devises':
-        assets = Asset.objects.filter(category='fx').order_by('code')
+        assets = await sync_to_async(AssetRegistry.all)('fx')
     elif category_type == 'metaux':
-        assets = Asset.objects.filter(category='metal').order_by('code')
+        assets = await sync_to_async(AssetRegistry.all)('metal')
     else:
-        assets = Asset.objects.all().order_by('category', 'code')
+        assets = await sync_to_async(AssetRegistry.all)()
     
-    # Récupérer les données de comparaison
+    # Récupérer les données de comparaison (backend de lecture configuré,
+    # séries des actifs lues en parallèle)
     comparison = {}
-    for asset in assets:
-        prices = Price.objects.filter(asset=asset).order_by('-date')[:365]
-        
-        if prices:
-            price_values = [float(p.price_mru) for p in prices]
-            comparison[asset.code] = {
-                'asset': asset,
-                'current_price': float(prices[0].price_mru),
-                'min': min(price_values),
-                'max': max(price_values),
-                'avg': sum(price_values) / len(price_values),
-                'chart_dates': json.dumps([str(p.date) for p in reversed(prices)]),
-                'chart_prices': json.dumps([float(p.price_mru) for p in reversed(prices)]),
-            }
+    for code, item in (await acompare_recent(assets, days=days, quote=quote)).items():
+        comparison[code] = {
+            'asset': item['asset'],
+            'current_price': item['current_price'],
+            'min': item['min'],
+            'max': item['max'],
+            'avg': item['avg'],
+            'chart_dates': json.dumps(item['dates']),
+            'chart_prices': json.dumps(item['values']),
+        }
     
     # Grouper par catégorie
     devises = {k: v for k, v in comparison.items() if v['asset'].category == 'fx'}
@@ -214,20 +282,26 @@ def comparison_view(request):
         "devises": devises,
         "metaux": metaux,
         "category_type": category_type,
+        "days": days,
+        "quote": quote,
+        "quotes": quotes,
         "currencies_chart_dates": currencies_chart_dates,
     })
 
 
+@replica_reads()
 def prediction_view(request):
     """Vue de prédiction avec sélection d'actif et horizon"""
-    assets = Asset.objects.all().order_by('category', 'code')
+    assets = AssetRegistry.all()
     selected_asset_code = request.GET.get('asset', None)
     days_ahead = int(request.GET.get('days', 7))  # 7 ou 30
     
     prediction = None
     if selected_asset_code:
         try:
-            asset = Asset.objects.get(code=selected_asset_code)
+            asset = AssetRegistry.get(selected_asset_code)
+            if asset is None:
+                raise Asset.DoesNotExist(selected_asset_code)
             prediction = predict_price(asset, days_ahead)
             
             if 'predictions' in prediction:
@@ -253,8 +327,8 @@ def prediction_view(request):
 def comparison_devises_metaux(request):
     """Vue comparant devises vs matières premières"""
     # Récupérer un actif de chaque catégorie
-    devises = Asset.objects.filter(category='fx').order_by('code')
-    metaux = Asset.objects.filter(category='metal').order_by('code')
+    devises = AssetRegistry.all('fx')
+    metaux = AssetRegistry.all('metal')
     
     return render(request, "core/comparison_categories.html", {
         "devises": devises,
@@ -262,4 +336,29 @@ def comparison_devises_metaux(request):
     })
 
 
+async def health_db(request):
+    """État de la connexion PostgreSQL et du pool (supervision)"""
+    try:
+        latency = await sync_to_async(db.ping)()
+    except Exception as e:
+        stats = await sync_to_async(db.pool_stats)()
+        return JsonResponse({"status": "error", "error": str(e), "connections": stats}, status=503)
+    stats = await sync_to_async(db.pool_stats)()
+    # Retard de chaque réplica en secondes (None: injoignable), mesurés en parallèle
+    aliases = replica_aliases()
+    lags = await gather_map(replica_lag, aliases)
+    return JsonResponse({
+        "status": "ok",
+        "latency_ms": round(latency, 2),
+        "connections": stats,
+        "replicas": dict(zip(aliases, lags)),
+    })
+
 
+async def price_stream(request):
+    """Flux SSE des nouveaux prix (un événement `price` par actif mis à jour)"""
+    response = StreamingHttpResponse(live.event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Pas de mise en tampon par un proxy nginx
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -4,3 +4,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 
 application = get_asgi_application()
+
+# Planificateur dans le processus web (optionnel, thread démon): un seul
+# leader parmi tous les processus exécute les tâches
+if os.getenv("SCHEDULER_AUTOSTART") == "1":
+    from core.scheduler import start_in_background
+
+    start_in_background()
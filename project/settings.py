@@ -29,6 +29,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "core.routers.ReplicaPinningMiddleware",
 ]
 
 ROOT_URLCONF = "project.urls"
@@ -62,6 +63,45 @@ DATABASES = {
     }
 }
 
+# Connexions PostgreSQL réutilisées: pool psycopg3 (POSTGRES_POOL=1, tailles par
+# processus) ou connexions persistantes vérifiées avant réutilisation
+if os.getenv("POSTGRES_POOL", "0") == "1":
+    # Le pool rend la connexion en fin de requête: CONN_MAX_AGE doit rester à 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", 10)),
+            "max_idle": float(os.getenv("POSTGRES_POOL_MAX_IDLE", 300)),
+            "name": "mru",
+        },
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("POSTGRES_CONN_MAX_AGE", 60))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Réplicas en lecture (optionnel): "hote[:port],hote[:port]" -> alias replica1, replica2...
+# Seules les lectures analytiques (core.routers.replica_reads) y sont envoyées
+for index, replica in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1):
+    host, _, port = replica.strip().partition(":")
+    alias = f"replica{index}"
+    DATABASES[alias] = dict(
+        DATABASES["default"],
+        HOST=host,
+        PORT=port or DATABASES["default"]["PORT"],
+        TEST={"MIRROR": "default"},
+    )
+    # Pool propre à chaque alias (copie des options, nom distinct)
+    if "pool" in DATABASES["default"].get("OPTIONS", {}):
+        DATABASES[alias]["OPTIONS"] = dict(
+            DATABASES["default"]["OPTIONS"],
+            pool=dict(DATABASES["default"]["OPTIONS"]["pool"], name=f"mru-{alias}"),
+        )
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+REPLICA_MAX_LAG = float(os.getenv("POSTGRES_REPLICA_MAX_LAG", 30))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("POSTGRES_REPLICA_LAG_CHECK_INTERVAL", 10))
+
 LANGUAGE_CODE = "fr-fr"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -79,6 +119,27 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache disque des réponses brutes des sources (scraper --replay)
+SCRAPER_CACHE_DIR = Path(os.getenv("SCRAPER_CACHE_DIR", BASE_DIR / "cache" / "payloads"))
+SCRAPER_CACHE_TTLS = {
+    "bcm": int(os.getenv("SCRAPER_CACHE_TTL_BCM", 6 * 3600)),
+    "yahoo": int(os.getenv("SCRAPER_CACHE_TTL_YAHOO", 12 * 3600)),
+    "yfinance": int(os.getenv("SCRAPER_CACHE_TTL_YAHOO", 12 * 3600)),
+}
+
+# Priorité des sources pour le prix canonique (Price), de la plus fiable à la
+# moins fiable; surchargeable par actif (Asset.source_priority)
+PRICE_SOURCE_PRIORITY = [
+    source.strip()
+    for source in os.getenv("PRICE_SOURCE_PRIORITY", "bcm,yahoo,api,init,sim").split(",")
+    if source.strip()
+]
+
+# Backend de lecture des séries de prix (comparaisons, statistiques):
+# "postgres" ou "mongo" (repli automatique sur PostgreSQL si MongoDB est indisponible)
+PRICE_READ_BACKEND = os.getenv("PRICE_READ_BACKEND", "postgres")
+PRICE_READ_MONGO_COOLDOWN = int(os.getenv("PRICE_READ_MONGO_COOLDOWN", 60))
+
 # Logging
 LOGGING = {
     "version": 1,
@@ -0,0 +1,116 @@
+"""
+Backfill historique - Découpage en chunks et checkpoints de reprise
+"""
+import logging
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from core.models import BackfillProgress
+
+logger = logging.getLogger(__name__)
+
+
+# Origine fixe des bornes de chunks
+CHUNK_EPOCH = date(1970, 1, 1)
+
+
+def daterange_chunks(start_date, end_date, chunk_days=90):
+    """
+    Découpe une période en segments contigus de `chunk_days` jours max
+
+    Les bornes sont ancrées sur un calendrier fixe (multiples de chunk_days
+    depuis CHUNK_EPOCH), puis rognées à la période: d'un jour à l'autre la
+    fenêtre glisse mais les chunks intérieurs restent identiques, et les
+    checkpoints d'un backfill interrompu la veille s'appliquent encore.
+
+    Yields:
+        tuple: (chunk_start, chunk_end) inclusifs
+    """
+    offset = (start_date - CHUNK_EPOCH).days % chunk_days
+    cur = start_date
+    chunk_end = start_date + timedelta(days=chunk_days - 1 - offset)
+    while cur <= end_date:
+        yield cur, min(end_date, chunk_end)
+        cur = chunk_end + timedelta(days=1)
+        chunk_end = cur + timedelta(days=chunk_days - 1)
+
+
+class BackfillCheckpoint:
+    """Persistance de l'avancement d'un backfill (table BackfillProgress)"""
+
+    @staticmethod
+    def completed_ranges(source, asset):
+        """
+        Retourne les segments déjà terminés pour une source et un actif
+
+        Returns:
+            list: [(chunk_start, chunk_end), ...] triés par date
+        """
+        return list(
+            BackfillProgress.objects.filter(
+                source=source, asset=asset, status="done"
+            ).order_by("chunk_start").values_list("chunk_start", "chunk_end")
+        )
+
+    @staticmethod
+    def is_covered(chunk_start, chunk_end, ranges):
+        """
+        Indique si un segment est entièrement couvert par des segments terminés
+
+        Le premier et le dernier chunk sont rognés à la fenêtre demandée (et
+        donc au jour d'exécution): on teste la couverture plutôt que l'égalité.
+        """
+        cursor = chunk_start
+        for range_start, range_end in ranges:
+            if range_start > cursor:
+                break
+            if range_end >= cursor:
+                cursor = range_end + timedelta(days=1)
+            if cursor > chunk_end:
+                return True
+        return False
+
+    @staticmethod
+    def is_final(chunk_end):
+        """
+        Un chunk n'est définitif que s'il se termine avant aujourd'hui:
+        le jour courant peut encore recevoir des données.
+        """
+        return chunk_end < timezone.now().date()
+
+    @staticmethod
+    def mark_done(source, asset, chunk_start, chunk_end, rows):
+        """Enregistre un chunk terminé (ignoré s'il n'est pas définitif)"""
+        if not BackfillCheckpoint.is_final(chunk_end):
+            return None
+        progress, _ = BackfillProgress.objects.update_or_create(
+            source=source,
+            asset=asset,
+            chunk_start=chunk_start,
+            chunk_end=chunk_end,
+            defaults={"status": "done", "rows": rows, "error": ""},
+        )
+        return progress
+
+    @staticmethod
+    def mark_failed(source, asset, chunk_start, chunk_end, error):
+        """Enregistre l'échec d'un chunk (il sera retenté au prochain run)"""
+        progress, _ = BackfillProgress.objects.update_or_create(
+            source=source,
+            asset=asset,
+            chunk_start=chunk_start,
+            chunk_end=chunk_end,
+            defaults={"status": "failed", "rows": 0, "error": str(error)[:1000]},
+        )
+        return progress
+
+    @staticmethod
+    def reset(source, asset=None):
+        """Supprime les checkpoints (redémarrage complet du backfill)"""
+        qs = BackfillProgress.objects.filter(source=source)
+        if asset is not None:
+            qs = qs.filter(asset=asset)
+        deleted, _ = qs.delete()
+        logger.info(f"🧹 {deleted} checkpoints supprimés ({source})")
+        return deleted
@@ -0,0 +1,212 @@
+"""
+Cache disque des réponses brutes des sources (BCM, Yahoo, yfinance)
+
+Les payloads sont stockés compressés (gzip) et adressés par leur contenu
+(sha256): deux réponses identiques ne sont stockées qu'une fois. Un index
+par requête (source + paramètres) pointe vers le payload le plus récent,
+ce qui permet de rejouer le parsing et le stockage sans réseau (--replay).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMiss(Exception):
+    """Aucun payload en cache pour une requête (mode replay)"""
+
+
+class CachedResponse:
+    """Réponse HTTP minimale reconstruite depuis un payload en cache"""
+
+    def __init__(self, content, from_cache=False):
+        self.content = content
+        self.from_cache = from_cache
+        self.status_code = 200
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class PayloadCache:
+    """Stockage content-addressed des payloads bruts, avec TTL par source"""
+
+    DEFAULT_TTL = 6 * 3600
+
+    def __init__(self, root=None, ttls=None):
+        self.root = Path(root or settings.SCRAPER_CACHE_DIR)
+        self.ttls = ttls if ttls is not None else settings.SCRAPER_CACHE_TTLS
+        # En mode replay: jamais de réseau, TTL ignorés
+        self.replay = False
+
+    @staticmethod
+    def request_key(source, request):
+        """Clé stable d'une requête (source + description JSON triée)"""
+        raw = json.dumps([source, request], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _object_path(self, digest):
+        return self.root / "objects" / digest[:2] / f"{digest}.gz"
+
+    def _index_path(self, source, key):
+        return self.root / "index" / source / f"{key}.json"
+
+    @staticmethod
+    def _atomic_write(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def put(self, source, request, payload):
+        """
+        Enregistre un payload brut et met à jour l'index de la requête
+
+        Returns:
+            str: digest sha256 du payload
+        """
+        digest = hashlib.sha256(payload).hexdigest()
+        obj_path = self._object_path(digest)
+        if not obj_path.exists():
+            self._atomic_write(obj_path, gzip.compress(payload))
+
+        entry = {
+            "source": source,
+            "request": request,
+            "digest": digest,
+            "size": len(payload),
+            "fetched_at": time.time(),
+        }
+        key = self.request_key(source, request)
+        self._atomic_write(
+            self._index_path(source, key),
+            json.dumps(entry, sort_keys=True, default=str).encode("utf-8"),
+        )
+        return digest
+
+    def read(self, entry):
+        """Retourne le payload (bytes) d'une entrée d'index"""
+        with gzip.open(self._object_path(entry["digest"]), "rb") as fh:
+            return fh.read()
+
+    def lookup(self, source, request, fresh_only=True):
+        """
+        Cherche l'entrée d'index d'une requête
+
+        Returns:
+            dict | None: entrée d'index (None si absente ou expirée)
+        """
+        path = self._index_path(source, self.request_key(source, request))
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if fresh_only:
+            ttl = self.ttls.get(source, self.DEFAULT_TTL)
+            if time.time() - entry["fetched_at"] > ttl:
+                return None
+        if not self._object_path(entry["digest"]).exists():
+            return None
+        return entry
+
+    def entries(self, source, **match):
+        """
+        Liste les entrées d'une source, des plus anciennes aux plus récentes
+
+        Args:
+            source: Source (bcm, yahoo, yfinance)
+            **match: Filtre sur les paramètres de requête (ex: currency="USD")
+        """
+        index_dir = self.root / "index" / source
+        if not index_dir.exists():
+            return []
+
+        results = []
+        for path in index_dir.glob("*.json"):
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            params = entry.get("request", {}).get("params", {})
+            if all(str(params.get(k)) == str(v) for k, v in match.items()):
+                results.append(entry)
+        return sorted(results, key=lambda e: e["fetched_at"])
+
+    def fetch(self, source, request, loader, replay_match=None):
+        """
+        Retourne le payload d'une requête, depuis le cache si possible
+
+        Args:
+            source: Source (bcm, yahoo, yfinance)
+            request: Description JSON-sérialisable de la requête
+            loader: Fonction sans argument renvoyant le payload (bytes)
+            replay_match: En replay, filtre de repli si la requête exacte
+                n'est pas en cache (on prend alors le payload le plus récent)
+
+        Returns:
+            tuple: (payload: bytes, from_cache: bool)
+        """
+        entry = self.lookup(source, request, fresh_only=not self.replay)
+        if entry is None and self.replay and replay_match:
+            candidates = self.entries(source, **replay_match)
+            entry = candidates[-1] if candidates else None
+
+        if entry is not None:
+            logger.debug(f"💾 Cache hit {source}: {entry['digest'][:12]}")
+            return self.read(entry), True
+
+        if self.replay:
+            raise CacheMiss(f"Aucun payload {source} en cache pour {request}")
+
+        payload = loader()
+        self.put(source, request, payload)
+        return payload, False
+
+
+payload_cache = PayloadCache()
+
+
+def cached_get(source, url, params=None, replay_match=None, **kwargs):
+    """
+    requests.get via le cache de payloads (réponses 2xx uniquement)
+
+    Returns:
+        CachedResponse
+    """
+    request = {"url": url, "params": params or {}}
+
+    def loader():
+        from scraper.retry import request_timeout
+
+        # Timeout borné par le budget restant de la tâche (RetryScheduler)
+        timeout = request_timeout(kwargs.pop("timeout", None))
+        response = requests.get(url, params=params, timeout=timeout, **kwargs)
+        if response.status_code == 429:
+            raise requests.RequestException(f"429 Too Many Requests for url: {url}")
+        response.raise_for_status()
+        return response.content
+
+    content, from_cache = payload_cache.fetch(
+        source, request, loader, replay_match=replay_match
+    )
+    return CachedResponse(content, from_cache=from_cache)
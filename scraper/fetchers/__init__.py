@@ -0,0 +1,16 @@
+"""
+Fetchers des sources de prix
+
+L'import des modules enregistre les fetchers dans le registre (REGISTRY).
+"""
+from scraper.fetchers.base import (
+    REGISTRY,
+    BaseFetcher,
+    all_asset_codes,
+    fetchers_for_source,
+    registered_fetchers,
+)
+from scraper.fetchers.fx import FXFetcher
+from scraper.fetchers.metals import MetalsFetcher
+from scraper.fetchers.crypto import CryptoFetcher
+from scraper.fetchers.yahoo import YahooFetcher
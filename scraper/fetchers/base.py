@@ -1,26 +1,51 @@
 """
-Base fetcher avec gestion d'erreurs commune
+Base fetcher avec gestion d'erreurs commune et registre des fetchers
 """
 import logging
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 
+from core.db import releasing_connections
+from scraper.retry import inheriting_deadline
+
 logger = logging.getLogger(__name__)
 
 
+# Registre des fetchers concrets: NAME -> classe (rempli par __init_subclass__)
+REGISTRY = {}
+
+
 class BaseFetcher(ABC):
-    """Classe de base pour tous les fetchers"""
-    
+    """
+    Classe de base pour tous les fetchers
+
+    Chaque sous-classe concrète déclare ses actifs et sa source; elle est
+    enregistrée automatiquement dans REGISTRY et découverte par le runner.
+    """
+
+    NAME = None           # Identifiant du fetcher (clé du registre)
+    SOURCE = "api"        # Valeur de Price.source pour les prix stockés
+    ASSET_CODES = []      # À définir dans les sous-classes
+    CALENDAR = "daily"    # Calendrier de cotation (voir scraper.gaps)
+    ASSET_CALENDARS = {}  # Exceptions de calendrier par actif
+    DAILY = True          # Inclus dans le scraping quotidien (ScraperRunner)
     TIMEOUT = 10
-    ASSET_CODES = []  # À définir dans les sous-classes
-    
+    TIME_BUDGET = 60      # Temps max (s) accordé au fetcher dans un run
+    MAX_WORKERS = 1       # Actifs récupérés en parallèle dans le fetcher
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.NAME:
+            REGISTRY[cls.NAME] = cls
+
     @abstractmethod
     def fetch_price(self, asset_code: str) -> dict:
         """
         Récupère le prix d'un actif
-        
+
         Returns:
             dict: {
                 "asset_code": str,
@@ -30,30 +55,45 @@ class BaseFetcher(ABC):
             }
         """
         pass
-    
+
+    @classmethod
+    def calendar_for(cls, asset_code):
+        """Calendrier de cotation suivi pour un actif"""
+        return cls.ASSET_CALENDARS.get(asset_code, cls.CALENDAR)
+
     @classmethod
     def get_all_prices(cls):
         """
         Récupère tous les prix pour ce fetcher
-        
+
         Returns:
             list[dict]: Liste des prix
         """
         fetcher = cls()
-        prices = []
-        
-        for asset_code in cls.ASSET_CODES:
+
+        def fetch_one(asset_code):
             try:
                 price_data = fetcher.fetch_price(asset_code)
                 if price_data:
-                    prices.append(price_data)
                     logger.debug(f"✅ {asset_code}: {price_data['price_mru']} MRU")
+                else:
+                    logger.warning(f"⚠️ {asset_code}: Récupération échouée")
+                return price_data
             except Exception as e:
                 logger.error(f"❌ Erreur {asset_code}: {e}")
-                continue
-        
-        return prices
-    
+                return None
+
+        if cls.MAX_WORKERS > 1 and len(cls.ASSET_CODES) > 1:
+            with ThreadPoolExecutor(max_workers=cls.MAX_WORKERS) as executor:
+                # Connexion éventuelle de chaque thread rendue en fin de tâche;
+                # les appels réseau restent bornés par l'échéance du run
+                fetch = inheriting_deadline(releasing_connections(fetch_one))
+                results = list(executor.map(fetch, cls.ASSET_CODES))
+        else:
+            results = [fetch_one(code) for code in cls.ASSET_CODES]
+
+        return [p for p in results if p]
+
     @staticmethod
     def validate_price(price: Decimal, min_value=Decimal("0.01")) -> bool:
         """Valide qu'un prix est cohérent"""
@@ -63,3 +103,21 @@ class BaseFetcher(ABC):
             return True
         except:
             return False
+
+
+def registered_fetchers(daily_only=False):
+    """Liste des fetchers enregistrés (optionnellement ceux du run quotidien)"""
+    return [
+        fetcher for fetcher in REGISTRY.values()
+        if fetcher.DAILY or not daily_only
+    ]
+
+
+def fetchers_for_source(source):
+    """Fetchers enregistrés qui alimentent une source donnée"""
+    return [fetcher for fetcher in REGISTRY.values() if fetcher.SOURCE == source]
+
+
+def all_asset_codes():
+    """Ensemble des codes d'actifs déclarés par les fetchers"""
+    return {code for fetcher in REGISTRY.values() for code in fetcher.ASSET_CODES}
@@ -6,15 +6,27 @@ from decimal import Decimal
 from datetime import datetime
 import random
 
+from scraper.fetchers.base import BaseFetcher
+
 logger = logging.getLogger(__name__)
 
 
-class CryptoFetcher:
+class CryptoFetcher(BaseFetcher):
     """Récupère les prix des cryptomonnaies"""
     
+    NAME = "crypto"
+    SOURCE = "sim"
+    
     BASE_PRICES = {
         "BTC": Decimal("45000.00"),  # Prix base en USD, convertir en MRU
     }
+    ASSET_CODES = list(BASE_PRICES)
+    
+    def fetch_price(self, asset_code):
+        if asset_code == "BTC":
+            return CryptoFetcher.fetch_bitcoin_price()
+        logger.error(f"❌ Crypto inconnue: {asset_code}")
+        return None
     
     @staticmethod
     def fetch_bitcoin_price():
@@ -45,17 +57,3 @@ class CryptoFetcher:
         except Exception as e:
             logger.error(f"Erreur récupération Bitcoin: {e}")
             return None
-    
-    @staticmethod
-    def get_all_prices():
-        """Récupère tous les prix crypto"""
-        results = []
-        
-        btc_price = CryptoFetcher.fetch_bitcoin_price()
-        if btc_price:
-            results.append(btc_price)
-            logger.info(f"✅ BTC: {btc_price['price_mru']} MRU")
-        else:
-            logger.warning("⚠️ BTC: Récupération échouée")
-        
-        return results
@@ -7,17 +7,25 @@ from decimal import Decimal
 from datetime import datetime, timedelta
 import urllib3
 
+from scraper.cache import cached_get
+from scraper.fetchers.base import BaseFetcher
+
 # Désactiver l'avertissement SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
 
-class FXFetcher:
+class FXFetcher(BaseFetcher):
     """Récupère les taux de change depuis la Banque Centrale de Mauritanie"""
     
+    NAME = "forex"
+    SOURCE = "bcm"
+    CALENDAR = "weekdays"
     BASE_URL = "https://connect.bcm.mr/api/cours_change_reference"
     TIMEOUT = 10
+    TIME_BUDGET = 45
+    MAX_WORKERS = 3
     
     # Devises supportées
     CURRENCIES = {
@@ -25,6 +33,10 @@ class FXFetcher:
         "EUR": "Euro",
         "CNY": "Yuan Chinois",
     }
+    ASSET_CODES = list(CURRENCIES)
+    
+    def fetch_price(self, asset_code):
+        return FXFetcher.fetch_rate(asset_code)
     
     @staticmethod
     def fetch_rate(currency_code: str):
@@ -54,13 +66,14 @@ class FXFetcher:
             }
             
             logger.debug(f"🔍 Requête: {FXFetcher.BASE_URL} {params}")
-            response = requests.get(
+            response = cached_get(
+                "bcm",
                 FXFetcher.BASE_URL,
                 params=params,
+                replay_match={"currency": currency_code},
                 timeout=FXFetcher.TIMEOUT,
                 verify=False  # Désactiver vérification SSL pour BCM
             )
-            response.raise_for_status()
             
             data = response.json()
             
@@ -105,19 +118,3 @@ class FXFetcher:
         except Exception as e:
             logger.error(f"❌ Erreur inattendue {currency_code}: {e}")
             return None
-    
-    @staticmethod
-    def get_all_prices():
-        """Récupère tous les taux de change"""
-        results = []
-        
-        for currency_code in FXFetcher.CURRENCIES.keys():
-            price_data = FXFetcher.fetch_rate(currency_code)
-            
-            if price_data:
-                results.append(price_data)
-                logger.info(f"✅ {currency_code}: {price_data['price_mru']} MRU")
-            else:
-                logger.warning(f"⚠️ {currency_code}: Récupération échouée")
-        
-        return results
@@ -6,18 +6,27 @@ from decimal import Decimal
 from datetime import datetime
 import random
 
+from scraper.fetchers.base import BaseFetcher
+
 logger = logging.getLogger(__name__)
 
 
-class MetalsFetcher:
+class MetalsFetcher(BaseFetcher):
     """Récupère les prix des métaux"""
     
+    NAME = "metals"
+    SOURCE = "sim"
+    
     # Taux de base pour conversion en MRU
     RATES = {
         "GOLD": Decimal("2100.00"),    # 1 oz = 2100 MRU
         "IRON": Decimal("150.00"),     # 1 tonne = 150 MRU
         "COPPER": Decimal("800.00"),   # 1 tonne = 800 MRU
     }
+    ASSET_CODES = list(RATES)
+    
+    def fetch_price(self, asset_code):
+        return MetalsFetcher.fetch_metal_price(asset_code)
     
     @staticmethod
     def fetch_metal_price(code: str):
@@ -52,18 +61,3 @@ class MetalsFetcher:
         except Exception as e:
             logger.error(f"Erreur récupération {code}: {e}")
             return None
-    
-    @staticmethod
-    def get_all_prices():
-        """Récupère tous les prix des métaux"""
-        results = []
-        
-        for code in MetalsFetcher.RATES.keys():
-            price_data = MetalsFetcher.fetch_metal_price(code)
-            if price_data:
-                results.append(price_data)
-                logger.info(f"✅ {code}: {price_data['price_mru']} MRU")
-            else:
-                logger.warning(f"⚠️ {code}: Récupération échouée")
-        
-        return results
@@ -0,0 +1,140 @@
+"""
+Fetcher Yahoo Finance - Matières premières et Bitcoin (USD convertis en MRU)
+"""
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from scraper.cache import cached_get, payload_cache
+from scraper.fetchers.base import BaseFetcher
+from scraper.normalize import frame_to_close_csv, parse_close_csv
+from scraper.retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class YahooFetcher(BaseFetcher):
+    """Récupère les cours Yahoo Finance (yfinance, repli CSV)"""
+
+    NAME = "yahoo"
+    SOURCE = "yahoo"
+    CALENDAR = "weekdays"
+    ASSET_CALENDARS = {"BTC": "daily"}
+    # Lancé par scrape_yahoo_today / scrape_historical_yahoo, pas par le run quotidien
+    DAILY = False
+    TIMEOUT = 20
+    TIME_BUDGET = 120
+    # Retries replanifiés par RetryScheduler (circuit "yahoo")
+    RETRY_POLICY = RetryPolicy(max_attempts=4, base_delay=2, max_delay=30)
+
+    DOWNLOAD_URL = "https://query1.finance.yahoo.com/v7/finance/download/{symbol}"
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+        "Accept": "*/*",
+    }
+
+    # Mapping actifs -> symboles Yahoo
+    SYMBOLS = {
+        "GOLD": "GC=F",     # Gold futures
+        "COPPER": "HG=F",   # Copper futures
+        "IRON": "TIO=F",    # Iron ore futures (CME TIO)
+        "BTC": "BTC-USD",   # Bitcoin
+    }
+    ASSET_CODES = list(SYMBOLS)
+
+    @staticmethod
+    def history_csv(yahoo_symbol, start_date, end_date):
+        """Historique yfinance au format CSV "Date,Close" (via le cache)"""
+        request = {"params": {"symbol": yahoo_symbol, "start": start_date.isoformat(), "end": end_date.isoformat()}}
+        payload, _ = payload_cache.fetch(
+            "yfinance",
+            request,
+            lambda: YahooFetcher.download_yf(yahoo_symbol, start_date, end_date).encode("utf-8"),
+        )
+        return payload.decode("utf-8")
+
+    @staticmethod
+    def download_yf(yahoo_symbol, start_date, end_date):
+        """Télécharge l'historique via yfinance"""
+        import yfinance as yf
+
+        yf_start = start_date.isoformat()
+        yf_end = (end_date + timedelta(days=1)).isoformat()
+        df = yf.download(yahoo_symbol, start=yf_start, end=yf_end, interval="1d", progress=False)
+        if df is None or df.empty:
+            raise ValueError("yfinance returned no data")
+        return frame_to_close_csv(df, yahoo_symbol)
+
+    @staticmethod
+    def download_csv(yahoo_symbol, start_date, end_date):
+        """Télécharge le CSV Yahoo d'une période (via le cache, 429 = erreur)"""
+        def to_unix(d):
+            return int(datetime(d.year, d.month, d.day).timestamp())
+
+        url = YahooFetcher.DOWNLOAD_URL.format(symbol=yahoo_symbol)
+        params = {
+            "period1": to_unix(start_date),
+            # Yahoo attend period2 à la fin du jour suivant pour inclure end_date
+            "period2": to_unix(end_date + timedelta(days=1)),
+            "interval": "1d",
+            "events": "history",
+            "includeAdjustedClose": "true",
+        }
+        logger.info(f"🔍 Requête Yahoo: {url} {params}")
+        return cached_get(
+            "yahoo", url, params=params,
+            headers=YahooFetcher.HEADERS, timeout=YahooFetcher.TIMEOUT,
+        )
+
+    @staticmethod
+    def history_rows(yahoo_symbol, start_date, end_date):
+        """
+        Lignes (Date, Close en USD) d'une période: yfinance puis repli CSV
+
+        Returns:
+            list[dict]: [{"Date": "YYYY-MM-DD", "Close": "..."}, ...]
+        """
+        try:
+            rows = parse_close_csv(YahooFetcher.history_csv(yahoo_symbol, start_date, end_date))
+            if rows:
+                return rows
+        except Exception as e:
+            logger.warning(f"⚠️ yfinance failed for {yahoo_symbol}: {e}")
+
+        logger.warning(f"⚠️ yfinance vide pour {yahoo_symbol}, repli CSV")
+        resp = YahooFetcher.download_csv(yahoo_symbol, start_date, end_date)
+        return parse_close_csv(resp.text)
+
+    def fetch_price(self, asset_code):
+        """Dernier cours Yahoo d'un actif, converti en MRU au dernier taux USD"""
+        from core.models import Price
+
+        symbol = self.SYMBOLS.get(asset_code)
+        if symbol is None:
+            logger.error(f"❌ Symbole Yahoo inconnu: {asset_code}")
+            return None
+
+        today = datetime.now().date()
+        rows = self.history_rows(symbol, today - timedelta(days=5), today)
+        closes = [r for r in rows if r.get("Close") not in (None, "", "null", "NaN", "nan")]
+        if not closes:
+            return None
+
+        last = closes[-1]
+        price_date = datetime.strptime(last["Date"], "%Y-%m-%d").date()
+        usd_price = Price.objects.filter(
+            asset__code="USD", date__lte=price_date
+        ).order_by("-date").first()
+        if not usd_price:
+            return None
+
+        price_mru = Decimal(str(last["Close"])) * usd_price.price_mru
+        if not self.validate_price(price_mru):
+            return None
+
+        return {
+            "asset_code": asset_code,
+            "price_mru": price_mru.quantize(Decimal("0.01")),
+            "source": "yahoo",
+            "timestamp": datetime.now(),
+        }
@@ -0,0 +1,94 @@
+"""
+Détection des trous dans l'historique - Calendriers de cotation par source
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from core.models import PriceObservation
+from scraper.fetchers import fetchers_for_source
+
+logger = logging.getLogger(__name__)
+
+
+# Calendriers de cotation: jour -> bool (jour coté ou non)
+CALENDARS = {
+    "daily": lambda d: True,               # Crypto: cotation 7j/7
+    "weekdays": lambda d: d.weekday() < 5,  # BCM, futures: lundi → vendredi
+}
+
+
+def calendar_for(source, asset_code):
+    """
+    Retourne le nom du calendrier suivi par une source pour un actif
+
+    Le calendrier est déclaré par le fetcher qui alimente la source.
+    """
+    for fetcher in fetchers_for_source(source):
+        if asset_code in fetcher.ASSET_CODES:
+            return fetcher.calendar_for(asset_code)
+    return "daily"
+
+
+def trading_days(start_date, end_date, calendar="daily"):
+    """Liste des jours cotés entre deux dates (inclusives)"""
+    is_trading = CALENDARS[calendar]
+    days = []
+    day = start_date
+    while day <= end_date:
+        if is_trading(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def find_gaps(source, asset_codes, start_date, end_date, merge_within=5):
+    """
+    Calcule les intervalles de dates manquantes par actif (une seule requête)
+
+    Seuls les jours cotés selon le calendrier de la source comptent comme
+    manquants. Deux trous séparés par au plus `merge_within` jours cotés
+    présents sont fusionnés pour limiter le nombre de requêtes.
+
+    Args:
+        source: Source des prix (bcm, yahoo, ...)
+        asset_codes: Codes des actifs à analyser
+        start_date: Début de la fenêtre (inclus)
+        end_date: Fin de la fenêtre (incluse)
+        merge_within: Nombre de jours cotés présents tolérés dans un intervalle
+
+    Returns:
+        dict: {asset_code: [(gap_start, gap_end), ...]}
+    """
+    present = defaultdict(set)
+    # Présence par source: les observations, pas le prix canonique
+    rows = PriceObservation.objects.filter(
+        source=source,
+        asset__code__in=list(asset_codes),
+        date__range=(start_date, end_date),
+    ).order_by().values_list("asset__code", "date")
+    for code, day in rows:
+        present[code].add(day)
+
+    gaps = {}
+    for code in asset_codes:
+        days = trading_days(start_date, end_date, calendar_for(source, code))
+        intervals = []
+        prev_idx = None
+        for idx, day in enumerate(days):
+            if day in present[code]:
+                continue
+            if intervals and idx - prev_idx - 1 <= merge_within:
+                intervals[-1] = (intervals[-1][0], day)
+            else:
+                intervals.append((day, day))
+            prev_idx = idx
+        gaps[code] = intervals
+
+        missing = sum(1 for d in days if d not in present[code])
+        logger.info(
+            f"🔎 {source}/{code}: {missing}/{len(days)} jours manquants "
+            f"en {len(intervals)} intervalles"
+        )
+
+    return gaps
@@ -0,0 +1,38 @@
+"""
+Normalisation des payloads sources vers un format commun
+"""
+import csv
+import io
+
+
+def frame_to_close_csv(df, yahoo_symbol):
+    """
+    Convertit un DataFrame yfinance en CSV "Date,Close"
+
+    Gère les colonnes simples et les colonnes MultiIndex (Price, Ticker)
+    renvoyées par les versions récentes de yfinance.
+    """
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["Date", "Close"])
+
+    is_multi = getattr(df.columns, "nlevels", 1) > 1
+    for idx, row in df.iterrows():
+        if is_multi:
+            close_val = row.get(("Close", yahoo_symbol))
+            if close_val is None and "Close" in df.columns.get_level_values(0):
+                close_series = row.xs("Close")
+                close_val = close_series.iloc[0] if hasattr(close_series, "iloc") else close_series
+        else:
+            close_val = row.get("Close")
+
+        if close_val is None or str(close_val) in ("nan", "NaN"):
+            close_val = "null"
+        writer.writerow([idx.date().isoformat(), close_val])
+
+    return out.getvalue()
+
+
+def parse_close_csv(text):
+    """Parse un CSV Yahoo (Date, Close, ...) en liste de dicts"""
+    return list(csv.DictReader(io.StringIO(text)))
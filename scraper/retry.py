@@ -0,0 +1,275 @@
+"""
+Politique de retry partagée - Backoff exponentiel avec jitter,
+planificateur non bloquant et circuit breaker persistant par source
+"""
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.db import releasing_connections
+from core.models import SourceCircuit
+
+logger = logging.getLogger(__name__)
+
+# Échéance (time.monotonic() absolu) de la tâche exécutée par le thread courant
+_deadline = contextvars.ContextVar("retry_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Budget de temps de la tâche épuisé avant un appel réseau"""
+
+
+def request_timeout(timeout):
+    """
+    Timeout d'un appel réseau borné par le budget restant de la tâche
+    courante (inchangé hors RetryScheduler)
+
+    Raises:
+        DeadlineExceeded: budget déjà épuisé, l'appel n'est pas lancé
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("budget de temps dépassé")
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def with_deadline(func, deadline):
+    """Exécute func avec l'échéance donnée (lue par request_timeout)"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _deadline.set(deadline)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+    return wrapper
+
+
+def inheriting_deadline(func):
+    """Propage l'échéance courante à func exécutée dans un autre thread"""
+    return with_deadline(func, _deadline.get())
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker par source, persisté en base (SourceCircuit)
+
+    Après FAILURE_THRESHOLD échecs consécutifs, le circuit s'ouvre pour
+    COOLDOWN secondes (doublé à chaque réouverture, plafonné). À l'issue,
+    un appel d'essai est autorisé (semi-ouvert): un succès referme le
+    circuit, un échec le rouvre.
+    """
+
+    FAILURE_THRESHOLD = 5
+    COOLDOWN = 15 * 60
+    MAX_COOLDOWN = 6 * 3600
+
+    @staticmethod
+    def _get(source):
+        circuit, _ = SourceCircuit.objects.get_or_create(source=source)
+        return circuit
+
+    @staticmethod
+    def allow(source):
+        """Indique si un appel vers la source est autorisé"""
+        circuit = CircuitBreaker._get(source)
+        if circuit.state != "open":
+            return True
+        if circuit.retry_at and timezone.now() >= circuit.retry_at:
+            circuit.state = "half_open"
+            circuit.save(update_fields=["state", "updated_at"])
+            logger.info(f"🔌 Circuit {source} semi-ouvert: appel d'essai autorisé")
+            return True
+        return False
+
+    @staticmethod
+    def record_success(source):
+        circuit = CircuitBreaker._get(source)
+        if circuit.state == "closed" and circuit.failures == 0:
+            return
+        if circuit.state != "closed":
+            logger.info(f"✅ Circuit {source} refermé")
+        circuit.state = "closed"
+        circuit.failures = 0
+        circuit.opened_count = 0
+        circuit.retry_at = None
+        circuit.save(update_fields=["state", "failures", "opened_count", "retry_at", "updated_at"])
+
+    @staticmethod
+    def record_failure(source, error):
+        circuit = CircuitBreaker._get(source)
+        circuit.failures += 1
+        circuit.last_error = str(error)[:1000]
+
+        if circuit.state == "half_open" or circuit.failures >= CircuitBreaker.FAILURE_THRESHOLD:
+            cooldown = min(
+                CircuitBreaker.MAX_COOLDOWN,
+                CircuitBreaker.COOLDOWN * 2 ** circuit.opened_count,
+            )
+            circuit.state = "open"
+            circuit.opened_count += 1
+            circuit.retry_at = timezone.now() + timedelta(seconds=cooldown)
+            logger.error(
+                f"⛔ Circuit {source} ouvert pour {cooldown}s "
+                f"({circuit.failures} échecs): {circuit.last_error}"
+            )
+
+        circuit.save()
+
+
+class RetryPolicy:
+    """Backoff exponentiel plafonné avec jitter (appliqué par RetryScheduler)"""
+
+    def __init__(self, max_attempts=3, base_delay=2.0, multiplier=2.0, max_delay=30.0, jitter=0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def backoff(self, attempt):
+        """Délai avant la tentative suivant `attempt` (jitter: -jitter% max)"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+class RetryTask:
+    """Unité de travail planifiée par RetryScheduler"""
+
+    def __init__(self, key, func, circuit=None, is_valid=bool, deadline=None):
+        self.key = key
+        self.func = func
+        self.circuit = circuit
+        self.is_valid = is_valid
+        self.deadline = deadline  # time.monotonic() absolu
+        self.attempts = 0
+        self.status = "pending"   # success, failed, timeout, circuit_open
+        self.result = None
+        self.error = None
+
+
+class RetryScheduler:
+    """
+    Exécute des tâches en parallèle et replanifie les échecs sans bloquer
+
+    Une tâche en échec est remise en file avec un délai de backoff pendant
+    que les autres continuent; le thread principal n'attend que la
+    prochaine échéance ou la fin d'une tâche. Les accès au circuit breaker
+    (base de données) restent dans le thread principal.
+
+    Le budget d'une tâche (deadline) borne aussi ses appels réseau
+    (request_timeout): une tâche hors délai est déclarée en timeout et son
+    thread s'arrête au plus tard à l'échéance de son appel en cours. run()
+    attend la fin de tous les threads: aucun travail ne continue après.
+    """
+
+    def __init__(self, policy=None, max_workers=4):
+        self.policy = policy or RetryPolicy()
+        self.max_workers = max_workers
+
+    def run(self, tasks, on_result=None):
+        """
+        Args:
+            tasks: Liste de RetryTask
+            on_result: Callback appelé (thread principal) à chaque tâche terminée
+
+        Returns:
+            list: Les tâches, avec status/result/error renseignés
+        """
+        counter = itertools.count()
+        queue = [(time.monotonic(), next(counter), task) for task in tasks]
+        heapq.heapify(queue)
+        inflight = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, self.max_workers))
+
+        def finish(task, status, error=None):
+            task.status = status
+            if error is not None:
+                task.error = error
+            if status != "success":
+                logger.error(f"❌ {task.key}: {status} après {task.attempts} tentative(s) ({task.error})")
+            if on_result:
+                on_result(task)
+
+        try:
+            while queue or inflight:
+                now = time.monotonic()
+
+                # Tâches en cours hors délai: résultat ignoré (le thread
+                # s'arrête au prochain appel réseau, borné par l'échéance)
+                for future, task in list(inflight.items()):
+                    if task.deadline is not None and now >= task.deadline:
+                        del inflight[future]
+                        finish(task, "timeout", "budget de temps dépassé")
+
+                # Lancer les tâches arrivées à échéance
+                while queue and queue[0][0] <= now:
+                    _, _, task = heapq.heappop(queue)
+                    if task.deadline is not None and now >= task.deadline:
+                        finish(task, "timeout", "budget de temps dépassé")
+                        continue
+                    if task.circuit and not CircuitBreaker.allow(task.circuit):
+                        finish(task, "circuit_open", f"circuit {task.circuit} ouvert")
+                        continue
+                    task.attempts += 1
+                    logger.info(f"🔄 {task.key}: tentative {task.attempts}/{self.policy.max_attempts}")
+                    func = with_deadline(releasing_connections(task.func), task.deadline)
+                    inflight[executor.submit(func)] = task
+
+                # Attendre la prochaine échéance (retry ou deadline) ou une fin de tâche
+                horizons = [queue[0][0]] if queue else []
+                horizons += [t.deadline for t in inflight.values() if t.deadline is not None]
+                timeout = max(0, min(horizons) - time.monotonic()) if horizons else None
+
+                if not inflight:
+                    if timeout:
+                        time.sleep(timeout)
+                    continue
+
+                done, _ = wait(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = inflight.pop(future)
+                    try:
+                        task.result = future.result()
+                        ok = task.is_valid(task.result)
+                        error = None if ok else "Aucun résultat retourné"
+                    except Exception as e:
+                        ok = False
+                        error = e
+
+                    if ok:
+                        if task.circuit:
+                            CircuitBreaker.record_success(task.circuit)
+                        finish(task, "success")
+                        continue
+
+                    task.error = error
+                    logger.warning(f"⚠️ {task.key}: tentative {task.attempts} échouée: {error}")
+                    if task.circuit:
+                        CircuitBreaker.record_failure(task.circuit, error)
+
+                    if task.attempts >= self.policy.max_attempts:
+                        finish(task, "failed")
+                        continue
+
+                    due = time.monotonic() + self.policy.backoff(task.attempts)
+                    if task.deadline is not None and due >= task.deadline:
+                        finish(task, "timeout", f"retry hors budget ({error})")
+                        continue
+                    heapq.heappush(queue, (due, next(counter), task))
+        finally:
+            # Attendre les threads des tâches hors délai (bornés par leur échéance)
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return tasks
@@ -0,0 +1,180 @@
+"""
+Agrégation incrémentale des ticks en barres journalières OHLC
+
+Les ticks sont lus par instant d'insertion croissant (PriceTick.created_at)
+depuis le dernier point de reprise (SyncState "tick_rollup"), moins une marge
+(TICK_ROLLUP_OVERLAP) qui couvre les transactions validées en retard, comme
+la synchronisation incrémentale (sync.sync_prices). Chaque jour touché est
+recalculé entièrement: relire un tick déjà intégré ne change rien.
+
+Les ticks de sources différentes ne sont jamais mélangés: chaque source a
+sa barre, dont la clôture devient son observation du jour (PriceObservation);
+le prix canonique (Price) est ensuite résolu par core.sources. La DailyBar
+enregistrée est celle de la source la mieux classée pour l'actif.
+"""
+import logging
+import os
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import sources
+from core.models import DailyBar, PriceTick, SyncState
+from core.registry import AssetRegistry
+from scraper.store import DataStore
+
+logger = logging.getLogger(__name__)
+
+
+class RollupError(Exception):
+    """Lot de ticks non intégré (prix de clôture non stockés)"""
+
+
+class BarRollup:
+    """Construit les DailyBar et les prix de clôture à partir des ticks"""
+
+    STATE_NAME = "tick_rollup"
+    BATCH_SIZE = 50000
+    WATERMARK_OVERLAP = int(os.getenv("TICK_ROLLUP_OVERLAP", 300))
+
+    @staticmethod
+    def _day_bounds(day):
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start, start + timedelta(days=1)
+
+    @staticmethod
+    def _compute_bars(touched):
+        """
+        Recalcule les barres des (asset_id, date) touchés, une par source
+
+        Returns:
+            dict: {(asset_id, date, source): {"open", "high", "low", "close",
+                   "ticks", "first_ts", "last_ts"}}
+        """
+        condition = Q()
+        for asset_id, day in touched:
+            start, end = BarRollup._day_bounds(day)
+            condition |= Q(asset_id=asset_id, ts__gte=start, ts__lt=end)
+
+        bars = {}
+        ticks = PriceTick.objects.filter(condition).order_by("asset_id", "ts", "id").values_list(
+            "asset_id", "ts", "price_mru", "source"
+        )
+        for asset_id, ts, price, source in ticks:
+            key = (asset_id, timezone.localtime(ts).date(), source)
+            bar = bars.get(key)
+            if bar is None:
+                bars[key] = {
+                    "open": price, "high": price, "low": price, "close": price,
+                    "ticks": 1, "first_ts": ts, "last_ts": ts,
+                }
+                continue
+            bar["high"] = max(bar["high"], price)
+            bar["low"] = min(bar["low"], price)
+            bar["close"] = price
+            bar["ticks"] += 1
+            bar["last_ts"] = ts
+        return bars
+
+    @staticmethod
+    def _best_bars(bars):
+        """
+        Barre de la source la mieux classée par (asset_id, date); à rang
+        égal, la plus récente l'emporte (comme core.sources.resolve)
+        """
+        best = {}
+        for (asset_id, day, source), bar in bars.items():
+            priority = sources.priority_for(AssetRegistry.get_by_id(asset_id).source_priority)
+            candidate = (sources.rank(priority, source), -bar["last_ts"].timestamp())
+            current = best.get((asset_id, day))
+            if current is None or candidate < current[0]:
+                best[(asset_id, day)] = (candidate, bar)
+        return {key: bar for key, (_, bar) in best.items()}
+
+    @staticmethod
+    def run(batch_size=None):
+        """
+        Intègre les ticks arrivés depuis le dernier passage (marge comprise)
+
+        Un lot dont les prix de clôture ne sont pas tous stockés est annulé
+        (barres et point de reprise compris) et le passage s'arrête: ses
+        ticks seront relus au prochain passage.
+
+        Returns:
+            dict: {"ticks": int, "bars": int, "prices": int, "failed": int}
+        """
+        batch_size = batch_size or BarRollup.BATCH_SIZE
+        state, _ = SyncState.objects.get_or_create(name=BarRollup.STATE_NAME)
+        totals = {"ticks": 0, "bars": 0, "prices": 0, "failed": 0}
+
+        pending = PriceTick.objects.order_by("created_at", "id")
+        if state.high_water_mark is not None:
+            since = state.high_water_mark - timedelta(seconds=BarRollup.WATERMARK_OVERLAP)
+            pending = pending.filter(created_at__gt=since)
+        elif state.high_water_id:
+            # Point de reprise antérieur, par identifiant
+            pending = pending.filter(id__gt=state.high_water_id)
+
+        last = None
+        while True:
+            page = pending
+            if last is not None:
+                page = page.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+            new_ticks = list(page.values_list("id", "created_at", "asset_id", "ts")[:batch_size])
+            if not new_ticks:
+                break
+            last = new_ticks[-1][1], new_ticks[-1][0]
+
+            touched = {(asset_id, timezone.localtime(ts).date()) for _, _, asset_id, ts in new_ticks}
+            bars = BarRollup._compute_bars(touched)
+            daily = BarRollup._best_bars(bars)
+
+            try:
+                with transaction.atomic():
+                    DailyBar.objects.bulk_create(
+                        [
+                            DailyBar(
+                                asset_id=asset_id, date=day,
+                                open=bar["open"], high=bar["high"], low=bar["low"], close=bar["close"],
+                                ticks=bar["ticks"], first_ts=bar["first_ts"], last_ts=bar["last_ts"],
+                            )
+                            for (asset_id, day), bar in daily.items()
+                        ],
+                        update_conflicts=True,
+                        unique_fields=["asset", "date"],
+                        update_fields=["open", "high", "low", "close", "ticks", "first_ts", "last_ts", "updated_at"],
+                    )
+                    # Clôture de chaque source = son observation du jour
+                    result = DataStore.store_prices_bulk([
+                        {
+                            "asset_code": AssetRegistry.get_by_id(asset_id).code,
+                            "date": day,
+                            "price_mru": bar["close"],
+                            "source": source,
+                        }
+                        for (asset_id, day, source), bar in bars.items()
+                    ])
+                    if result["failed"]:
+                        # Annule barres et point de reprise: lot relu au prochain passage
+                        raise RollupError(f"{result['failed']} prix de clôture non stockés")
+                    if state.high_water_mark is None or last[0] > state.high_water_mark:
+                        state.high_water_mark = last[0]
+                    state.last_run_at = timezone.now()
+                    state.save()
+            except RollupError as e:
+                logger.error(f"❌ Rollup interrompu: {e}")
+                totals["failed"] += result["failed"]
+                break
+
+            totals["ticks"] += len(new_ticks)
+            totals["bars"] += len(daily)
+            totals["prices"] += result["stored"]
+
+        if totals["ticks"]:
+            logger.info(
+                f"🕯️ Rollup: {totals['ticks']} ticks → {totals['bars']} barres, "
+                f"{totals['prices']} prix de clôture"
+            )
+        return totals
@@ -6,7 +6,9 @@ import time
 from datetime import datetime
 from decimal import Decimal
 
-from scraper.fetchers.fx import FXFetcher
+from scraper.fetchers import all_asset_codes, registered_fetchers
+from scraper.retry import RetryPolicy, RetryScheduler, RetryTask
+from scraper.rollup import BarRollup
 from scraper.store import DataStore
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,11 @@ class ScraperRunner:
     MAX_RETRIES = 3
     RETRY_DELAY = 2  # secondes
     BACKOFF_MULTIPLIER = 2
+    RETRY_POLICY = RetryPolicy(
+        max_attempts=MAX_RETRIES,
+        base_delay=RETRY_DELAY,
+        multiplier=BACKOFF_MULTIPLIER,
+    )
     
     # Codes de retour
     SUCCESS = 0
@@ -26,51 +33,12 @@ class ScraperRunner:
     CONFIGURATION_ERROR = 3
     
     @staticmethod
-    def _retry_fetch(fetcher_func, max_retries=MAX_RETRIES):
+    def scrape_all(fetchers=None):
         """
-        Exécute une fonction fetch avec retries et backoff exponentiel
+        Scrape tous les actifs des fetchers enregistrés (en parallèle)
         
         Args:
-            fetcher_func: Fonction à appeler
-            max_retries: Nombre maximum de tentatives
-            
-        Returns:
-            list: Résultats du fetch
-        """
-        delay = ScraperRunner.RETRY_DELAY
-        last_error = None
-        
-        for attempt in range(1, max_retries + 1):
-            try:
-                logger.info(f"🔄 Tentative {attempt}/{max_retries}")
-                result = fetcher_func()
-                
-                if result:
-                    logger.info(f"✅ Succès à la tentative {attempt}")
-                    return result
-                else:
-                    last_error = "Aucun résultat retourné"
-                    logger.warning(f"⚠️ Tentative {attempt}: Aucun résultat")
-                    
-            except Exception as e:
-                last_error = str(e)
-                logger.warning(f"⚠️ Tentative {attempt} échouée: {e}")
-                
-                if attempt < max_retries:
-                    logger.info(f"⏳ Attente {delay}s avant nouvelle tentative...")
-                    time.sleep(delay)
-                    delay *= ScraperRunner.BACKOFF_MULTIPLIER
-        
-        logger.error(
-            f"❌ Échec après {max_retries} tentatives. "
-            f"Dernière erreur: {last_error}"
-        )
-        return []
-    
-    @staticmethod
-    def scrape_all():
-        """
-        Scrape tous les actifs (devises, crypto, matières premières)
+            fetchers: Classes de fetchers à exécuter (défaut: run quotidien)
         
         Returns:
             dict: {
@@ -95,50 +63,50 @@ class ScraperRunner:
             "total_failed": 0
         }
         
+        if fetchers is None:
+            fetchers = registered_fetchers(daily_only=True)
+        
         all_prices = []
         exit_code = ScraperRunner.SUCCESS
         
-        # Scraper les devises (Forex)
-        logger.info("\n📌 Scraping Forex...")
-        fx_prices = ScraperRunner._retry_fetch(FXFetcher.get_all_prices)
-        results["fetchers"]["forex"] = {
-            "count": len(fx_prices),
-            "status": "success" if fx_prices else "failed"
-        }
-        all_prices.extend(fx_prices)
-        results["total_fetched"] += len(fx_prices)
+        # Lancer tous les fetchers en parallèle, chacun avec son budget de temps;
+        # les échecs sont replanifiés (backoff + jitter) sans bloquer les autres
+        started = time.monotonic()
+        tasks = [
+            RetryTask(
+                fetcher,
+                fetcher.get_all_prices,
+                circuit=fetcher.SOURCE,
+                deadline=started + fetcher.TIME_BUDGET,
+            )
+            for fetcher in fetchers
+        ]
+        scheduler = RetryScheduler(
+            ScraperRunner.RETRY_POLICY, max_workers=max(1, len(fetchers))
+        )
         
-        if not fx_prices:
-            exit_code = ScraperRunner.PARTIAL_FAILURE
-            logger.warning("⚠️ Forex: Aucune donnée récupérée")
-        
-        # Scraper les cryptomonnaies
-        logger.info("\n📌 Scraping Crypto...")
-        crypto_prices = ScraperRunner._retry_fetch(CryptoFetcher.get_all_prices)
-        results["fetchers"]["crypto"] = {
-            "count": len(crypto_prices),
-            "status": "success" if crypto_prices else "failed"
-        }
-        all_prices.extend(crypto_prices)
-        results["total_fetched"] += len(crypto_prices)
+        def collect(task):
+            fetcher = task.key
+            prices = task.result if task.status == "success" else []
+            results["fetchers"][fetcher.NAME] = {
+                "count": len(prices),
+                "status": task.status,
+                "attempts": task.attempts,
+                "elapsed": round(time.monotonic() - started, 2),
+            }
+            all_prices.extend(dict(p, source=fetcher.SOURCE) for p in prices)
+            results["total_fetched"] += len(prices)
+            
+            if prices:
+                logger.info(f"✅ {fetcher.NAME}: {len(prices)} prix")
+            else:
+                logger.warning(f"⚠️ {fetcher.NAME}: Aucune donnée récupérée ({task.status})")
         
-        if not crypto_prices:
-            exit_code = ScraperRunner.PARTIAL_FAILURE
-            logger.warning("⚠️ Crypto: Aucune donnée récupérée")
-        
-        # Scraper les matières premières
-        logger.info("\n📌 Scraping Matières premières...")
-        metals_prices = ScraperRunner._retry_fetch(MetalsFetcher.get_all_prices)
-        results["fetchers"]["metals"] = {
-            "count": len(metals_prices),
-            "status": "success" if metals_prices else "failed"
-        }
-        all_prices.extend(metals_prices)
-        results["total_fetched"] += len(metals_prices)
+        logger.info(f"\n📌 Scraping: {', '.join(f.NAME for f in fetchers)}")
+        scheduler.run(tasks, on_result=collect)
         
-        if not metals_prices:
+        if any(task.status != "success" for task in tasks):
             exit_code = ScraperRunner.PARTIAL_FAILURE
-            logger.warning("⚠️ Matières premières: Aucune donnée récupérée")
         
         # Vérifier qu'on a au moins quelque chose
         if not all_prices:
@@ -146,37 +114,18 @@ class ScraperRunner:
             results["exit_code"] = ScraperRunner.TOTAL_FAILURE
             return results
         
-        # Stocker les prix (source: bcm pour forex, sim pour les autres)
-        logger.info(f"\n📝 Stockage des {len(all_prices)} prix...")
-        
-        # Séparer forex (bcm) et autres (sim)
-        fx_prices_all = list(fx_prices) if fx_prices else []
-        other_prices_all = list(crypto_prices) + list(metals_prices) if (crypto_prices or metals_prices) else []
-        
-        # Stocker forex avec source='bcm'
-        if fx_prices_all:
-            store_result_fx = DataStore.store_prices_batch(fx_prices_all, source="bcm")
-            results["total_stored"] += store_result_fx["stored"]
-            results["total_failed"] += store_result_fx["failed"]
-        
-        # Stocker autres avec source='sim'
-        if other_prices_all:
-            store_result_other = DataStore.store_prices_batch(other_prices_all, source="sim")
-            results["total_stored"] += store_result_other["stored"]
-            results["total_failed"] += store_result_other["failed"]
-        
-        # Pour compatibilité, création du résumé
-        store_result = {
-            "stored": results["total_stored"],
-            "failed": results["total_failed"]
-        }
+        # Stocker les cotations comme ticks (une écriture, jamais réécrits);
+        # barres OHLC et prix de clôture du jour en sont dérivés
+        logger.info(f"\n📝 Stockage des {len(all_prices)} cotations...")
+        store_result = DataStore.store_ticks(all_prices)
+        results["rollup"] = BarRollup.run()
         
         results["total_stored"] = store_result["stored"]
         results["total_failed"] = store_result["failed"]
         results["store_result"] = store_result
         
         # Déterminer le code de sortie final
-        if store_result["failed"] > 0:
+        if store_result["failed"] > 0 or results["rollup"]["failed"] > 0:
             exit_code = ScraperRunner.PARTIAL_FAILURE
         
         # Résumé final
@@ -203,10 +152,10 @@ class ScraperRunner:
         errors = []
         
         try:
-            from core.models import Asset
+            from core.registry import AssetRegistry
             
-            required_assets = ["USD", "EUR", "CNY", "BTC", "GOLD", "IRON", "COPPER"]
-            existing_assets = set(Asset.objects.values_list("code", flat=True))
+            required_assets = all_asset_codes()
+            existing_assets = AssetRegistry.codes()
             
             missing = set(required_assets) - existing_assets
             if missing:
@@ -4,9 +4,11 @@ Module de stockage des données - Gestion de l'upsert dans PostgreSQL
 import logging
 from decimal import Decimal
 from datetime import datetime
-from django.db import connection
+from django.db import connection, transaction
 from django.db.models import Q
-from core.models import Asset, Price
+from core.models import Asset, Price, PriceObservation, PriceTick
+from core import sources
+from core.registry import AssetRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -17,42 +19,50 @@ class DataStore:
     @staticmethod
     def store_price(asset_code, price_mru, date=None, source="api"):
         """
-        Stocke un prix avec upsert (insert or update)
+        Stocke l'observation d'une source avec upsert (insert or update)
+        et recalcule le prix canonique du jour
         
         Args:
             asset_code: Code de l'actif
             price_mru: Prix en MRU
             date: Date (par défaut aujourd'hui)
-            source: Source de données (bcm, api, sim, init)
+            source: Source de données (bcm, yahoo, api, sim, init)
             
         Returns:
-            dict: {"success": bool, "id": int, "created": bool}
+            dict: {"success": bool, "id": int, "created": bool, "canonical_source": str}
         """
         if date is None:
             date = datetime.now().date()
         
         try:
-            # Récupérer ou créer l'actif
-            asset = Asset.objects.get(code=asset_code)
+            # Actif résolu par le registre en mémoire (sans requête)
+            asset = AssetRegistry.get(asset_code)
+            if asset is None:
+                raise Asset.DoesNotExist(asset_code)
             
             # Convertir le prix en Decimal si nécessaire
             if not isinstance(price_mru, Decimal):
                 price_mru = Decimal(str(price_mru))
             
-            # Upsert: update_or_create
-            price, created = Price.objects.update_or_create(
-                asset=asset,
-                date=date,
-                defaults={'price_mru': price_mru, 'source': source}
-            )
+            # Upsert de l'observation de la source, puis prix canonique
+            with transaction.atomic():
+                _, created = PriceObservation.objects.update_or_create(
+                    asset=asset,
+                    date=date,
+                    source=source,
+                    defaults={'price_mru': price_mru}
+                )
+                sources.resolve([(asset.id, date)])
+            price = Price.objects.filter(asset=asset, date=date).only("id", "source").first()
             
             action = "créé" if created else "mis à jour"
-            logger.info(f"✅ Prix {action}: {asset_code} = {price_mru} MRU ({date})")
+            logger.info(f"✅ Prix {action}: {asset_code} = {price_mru} MRU ({date}, {source})")
             
             return {
                 "success": True,
                 "id": price.id,
                 "created": created,
+                "canonical_source": price.source,
                 "asset_code": asset_code,
                 "price_mru": float(price_mru),
                 "date": str(date)
@@ -84,12 +94,37 @@ class DataStore:
         Returns:
             dict: {"stored": int, "failed": int}
         """
+        rows = [dict(price_data, source=source) for price_data in prices_list]
+        return DataStore.store_prices_bulk(rows, date=date)
+    
+    @staticmethod
+    def store_prices_bulk(prices_list, date=None):
+        """
+        Stocke des observations de sources différentes en une seule écriture
+        (INSERT ... ON CONFLICT (asset, source, date) DO UPDATE), puis
+        recalcule les prix canoniques touchés (core.sources.resolve)
+        
+        Args:
+            prices_list: Liste de {"asset_code": str, "price_mru": Decimal,
+                "source": str, "date": date (optionnel)}
+            date: Date par défaut (aujourd'hui)
+            
+        Returns:
+            dict: {"stored": int, "failed": int, "total": int}
+        """
         if date is None:
             from django.utils import timezone
             date = timezone.now().date()
         
-        stored_count = 0
+        codes = {
+            p.get("asset_code") or p.get("code") for p in prices_list
+        }
+        asset_ids = AssetRegistry.ids(codes)
+        
         failed_count = 0
+        # Clé (asset, source, date): la dernière valeur l'emporte, un même
+        # INSERT ne peut pas mettre à jour deux fois la même ligne
+        rows = {}
         
         for price_data in prices_list:
             # Accepter "code" ou "asset_code"
@@ -101,12 +136,44 @@ class DataStore:
                 failed_count += 1
                 continue
             
-            result = DataStore.store_price(code, price_mru, date, source)
+            if code not in asset_ids:
+                logger.error(f"❌ Actif introuvable: {code}")
+                failed_count += 1
+                continue
             
-            if result["success"]:
-                stored_count += 1
-            else:
+            try:
+                if not isinstance(price_mru, Decimal):
+                    price_mru = Decimal(str(price_mru))
+            except Exception:
+                logger.warning(f"⚠️ Prix invalide {code}: {price_mru}")
                 failed_count += 1
+                continue
+            
+            price_date = price_data.get("date") or date
+            source = price_data.get("source", "api")
+            rows[(asset_ids[code], source, price_date)] = PriceObservation(
+                asset_id=asset_ids[code],
+                date=price_date,
+                price_mru=price_mru,
+                source=source,
+            )
+        
+        stored_count = 0
+        if rows:
+            try:
+                # Observations, prix canoniques, outbox et agrégats dans la même transaction
+                with transaction.atomic():
+                    PriceObservation.objects.bulk_create(
+                        list(rows.values()),
+                        update_conflicts=True,
+                        unique_fields=["asset", "source", "date"],
+                        update_fields=["price_mru", "updated_at"],
+                    )
+                    sources.resolve((asset_id, price_date) for asset_id, _, price_date in rows)
+                stored_count = len(rows)
+            except Exception as e:
+                logger.error(f"❌ Erreur stockage bulk: {e}")
+                failed_count += len(rows)
         
         summary = {
             "stored": stored_count,
@@ -121,6 +188,93 @@ class DataStore:
         
         return summary
     
+    @staticmethod
+    def store_ticks(prices_list):
+        """
+        Ajoute des cotations intrajournalières (append-only, une écriture)
+        
+        Les doublons (même actif, source et instant) sont ignorés: une
+        re-collecte ne réécrit rien et n'est pas comptée comme stockée. Les
+        barres journalières et le prix de clôture sont dérivés ensuite par
+        scraper.rollup.BarRollup.
+        
+        Args:
+            prices_list: Liste de {"asset_code": str, "price_mru": Decimal,
+                "source": str, "timestamp": datetime (optionnel)}
+            
+        Returns:
+            dict: {"stored": int, "failed": int, "total": int}
+        """
+        from django.utils import timezone
+        
+        now = timezone.now()
+        codes = {p.get("asset_code") or p.get("code") for p in prices_list}
+        asset_ids = AssetRegistry.ids(codes)
+        
+        ticks = []
+        failed_count = 0
+        for price_data in prices_list:
+            code = price_data.get("asset_code") or price_data.get("code")
+            price_mru = price_data.get("price_mru")
+            if code not in asset_ids or price_mru is None:
+                logger.warning(f"⚠️ Tick ignoré: {price_data}")
+                failed_count += 1
+                continue
+            
+            ts = price_data.get("timestamp") or now
+            if timezone.is_naive(ts):
+                ts = timezone.make_aware(ts)
+            ticks.append(PriceTick(
+                asset_id=asset_ids[code],
+                ts=ts,
+                price_mru=Decimal(str(price_mru)).quantize(Decimal("0.0001")),
+                source=price_data.get("source", "api"),
+            ))
+        
+        stored_count = 0
+        if ticks:
+            try:
+                stored_count = DataStore._insert_ticks(ticks, now)
+            except Exception as e:
+                logger.error(f"❌ Erreur stockage ticks: {e}")
+                failed_count += len(ticks)
+        
+        logger.info(f"📈 Ticks: {stored_count} stockés, {failed_count} échoués")
+        return {
+            "stored": stored_count,
+            "failed": failed_count,
+            "total": len(prices_list),
+        }
+    
+    @staticmethod
+    def _insert_ticks(ticks, created_at, batch_size=1000):
+        """
+        INSERT ... ON CONFLICT DO NOTHING RETURNING id par lots
+
+        Returns:
+            int: nombre de ticks réellement insérés (doublons exclus)
+        """
+        fields = [PriceTick._meta.get_field(name) for name in ("asset", "ts", "price_mru", "source", "created_at")]
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        inserted = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(ticks), batch_size):
+                batch = ticks[start:start + batch_size]
+                params = []
+                for tick in batch:
+                    values = (tick.asset_id, tick.ts, tick.price_mru, tick.source, created_at)
+                    params.extend(
+                        field.get_db_prep_save(value, connection) for field, value in zip(fields, values)
+                    )
+                placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO {PriceTick._meta.db_table} ({columns}) VALUES {placeholders} "
+                    f"ON CONFLICT DO NOTHING RETURNING id",
+                    params,
+                )
+                inserted += len(cursor.fetchall())
+        return inserted
+    
     @staticmethod
     def get_latest_prices():
         """Récupère les derniers prix de tous les actifs"""
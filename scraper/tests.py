@@ -0,0 +1,117 @@
+import time as clock
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import Asset, DailyBar, Price, PriceObservation, PriceTick, SyncState
+from core.registry import AssetRegistry
+from scraper.backfill import BackfillCheckpoint, daterange_chunks
+from scraper.retry import DeadlineExceeded, RetryPolicy, RetryScheduler, RetryTask, request_timeout
+from scraper.rollup import BarRollup
+from scraper.store import DataStore
+
+
+class DaterangeChunksTests(SimpleTestCase):
+    def test_chunks_are_contiguous_and_clipped(self):
+        chunks = list(daterange_chunks(date(2024, 1, 10), date(2024, 12, 31), 90))
+        self.assertEqual(chunks[0][0], date(2024, 1, 10))
+        self.assertEqual(chunks[-1][1], date(2024, 12, 31))
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(start, end + timedelta(days=1))
+        self.assertTrue(all((end - start).days < 90 for start, end in chunks))
+
+    def test_interrupted_backfill_resumes_next_day(self):
+        # Checkpoints d'un run interrompu, fenêtre décalée d'un jour au run suivant
+        yesterday = list(daterange_chunks(date(2024, 1, 10), date(2024, 12, 31), 90))
+        done = yesterday[:3]
+        today = list(daterange_chunks(date(2024, 1, 11), date(2025, 1, 1), 90))
+        self.assertEqual(today[1:3], done[1:3])
+        todo = [chunk for chunk in today if not BackfillCheckpoint.is_covered(*chunk, done)]
+        self.assertEqual(todo, today[3:])
+
+
+class TickRollupTests(TestCase):
+    def setUp(self):
+        AssetRegistry.invalidate()
+        self.usd = Asset.objects.create(code="USD", label="Dollar US", category="fx")
+        self.day = timezone.now().date() - timedelta(days=1)
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.combine(self.day, time(hour)))
+
+    def tick(self, hour, price, source):
+        return {"asset_code": "USD", "price_mru": Decimal(price), "source": source, "timestamp": self.at(hour)}
+
+    def test_store_ticks_counts_only_inserted_rows(self):
+        ticks = [self.tick(9, "40", "bcm"), self.tick(10, "41", "bcm")]
+        self.assertEqual(DataStore.store_ticks(ticks)["stored"], 2)
+        result = DataStore.store_ticks(ticks + [self.tick(11, "42", "bcm")])
+        self.assertEqual((result["stored"], result["failed"]), (1, 0))
+        self.assertEqual(PriceTick.objects.count(), 3)
+
+    def test_bars_are_built_per_source(self):
+        DataStore.store_ticks([
+            self.tick(9, "40", "bcm"), self.tick(12, "41", "bcm"),
+            self.tick(10, "45", "yahoo"), self.tick(15, "46", "yahoo"),
+        ])
+        BarRollup.run()
+
+        bar = DailyBar.objects.get(asset=self.usd, date=self.day)
+        self.assertEqual(
+            (bar.open, bar.high, bar.low, bar.close, bar.ticks),
+            (Decimal("40"), Decimal("41"), Decimal("40"), Decimal("41"), 2),
+        )
+        closes = dict(PriceObservation.objects.filter(asset=self.usd, date=self.day).values_list("source", "price_mru"))
+        self.assertEqual(closes, {"bcm": Decimal("41"), "yahoo": Decimal("46")})
+        price = Price.objects.get(asset=self.usd, date=self.day)
+        self.assertEqual((price.source, price.price_mru), ("bcm", Decimal("41")))
+
+    def test_failed_closes_keep_the_watermark(self):
+        DataStore.store_ticks([self.tick(9, "40", "bcm")])
+        failure = {"stored": 0, "failed": 1, "total": 1}
+        with mock.patch.object(DataStore, "store_prices_bulk", return_value=failure):
+            self.assertEqual(BarRollup.run()["failed"], 1)
+        self.assertFalse(DailyBar.objects.exists())
+        self.assertIsNone(SyncState.objects.get(name=BarRollup.STATE_NAME).high_water_mark)
+
+        # Passage suivant: le lot est relu et intégré
+        BarRollup.run()
+        self.assertEqual(Price.objects.get(asset=self.usd, date=self.day).price_mru, Decimal("40"))
+
+    def test_late_committed_tick_inside_overlap_is_rolled_up(self):
+        PriceTick.objects.create(id=100, asset=self.usd, ts=self.at(9), price_mru=Decimal("40"), source="bcm")
+        BarRollup.run()
+        # Transaction validée après le passage: identifiant plus petit, insertion dans la marge
+        late = PriceTick.objects.create(id=50, asset=self.usd, ts=self.at(16), price_mru=Decimal("43"), source="bcm")
+        PriceTick.objects.filter(id=late.id).update(created_at=timezone.now() - timedelta(seconds=60))
+        BarRollup.run()
+
+        bar = DailyBar.objects.get(asset=self.usd, date=self.day)
+        self.assertEqual((bar.close, bar.ticks), (Decimal("43"), 2))
+        self.assertEqual(Price.objects.get(asset=self.usd, date=self.day).price_mru, Decimal("43"))
+
+
+class RetrySchedulerDeadlineTests(SimpleTestCase):
+    def test_timed_out_task_stops_before_run_returns(self):
+        calls, outcome = [], []
+
+        def fetch():
+            # Appels réseau successifs: le budget de la tâche borne leur timeout
+            try:
+                while True:
+                    calls.append(request_timeout(10))
+                    clock.sleep(0.02)
+            except DeadlineExceeded as e:
+                outcome.append(e)
+                raise
+
+        task = RetryTask("lent", fetch, deadline=clock.monotonic() + 0.1)
+        RetryScheduler(RetryPolicy(max_attempts=1)).run([task])
+
+        self.assertEqual(task.status, "timeout")
+        self.assertEqual(len(outcome), 1)
+        self.assertTrue(all(timeout <= 0.1 for timeout in calls))
+        self.assertEqual(request_timeout(10), 10)
@@ -36,7 +36,7 @@ class DailyScraperJob:
             # Lancer le sync (optionnel)
             try:
                 from sync.sync_prices import SyncService
-                sync_result = SyncService.sync_prices_to_mongo(days_back=7)
+                sync_result = SyncService.sync_changes()
                 logger.info(f"📊 Sync: {sync_result}")
             except ImportError:
                 logger.warning("⚠️ Sync non disponible (MongoDB non configuré)")
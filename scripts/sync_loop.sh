@@ -11,7 +11,7 @@ while true; do
     echo "⏰ $(date): Exécution de la synchronisation..."
     
     # Sync fenêtre glissante (7 derniers jours)
-    python manage.py sync_prices_to_mongo --days 7 --verify
+    python manage.py sync_prices_to_mongo --verify
     
     # Vérifier la cohérence
     RESULT=$?
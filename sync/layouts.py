@@ -0,0 +1,431 @@
+"""
+Schémas de stockage des prix dans MongoDB
+
+- flat:       un document par (actif, jour) dans `prices` (historique)
+- bucket:     un document par (actif, mois) dans `prices_monthly`, avec un
+              tableau compact de points [{"d": jour, "p": prix}]
+- timeseries: collection time-series native `prices_ts` (actif en metaField)
+
+Toutes les couches exposent la même interface: écriture depuis les lignes
+PostgreSQL, suppression, remplacement de mois entiers et lecture sous forme
+de points à plat {asset_code, asset_label, asset_category, date, price_mru}.
+"""
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+# Schéma cible de la synchronisation
+PRICES_LAYOUT = os.environ.get('MONGO_PRICES_LAYOUT', 'flat')
+
+
+def month_key(day):
+    """Clé de mois "YYYY-MM" d'une date ou d'une chaîne ISO"""
+    return day.isoformat()[:7] if isinstance(day, date) else day[:7]
+
+
+def month_bounds(month):
+    """Premier jour et premier jour du mois suivant d'une clé "YYYY-MM" """
+    year, mon = (int(part) for part in month.split("-"))
+    start = date(year, mon, 1)
+    end = date(year + mon // 12, mon % 12 + 1, 1)
+    return start, end
+
+
+def code_filter(asset_code):
+    """Filtre Mongo sur un code d'actif ou une liste de codes"""
+    if isinstance(asset_code, (list, tuple, set)):
+        return {"$in": list(asset_code)}
+    return asset_code
+
+
+def to_point(row):
+    """Point à plat depuis une ligne Price (.values() avec asset__*)"""
+    return {
+        "asset_code": row["asset__code"],
+        "asset_label": row["asset__label"],
+        "asset_category": row["asset__category"],
+        "date": row["date"].isoformat(),
+        "price_mru": float(row["price_mru"]),
+    }
+
+
+def load_pg_months(keys):
+    """
+    Relit depuis PostgreSQL des mois complets
+
+    Args:
+        keys: Ensemble de (asset_code, "YYYY-MM")
+
+    Returns:
+        dict: {(asset_code, "YYYY-MM"): [points triés par date]} (liste vide
+              si le mois n'a plus de lignes)
+    """
+    from django.db.models import Q
+    from core.models import Price
+
+    months = {key: [] for key in keys}
+    if not keys:
+        return months
+
+    condition = Q()
+    for code, month in keys:
+        start, end = month_bounds(month)
+        condition |= Q(asset__code=code, date__gte=start, date__lt=end)
+
+    rows = Price.objects.filter(condition).order_by("asset__code", "date").values(
+        "date", "price_mru", "asset__code", "asset__label", "asset__category"
+    )
+    for row in rows:
+        months[(row["asset__code"], month_key(row["date"]))].append(to_point(row))
+    return months
+
+
+class MongoLayout(ABC):
+    """Interface commune d'un schéma de stockage"""
+
+    NAME = None
+    COLLECTION = None
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db[self.COLLECTION]
+
+    @abstractmethod
+    def ensure(self):
+        """Crée la collection et ses index si besoin"""
+        pass
+
+    @abstractmethod
+    def upsert_rows(self, rows):
+        """
+        Écrit des lignes Price (.values())
+
+        Returns:
+            tuple: (synced, failed)
+        """
+        pass
+
+    @abstractmethod
+    def remove(self, asset_code, dates):
+        """Supprime des jours d'un actif; retourne le nombre de points supprimés"""
+        pass
+
+    @abstractmethod
+    def replace_months(self, months):
+        """Remplace des mois entiers ({(code, "YYYY-MM"): [points]})"""
+        pass
+
+    @abstractmethod
+    def points_pipeline(self, asset_code=None, start=None, end=None):
+        """
+        Étapes d'agrégation produisant les points à plat (dates ISO incluses)
+
+        Args:
+            asset_code: Code ou liste de codes (None = tous)
+        """
+        pass
+
+    @abstractmethod
+    def count(self):
+        """Nombre de points stockés"""
+        pass
+
+    def read_range(self, asset_code, start=None, end=None):
+        """Points d'un actif sur une plage de dates, triés par date"""
+        pipeline = self.points_pipeline(asset_code, start, end) + [{"$sort": {"date": 1}}]
+        return list(self.collection.aggregate(pipeline))
+
+
+class FlatLayout(MongoLayout):
+    """Un document par (actif, jour)"""
+
+    NAME = "flat"
+    COLLECTION = "prices"
+
+    def ensure(self):
+        # Index unique pour éviter les doublons
+        self.collection.create_index([("asset_code", 1), ("date", 1)], unique=True)
+
+    def _write(self, operations):
+        from pymongo.errors import BulkWriteError
+
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+            return len(operations), 0
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            for error in errors[:5]:
+                logger.error(f"❌ Erreur sync: {error.get('errmsg')}")
+            return len(operations) - len(errors), len(errors)
+
+    def _upserts(self, points):
+        from pymongo import UpdateOne
+
+        synced_at = datetime.utcnow()
+        return [
+            UpdateOne(
+                {"asset_code": point["asset_code"], "date": point["date"]},
+                {"$set": dict(point, synced_at=synced_at)},
+                upsert=True,
+            )
+            for point in points
+        ]
+
+    def upsert_rows(self, rows):
+        if not rows:
+            return 0, 0
+        return self._write(self._upserts(to_point(row) for row in rows))
+
+    def remove(self, asset_code, dates):
+        from pymongo import DeleteOne
+
+        if not dates:
+            return 0
+        result = self.collection.bulk_write(
+            [DeleteOne({"asset_code": asset_code, "date": str(d)}) for d in dates],
+            ordered=False,
+        )
+        return result.deleted_count
+
+    def replace_months(self, months):
+        from pymongo import DeleteMany
+
+        operations = []
+        for (code, month), points in months.items():
+            operations.append(DeleteMany({
+                "asset_code": code,
+                "date": {"$gte": f"{month}-01", "$lte": f"{month}-31",
+                         "$nin": [p["date"] for p in points]},
+            }))
+            operations += self._upserts(points)
+        return self._write(operations)[0] if operations else 0
+
+    def points_pipeline(self, asset_code=None, start=None, end=None):
+        match = {}
+        if asset_code:
+            match["asset_code"] = code_filter(asset_code)
+        if start or end:
+            match["date"] = {}
+            if start:
+                match["date"]["$gte"] = str(start)
+            if end:
+                match["date"]["$lte"] = str(end)
+        return [
+            {"$match": match},
+            {"$project": {"_id": 0, "asset_code": 1, "asset_label": 1,
+                          "asset_category": 1, "date": 1, "price_mru": 1}},
+        ]
+
+    def count(self):
+        return self.collection.estimated_document_count()
+
+
+class MonthlyLayout(MongoLayout):
+    """
+    Schémas réécrits par mois entiers
+
+    Une ligne modifiée ou supprimée entraîne la relecture de son mois
+    complet dans PostgreSQL puis son remplacement côté Mongo.
+    """
+
+    def upsert_rows(self, rows):
+        keys = {(row["asset__code"], month_key(row["date"])) for row in rows}
+        written = self._replace(load_pg_months(keys))
+        failed = sum(1 for row in rows if (row["asset__code"], month_key(row["date"])) not in written)
+        return len(rows) - failed, failed
+
+    def remove(self, asset_code, dates):
+        keys = {(asset_code, month_key(d)) for d in dates}
+        self._replace(load_pg_months(keys))
+        return len(dates)
+
+    def replace_months(self, months):
+        return sum(len(months[key]) for key in self._replace(months))
+
+    @abstractmethod
+    def _replace(self, months):
+        """Remplace les mois; retourne les clés écrites avec succès"""
+        pass
+
+
+class BucketLayout(MonthlyLayout):
+    """Un document par (actif, mois): {_id: "CODE:YYYY-MM", points: [{d, p}]}"""
+
+    NAME = "bucket"
+    COLLECTION = "prices_monthly"
+
+    def ensure(self):
+        self.collection.create_index([("asset_code", 1), ("month", 1)], unique=True)
+
+    def _replace(self, months):
+        from pymongo import DeleteOne, ReplaceOne
+        from pymongo.errors import BulkWriteError
+
+        keys = list(months)
+        synced_at = datetime.utcnow()
+        operations = []
+        for code, month in keys:
+            points = months[(code, month)]
+            doc_id = f"{code}:{month}"
+            if not points:
+                operations.append(DeleteOne({"_id": doc_id}))
+                continue
+            operations.append(ReplaceOne({"_id": doc_id}, {
+                "_id": doc_id,
+                "asset_code": code,
+                "asset_label": points[0]["asset_label"],
+                "asset_category": points[0]["asset_category"],
+                "month": month,
+                "count": len(points),
+                "points": [{"d": int(p["date"][8:10]), "p": p["price_mru"]} for p in points],
+                "synced_at": synced_at,
+            }, upsert=True))
+        if not operations:
+            return set()
+
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+            return set(keys)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            for error in errors[:5]:
+                logger.error(f"❌ Erreur sync: {error.get('errmsg')}")
+            return set(keys) - {keys[error["index"]] for error in errors}
+
+    def points_pipeline(self, asset_code=None, start=None, end=None):
+        match = {}
+        if asset_code:
+            match["asset_code"] = code_filter(asset_code)
+        if start or end:
+            match["month"] = {}
+            if start:
+                match["month"]["$gte"] = month_key(str(start))
+            if end:
+                match["month"]["$lte"] = month_key(str(end))
+
+        day = {"$toString": "$points.d"}
+        pipeline = [
+            {"$match": match},
+            {"$unwind": "$points"},
+            {"$project": {
+                "_id": 0,
+                "asset_code": 1,
+                "asset_label": 1,
+                "asset_category": 1,
+                "date": {"$concat": [
+                    "$month", "-",
+                    {"$cond": [{"$lt": ["$points.d", 10]}, {"$concat": ["0", day]}, day]},
+                ]},
+                "price_mru": "$points.p",
+            }},
+        ]
+        if start or end:
+            dates = {}
+            if start:
+                dates["$gte"] = str(start)
+            if end:
+                dates["$lte"] = str(end)
+            pipeline.append({"$match": {"date": dates}})
+        return pipeline
+
+    def count(self):
+        result = list(self.collection.aggregate([
+            {"$group": {"_id": None, "n": {"$sum": "$count"}}}
+        ]))
+        return result[0]["n"] if result else 0
+
+
+class TimeSeriesLayout(MonthlyLayout):
+    """Collection time-series native: {ts, meta: {asset_*}, price_mru}"""
+
+    NAME = "timeseries"
+    COLLECTION = "prices_ts"
+
+    def ensure(self):
+        if self.COLLECTION not in self.db.list_collection_names():
+            self.db.create_collection(self.COLLECTION, timeseries={
+                "timeField": "ts",
+                "metaField": "meta",
+                "granularity": "hours",
+            })
+            logger.info(f"🆕 Collection time-series {self.COLLECTION} créée")
+        self.collection.create_index([("meta.asset_code", 1), ("ts", 1)])
+
+    def _replace(self, months):
+        """
+        Insère les nouveaux points du mois puis supprime les anciens (par
+        _id): un échec en cours de route laisse l'ancien mois en place,
+        jamais un mois vide (pas de transaction sur une collection
+        time-series)
+        """
+        written = set()
+        for (code, month), points in months.items():
+            start, end = month_bounds(month)
+            try:
+                stale = [doc["_id"] for doc in self.collection.find({
+                    "meta.asset_code": code,
+                    "ts": {"$gte": datetime(start.year, start.month, 1),
+                           "$lt": datetime(end.year, end.month, 1)},
+                }, {"_id": 1})]
+                if points:
+                    self.collection.insert_many([
+                        {
+                            "ts": datetime.fromisoformat(p["date"]),
+                            "meta": {
+                                "asset_code": code,
+                                "asset_label": p["asset_label"],
+                                "asset_category": p["asset_category"],
+                            },
+                            "price_mru": p["price_mru"],
+                        }
+                        for p in points
+                    ], ordered=False)
+                if stale:
+                    self.collection.delete_many({"_id": {"$in": stale}})
+                written.add((code, month))
+            except Exception as e:
+                logger.error(f"❌ Erreur sync {code} {month}: {e}")
+        return written
+
+    def points_pipeline(self, asset_code=None, start=None, end=None):
+        match = {}
+        if asset_code:
+            match["meta.asset_code"] = code_filter(asset_code)
+        if start or end:
+            match["ts"] = {}
+            if start:
+                match["ts"]["$gte"] = datetime.fromisoformat(str(start))
+            if end:
+                match["ts"]["$lt"] = datetime.fromisoformat(str(end)) + timedelta(days=1)
+        return [
+            {"$match": match},
+            {"$project": {
+                "_id": 0,
+                "asset_code": "$meta.asset_code",
+                "asset_label": "$meta.asset_label",
+                "asset_category": "$meta.asset_category",
+                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$ts"}},
+                "price_mru": 1,
+            }},
+        ]
+
+    def count(self):
+        return self.collection.count_documents({})
+
+
+LAYOUTS = {
+    layout.NAME: layout
+    for layout in (FlatLayout, BucketLayout, TimeSeriesLayout)
+}
+
+
+def get_layout(db, name=None):
+    """Instancie le schéma demandé (défaut: MONGO_PRICES_LAYOUT)"""
+    name = name or PRICES_LAYOUT
+    if name not in LAYOUTS:
+        raise ValueError(f"Schéma MongoDB inconnu: {name} (choix: {', '.join(LAYOUTS)})")
+    return LAYOUTS[name](db)
@@ -0,0 +1,65 @@
+"""
+Client MongoDB partagé par le processus
+
+MongoClient gère lui-même un pool de connexions thread-safe: on n'en crée
+qu'un par processus (recréé après un fork) et les workers de
+synchronisation le partagent.
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://mongo:27017')
+MONGO_DB = os.environ.get('MONGO_DB', 'asset_prices')
+MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Retourne le client MongoDB du processus (créé et testé au premier appel)
+
+    Raises:
+        pymongo.errors.PyMongoError: si MongoDB est injoignable à la création
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != pid:
+            from pymongo import MongoClient
+
+            client = MongoClient(
+                MONGO_URL,
+                maxPoolSize=MAX_POOL_SIZE,
+                serverSelectionTimeoutMS=5000,
+            )
+            client.admin.command('ping')
+            logger.info(f"✅ Connexion MongoDB établie: {MONGO_URL} (pool {MAX_POOL_SIZE})")
+            _client, _client_pid = client, pid
+    return _client
+
+
+def get_collection(name='prices'):
+    """Collection de la base des prix"""
+    return get_client()[MONGO_DB][name]
+
+
+def close_client():
+    """Ferme le client du processus (arrêt du worker, tests)"""
+    global _client, _client_pid
+
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+            logger.info("🔌 Connexion MongoDB fermée")
+        _client, _client_pid = None, None
@@ -0,0 +1,137 @@
+"""
+Worker de synchronisation continue PostgreSQL → MongoDB (outbox)
+
+Les écritures de prix déposent des événements (actif, date) dans
+PriceOutbox, dans la même transaction. Le worker les consomme par lots
+(SELECT ... FOR UPDATE SKIP LOCKED: plusieurs workers se partagent la file
+sans se bloquer), relit l'état courant des lignes concernées et l'applique
+au schéma MongoDB. Un lot n'est retiré de l'outbox qu'après écriture Mongo
+réussie; en cas d'erreur la transaction est annulée et le lot rejoué.
+"""
+import logging
+import os
+import signal
+import threading
+from collections import defaultdict
+
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from sync.layouts import get_layout
+from sync.mongo_client import MONGO_DB, get_client
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """Consomme PriceOutbox et réplique les changements vers MongoDB"""
+
+    BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 500))
+    # Attente (s) quand l'outbox est vide, et après une erreur
+    POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 2))
+    ERROR_BACKOFF = 30
+
+    def __init__(self, batch_size=None, poll_interval=None):
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.poll_interval = poll_interval or self.POLL_INTERVAL
+        self.stop_event = threading.Event()
+        self.layout = None
+
+    def _get_layout(self):
+        if self.layout is None:
+            self.layout = get_layout(get_client()[MONGO_DB])
+            self.layout.ensure()
+        return self.layout
+
+    def drain_once(self):
+        """
+        Traite un lot d'événements
+
+        Returns:
+            dict: {"events": int, "synced": int, "deleted": int}
+        """
+        from core.models import Price, PriceOutbox
+
+        layout = self._get_layout()
+
+        with transaction.atomic():
+            events = list(
+                PriceOutbox.objects.select_for_update(skip_locked=True)
+                .order_by("id")[:self.batch_size]
+            )
+            if not events:
+                return {"events": 0, "synced": 0, "deleted": 0}
+
+            # Plusieurs événements d'une même ligne: une seule réplication
+            keys = defaultdict(set)
+            for event in events:
+                keys[event.asset_code].add(event.date)
+
+            condition = Q()
+            for code, dates in keys.items():
+                condition |= Q(asset__code=code, date__in=dates)
+            rows = list(Price.objects.order_by().filter(condition).values(
+                "date", "price_mru", "asset__code", "asset__label", "asset__category"
+            ))
+
+            synced, failed = layout.upsert_rows(rows) if rows else (0, 0)
+            if failed:
+                raise RuntimeError(f"{failed} documents non écrits dans MongoDB")
+
+            # Lignes absentes de PostgreSQL: supprimées depuis l'événement
+            present = defaultdict(set)
+            for row in rows:
+                present[row["asset__code"]].add(row["date"])
+            deleted = 0
+            for code, dates in keys.items():
+                missing = sorted(dates - present[code])
+                if missing:
+                    deleted += layout.remove(code, missing)
+
+            PriceOutbox.objects.filter(id__in=[e.id for e in events]).delete()
+
+        logger.info(f"📤 Outbox: {len(events)} événements → {synced} upserts, {deleted} suppressions")
+        return {"events": len(events), "synced": synced, "deleted": deleted}
+
+    def run(self, once=False):
+        """
+        Boucle principale: draine l'outbox jusqu'à l'arrêt (SIGTERM/SIGINT)
+
+        Args:
+            once: Vider l'outbox puis s'arrêter
+        """
+        self.install_signal_handlers()
+        logger.info(f"🚀 Worker outbox démarré (lots de {self.batch_size})")
+
+        totals = defaultdict(int)
+        while not self.stop_event.is_set():
+            # Connexion PostgreSQL coupée ou trop ancienne: rouverte au lot suivant
+            close_old_connections()
+            try:
+                result = self.drain_once()
+            except Exception as e:
+                logger.error(f"❌ Erreur worker outbox: {e}")
+                close_old_connections()
+                if once:
+                    raise
+                self.layout = None
+                self.stop_event.wait(self.ERROR_BACKOFF)
+                continue
+
+            for key, value in result.items():
+                totals[key] += value
+            if result["events"] < self.batch_size:
+                if once:
+                    break
+                self.stop_event.wait(self.poll_interval)
+
+        logger.info(f"🛑 Worker outbox arrêté: {dict(totals)}")
+        return dict(totals)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def install_signal_handlers(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
@@ -2,10 +2,18 @@
 Service de synchronisation PostgreSQL ↔ MongoDB
 """
 import logging
+from collections import defaultdict
 from datetime import datetime, timedelta
 from django.utils import timezone
 from decimal import Decimal
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+from sync.layouts import get_layout
+from sync.mongo_client import MONGO_DB, get_client
 
 logger = logging.getLogger(__name__)
 
@@ -13,40 +21,131 @@ logger = logging.getLogger(__name__)
 class SyncService:
     """Synchronise les données entre PostgreSQL et MongoDB"""
     
+    # Nombre de documents par bulk_write (et par fetch du curseur PostgreSQL)
+    BATCH_SIZE = int(os.environ.get('MONGO_SYNC_BATCH_SIZE', 1000))
+    # Workers parallèles (un actif par tâche) partageant le pool Mongo
+    WORKERS = int(os.environ.get('MONGO_SYNC_WORKERS', 4))
+    
+    # Point de reprise de la synchronisation incrémentale (SyncState.name)
+    STATE_NAME = "mongo_prices"
+    # Marge (s) relue à chaque run: transactions validées après le run précédent
+    WATERMARK_OVERLAP = int(os.environ.get('MONGO_SYNC_OVERLAP', 300))
+    
     @staticmethod
     def get_mongo_client():
-        """Initialise la connexion MongoDB"""
+        """Client MongoDB partagé du processus (None si indisponible)"""
         try:
-            from pymongo import MongoClient
-            
-            mongo_url = os.environ.get(
-                'MONGO_URL',
-                'mongodb://mongo:27017'
-            )
-            client = MongoClient(mongo_url, serverSelectionTimeoutMS=5000)
-            # Tester la connexion
-            client.admin.command('ping')
-            logger.info(f"✅ Connexion MongoDB établie: {mongo_url}")
-            return client
+            return get_client()
         except Exception as e:
             logger.warning(f"⚠️ MongoDB non disponible: {e}")
             return None
     
     @staticmethod
-    def sync_prices_to_mongo(days_back=7):
+    def _stream_upserts(layout, prices, batch_size):
         """
-        Synchronise les prix de PostgreSQL vers MongoDB
+        Lit un queryset Price en streaming et l'écrit par batchs dans le schéma Mongo
         
-        Args:
-            days_back: Nombre de jours à synchroniser (glissant)
+        Le flux est trié par (actif, date) et un batch n'est coupé qu'entre
+        deux mois: les schémas réécrits par mois entiers (bucket,
+        timeseries) ne relisent et ne réécrivent chaque mois qu'une fois.
         
         Returns:
-            dict: Résultats de la synchronisation
+            tuple: (synced, failed, max_updated_at)
+        """
+        synced = 0
+        failed = 0
+        max_updated_at = None
+        started = time.perf_counter()
+        
+        rows = prices.order_by("asset_id", "date").values(
+            "date", "price_mru", "updated_at",
+            "asset__code", "asset__label", "asset__category"
+        ).iterator(chunk_size=batch_size)
+        
+        batch = []
+        for row in rows:
+            if len(batch) >= batch_size and (
+                (row["asset__code"], row["date"].year, row["date"].month)
+                != (batch[-1]["asset__code"], batch[-1]["date"].year, batch[-1]["date"].month)
+            ):
+                ok, ko = layout.upsert_rows(batch)
+                synced += ok
+                failed += ko
+                batch = []
+                logger.info(
+                    f"  {synced} documents ({synced / (time.perf_counter() - started):.0f} docs/s)"
+                )
+            batch.append(row)
+            if max_updated_at is None or row["updated_at"] > max_updated_at:
+                max_updated_at = row["updated_at"]
+        if batch:
+            ok, ko = layout.upsert_rows(batch)
+            synced += ok
+            failed += ko
+        
+        return synced, failed, max_updated_at
+    
+    @staticmethod
+    def _parallel_upserts(layout, prices, batch_size, workers):
         """
-        from core.models import Price, Asset
+        Répartit la synchronisation d'un queryset par actif sur un pool de threads
+        
+        Chaque worker a sa propre connexion PostgreSQL (fermée en fin de
+        tâche) et partage le pool de connexions du client Mongo.
         
+        Returns:
+            tuple: (synced, failed, max_updated_at)
+        """
+        asset_ids = list(
+            prices.order_by().values_list("asset_id", flat=True).distinct()
+        )
+        if workers <= 1 or len(asset_ids) <= 1:
+            return SyncService._stream_upserts(layout, prices, batch_size)
+        
+        def sync_asset(asset_id):
+            try:
+                return SyncService._stream_upserts(
+                    layout, prices.filter(asset_id=asset_id), batch_size
+                )
+            finally:
+                connection.close()
+        
+        logger.info(f"🧵 {len(asset_ids)} actifs répartis sur {min(workers, len(asset_ids))} workers")
+        with ThreadPoolExecutor(max_workers=min(workers, len(asset_ids))) as executor:
+            results = list(executor.map(sync_asset, asset_ids))
+        
+        marks = [r[2] for r in results if r[2] is not None]
+        return (
+            sum(r[0] for r in results),
+            sum(r[1] for r in results),
+            max(marks) if marks else None,
+        )
+    
+    @staticmethod
+    def _get_state():
+        from core.models import SyncState
+        
+        state, _ = SyncState.objects.get_or_create(name=SyncService.STATE_NAME)
+        return state
+    
+    @staticmethod
+    def _save_watermark(state, high_water_mark):
+        state.last_run_at = timezone.now()
+        if high_water_mark is not None:
+            state.high_water_mark = high_water_mark
+        state.save()
+    
+    @staticmethod
+    def _run(mode, sync_func):
+        """
+        Enveloppe commune: connexion, index, stats, journalisation
+        
+        Args:
+            mode: Libellé du mode (window, full, incremental)
+            sync_func: Fonction (layout) -> dict partiel de résultats
+        """
         logger.info("=" * 60)
-        logger.info("📊 Démarrage synchronisation PostgreSQL → MongoDB")
+        logger.info(f"📊 Démarrage synchronisation PostgreSQL → MongoDB ({mode})")
         logger.info(f"⏰ Timestamp: {datetime.now().isoformat()}")
         logger.info("=" * 60)
         
@@ -60,90 +159,167 @@ class SyncService:
                 "failed": 0,
             }
         
+        started = time.perf_counter()
+        result = {"synced": 0, "failed": 0, "deleted": 0}
+        
         try:
-            db = client['asset_prices']
-            collection = db['prices']
+            layout = get_layout(client[MONGO_DB])
+            layout.ensure()
+            logger.info(f"🗂️  Schéma MongoDB: {layout.NAME} ({layout.COLLECTION})")
             
-            # Ajouter un index unique pour éviter les doublons
-            collection.create_index([("asset_code", 1), ("date", 1)], unique=True)
+            result.update(sync_func(layout))
             
-            # Récupérer les prix des N derniers jours
-            cutoff_date = timezone.now().date() - timedelta(days=days_back)
-            prices = Price.objects.filter(
-                date__gte=cutoff_date
-            ).select_related('asset').order_by('-date')
-            
-            synced = 0
-            failed = 0
-            
-            logger.info(f"📥 Synchronisation de {prices.count()} prix depuis {cutoff_date}...")
-            
-            for price in prices:
-                try:
-                    document = {
-                        "asset_code": price.asset.code,
-                        "asset_label": price.asset.label,
-                        "asset_category": price.asset.category,
-                        "date": price.date.isoformat(),
-                        "price_mru": float(price.price_mru),
-                        "synced_at": datetime.utcnow(),
-                    }
-                    
-                    # Upsert: mettre à jour si existe, créer sinon
-                    result = collection.update_one(
-                        {"asset_code": price.asset.code, "date": price.date.isoformat()},
-                        {"$set": document},
-                        upsert=True
-                    )
-                    
-                    synced += 1
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erreur sync {price.asset.code}/{price.date}: {e}")
-                    failed += 1
-                    continue
+            elapsed = time.perf_counter() - started
+            throughput = result["synced"] / elapsed if elapsed > 0 else 0
             
             # Récupérer les stats
-            total_in_mongo = collection.count_documents({})
+            total_in_mongo = layout.count()
             
             logger.info("\n" + "=" * 60)
             logger.info("📊 RÉSUMÉ SYNCHRONISATION")
             logger.info("=" * 60)
-            logger.info(f"✅ Documents synchronisés: {synced}")
-            logger.info(f"❌ Documents échoués: {failed}")
+            logger.info(f"✅ Documents synchronisés: {result['synced']}")
+            logger.info(f"🗑️  Documents supprimés: {result['deleted']}")
+            logger.info(f"❌ Documents échoués: {result['failed']}")
+            logger.info(f"⚡ Débit: {throughput:.0f} docs/s ({elapsed:.2f}s)")
             logger.info(f"📦 Total dans MongoDB: {total_in_mongo}")
             logger.info("=" * 60)
             
-            return {
+            result.update({
                 "success": True,
-                "synced": synced,
-                "failed": failed,
+                "mode": mode,
+                "layout": layout.NAME,
                 "total_in_mongo": total_in_mongo,
+                "elapsed": round(elapsed, 2),
+                "throughput": round(throughput, 1),
                 "timestamp": datetime.now().isoformat(),
-            }
+            })
+            return result
         
         except Exception as e:
             logger.error(f"❌ Erreur synchronisation: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "synced": synced,
-                "failed": failed,
-            }
+            result.update({"success": False, "error": str(e)})
+            return result
         
-        finally:
-            client.close()
-            logger.info("🔌 Connexion MongoDB fermée")
     
     @staticmethod
-    def verify_consistency():
+    def sync_prices_to_mongo(days_back=7, batch_size=None, workers=None):
+        """
+        Synchronise les prix de PostgreSQL vers MongoDB
+        
+        Les lignes sont lues en streaming (curseur serveur) et envoyées par
+        batchs bulk_write: la mémoire reste constante quel que soit le volume.
+        Une synchronisation complète réussie avance aussi le high-water mark.
+        
+        Args:
+            days_back: Nombre de jours à synchroniser (glissant), None = tout
+            batch_size: Taille des batchs (défaut: MONGO_SYNC_BATCH_SIZE)
+            workers: Workers parallèles par actif (défaut: MONGO_SYNC_WORKERS)
+        
+        Returns:
+            dict: Résultats de la synchronisation
+        """
+        from core.models import Price
+        
+        batch_size = batch_size or SyncService.BATCH_SIZE
+        workers = workers or SyncService.WORKERS
+        
+        def sync(layout):
+            prices = Price.objects.all()
+            if days_back is not None:
+                cutoff_date = timezone.now().date() - timedelta(days=days_back)
+                prices = prices.filter(date__gte=cutoff_date)
+                logger.info(f"📥 Synchronisation des prix depuis {cutoff_date}...")
+            else:
+                state = SyncService._get_state()
+                logger.info("📥 Synchronisation de tout l'historique...")
+            
+            synced, failed, max_updated_at = SyncService._parallel_upserts(
+                layout, prices, batch_size, workers
+            )
+            if days_back is None and failed == 0:
+                SyncService._save_watermark(state, max_updated_at)
+            return {"synced": synced, "failed": failed}
+        
+        return SyncService._run("full" if days_back is None else "window", sync)
+    
+    @staticmethod
+    def sync_changes(batch_size=None, workers=None):
+        """
+        Synchronisation incrémentale (CDC) pilotée par un high-water mark
+        
+        Envoie uniquement les prix dont updated_at dépasse le dernier point
+        de reprise, puis propage les suppressions (PriceDeletion). Le point
+        de reprise n'avance que si toute la synchronisation a réussi; une
+        marge (WATERMARK_OVERLAP) couvre les transactions validées en retard.
+        
+        Returns:
+            dict: Résultats de la synchronisation
+        """
+        from core.models import Price, PriceDeletion
+        
+        batch_size = batch_size or SyncService.BATCH_SIZE
+        workers = workers or SyncService.WORKERS
+        
+        def sync(layout):
+            state = SyncService._get_state()
+            since = None
+            if state.high_water_mark is not None:
+                since = state.high_water_mark - timedelta(seconds=SyncService.WATERMARK_OVERLAP)
+            logger.info(f"📥 Changements depuis: {since or 'début'}")
+            
+            # 1. Suppressions d'abord: une ligne recréée depuis sera ré-upsertée
+            deleted = 0
+            failed = 0
+            max_deleted_at = None
+            deletions = PriceDeletion.objects.order_by("deleted_at")
+            if since is not None:
+                deletions = deletions.filter(deleted_at__gt=since)
+            
+            pending = defaultdict(list)
+            for tombstone in deletions.iterator(chunk_size=batch_size):
+                pending[tombstone.asset_code].append(tombstone.date)
+                max_deleted_at = tombstone.deleted_at
+            for asset_code, dates in pending.items():
+                deleted += layout.remove(asset_code, dates)
+            
+            # 2. Lignes créées ou modifiées
+            prices = Price.objects.all()
+            if since is not None:
+                prices = prices.filter(updated_at__gt=since)
+            synced, failed, max_updated_at = SyncService._parallel_upserts(
+                layout, prices, batch_size, workers
+            )
+            
+            if failed == 0:
+                marks = [m for m in (max_updated_at, max_deleted_at) if m is not None]
+                SyncService._save_watermark(state, max(marks) if marks else None)
+                # Purger les traces déjà propagées (au-delà de la marge)
+                if state.high_water_mark is not None:
+                    PriceDeletion.objects.filter(
+                        deleted_at__lt=state.high_water_mark
+                        - timedelta(seconds=SyncService.WATERMARK_OVERLAP)
+                    ).delete()
+            
+            return {"synced": synced, "failed": failed, "deleted": deleted}
+        
+        return SyncService._run("incremental", sync)
+    
+    @staticmethod
+    def verify_consistency(repair=False):
         """
         Vérifie la cohérence entre PostgreSQL et MongoDB
         
+        Compare des empreintes par (actif, année) puis (actif, mois) et ne
+        descend ligne à ligne que dans les mois en écart (voir sync.verify).
+        
+        Args:
+            repair: Réécrire/supprimer les documents en écart
+        
         Returns:
             dict: Résultats de vérification
         """
-        from core.models import Price
+        from sync.verify import RangeVerifier
         
         logger.info("🔍 Vérification de la cohérence...")
         
@@ -153,35 +329,22 @@ class SyncService:
             return {"success": False}
         
         try:
-            db = client['asset_prices']
-            collection = db['prices']
-            
-            pg_count = Price.objects.count()
-            mongo_count = collection.count_documents({})
+            result = RangeVerifier(get_layout(client[MONGO_DB])).run(repair=repair)
             
-            logger.info(f"📊 PostgreSQL: {pg_count} prix")
-            logger.info(f"📊 MongoDB: {mongo_count} prix")
+            logger.info(f"📊 PostgreSQL: {result['pg_count']} prix")
+            logger.info(f"📊 MongoDB: {result['mongo_count']} prix")
             
-            if pg_count == mongo_count:
+            if result["consistent"]:
                 logger.info("✅ Cohérence OK")
-                return {
-                    "success": True,
-                    "pg_count": pg_count,
-                    "mongo_count": mongo_count,
-                    "consistent": True,
-                }
             else:
-                logger.warning(f"⚠️ Incohérence: {pg_count} vs {mongo_count}")
-                return {
-                    "success": True,
-                    "pg_count": pg_count,
-                    "mongo_count": mongo_count,
-                    "consistent": False,
-                }
+                logger.warning(
+                    f"⚠️ Incohérence dans {len(result['buckets'])} mois: "
+                    f"{', '.join(result['buckets'][:10])}"
+                )
+            
+            result["success"] = True
+            return result
         
         except Exception as e:
             logger.error(f"❌ Erreur vérification: {e}")
             return {"success": False, "error": str(e)}
-        
-        finally:
-            client.close()
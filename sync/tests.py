@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core.models import Asset, Price
+from core.registry import AssetRegistry
+from sync.sync_prices import SyncService
+
+
+class RecordingLayout:
+    """Schéma factice: enregistre les batchs reçus"""
+
+    def __init__(self):
+        self.batches = []
+
+    def upsert_rows(self, rows):
+        self.batches.append(list(rows))
+        return len(rows), 0
+
+
+class StreamUpsertsTests(TestCase):
+    def test_each_month_is_written_by_a_single_batch(self):
+        AssetRegistry.invalidate()
+        for code in ("USD", "EUR"):
+            asset = Asset.objects.create(code=code, label=code, category="fx")
+            for offset in range(70):
+                Price.objects.create(
+                    asset=asset, date=date(2024, 1, 1) + timedelta(days=offset),
+                    price_mru=Decimal("40"), source="bcm",
+                )
+
+        layout = RecordingLayout()
+        synced, failed, _ = SyncService._stream_upserts(layout, Price.objects.all(), batch_size=10)
+
+        self.assertEqual((synced, failed), (140, 0))
+        months = [
+            {(row["asset__code"], row["date"].year, row["date"].month) for row in batch}
+            for batch in layout.batches
+        ]
+        written = [month for batch in months for month in batch]
+        self.assertEqual(len(written), len(set(written)))
@@ -0,0 +1,201 @@
+"""
+Vérification PostgreSQL ↔ MongoDB par empreintes de plages
+
+Chaque plage (actif, année) puis (actif, mois) est résumée des deux côtés
+par une empreinte (nombre de lignes, somme des prix, somme des prix
+pondérés par la position du jour dans l'année), calculée par agrégat SQL et par pipeline Mongo.
+On ne descend que dans les plages divergentes: seuls les mois en écart
+sont comparés ligne à ligne, puis réparés.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import BigIntegerField, Count, F, Sum
+from django.db.models.functions import Cast, ExtractDay, ExtractMonth, ExtractYear, Round
+
+from sync.layouts import month_bounds
+
+logger = logging.getLogger(__name__)
+
+
+# Les prix ont 4 décimales: on compare des entiers (prix × 10^4)
+PRICE_SCALE = 10000
+
+
+def _scaled(price):
+    return int(round(float(price) * PRICE_SCALE))
+
+
+class RangeVerifier:
+    """Compare et répare les prix Mongo (quel que soit le schéma) par plages"""
+
+    def __init__(self, layout):
+        self.layout = layout
+
+    # --- Empreintes ---------------------------------------------------------
+
+    @staticmethod
+    def pg_digests(by_month=False, asset_code=None, year=None):
+        """
+        Empreintes PostgreSQL par (actif, année) ou (actif, mois)
+
+        Returns:
+            dict: {(code, "YYYY"[-MM]): (count, sum, weighted_sum)}
+        """
+        from core.models import Price
+
+        scaled = Cast(Round(F("price_mru") * PRICE_SCALE), BigIntegerField())
+        weight = ExtractMonth("date") * 32 + ExtractDay("date")
+
+        prices = Price.objects.order_by()
+        if asset_code:
+            prices = prices.filter(asset__code=asset_code)
+        if year:
+            prices = prices.filter(date__year=year)
+
+        group = ["asset__code", "year"] + (["month"] if by_month else [])
+        rows = prices.annotate(
+            year=ExtractYear("date"), month=ExtractMonth("date")
+        ).values(*group).annotate(
+            n=Count("id"), s=Sum(scaled), w=Sum(scaled * weight)
+        )
+
+        digests = {}
+        for row in rows:
+            bucket = f"{row['year']:04d}"
+            if by_month:
+                bucket += f"-{row['month']:02d}"
+            digests[(row["asset__code"], bucket)] = (row["n"], int(row["s"]), int(row["w"]))
+        return digests
+
+    def mongo_digests(self, by_month=False, asset_code=None, year=None):
+        """Empreintes MongoDB équivalentes (pipeline d'agrégation)"""
+        start = end = None
+        if year:
+            start, end = f"{year:04d}-01-01", f"{year:04d}-12-31"
+
+        key = {"code": "$asset_code", "y": "$y"}
+        if by_month:
+            key["m"] = "$m"
+
+        pipeline = self.layout.points_pipeline(asset_code, start, end) + [
+            {"$project": {
+                "asset_code": 1,
+                "y": {"$toInt": {"$substrCP": ["$date", 0, 4]}},
+                "m": {"$toInt": {"$substrCP": ["$date", 5, 2]}},
+                "d": {"$toInt": {"$substrCP": ["$date", 8, 2]}},
+                "p": {"$toLong": {"$round": [{"$multiply": ["$price_mru", PRICE_SCALE]}, 0]}},
+            }},
+            {"$group": {
+                "_id": key,
+                "n": {"$sum": 1},
+                "s": {"$sum": "$p"},
+                "w": {"$sum": {"$multiply": ["$p", {"$add": [{"$multiply": ["$m", 32]}, "$d"]}]}},
+            }},
+        ]
+
+        digests = {}
+        for doc in self.layout.collection.aggregate(pipeline, allowDiskUse=True):
+            bucket = f"{doc['_id']['y']:04d}"
+            if by_month:
+                bucket += f"-{doc['_id']['m']:02d}"
+            digests[(doc["_id"]["code"], bucket)] = (doc["n"], int(doc["s"]), int(doc["w"]))
+        return digests
+
+    @staticmethod
+    def _mismatches(pg, mongo):
+        return sorted(k for k in set(pg) | set(mongo) if pg.get(k) != mongo.get(k))
+
+    # --- Lignes --------------------------------------------------------------
+
+    def diff_month(self, asset_code, month):
+        """
+        Compare ligne à ligne un mois d'un actif
+
+        Returns:
+            dict: {"missing": [dates], "extra": [dates], "different": [dates]}
+        """
+        from core.models import Price
+
+        start, end = month_bounds(month)
+        pg = {
+            day.isoformat(): _scaled(price)
+            for day, price in Price.objects.order_by().filter(
+                asset__code=asset_code, date__gte=start, date__lt=end
+            ).values_list("date", "price_mru")
+        }
+        mongo = {
+            doc["date"]: _scaled(doc["price_mru"])
+            for doc in self.layout.read_range(asset_code, start, end - timedelta(days=1))
+        }
+        return {
+            "missing": sorted(set(pg) - set(mongo)),
+            "extra": sorted(set(mongo) - set(pg)),
+            "different": sorted(d for d in set(pg) & set(mongo) if pg[d] != mongo[d]),
+        }
+
+    def repair(self, asset_code, diff):
+        """Réécrit les lignes manquantes/différentes et supprime les orphelines"""
+        from core.models import Price
+
+        upserts = diff["missing"] + diff["different"]
+        repaired = 0
+        if upserts:
+            rows = list(Price.objects.order_by().filter(
+                asset__code=asset_code, date__in=upserts
+            ).values("date", "price_mru", "asset__code", "asset__label", "asset__category"))
+            repaired += self.layout.upsert_rows(rows)[0]
+        if diff["extra"]:
+            repaired += self.layout.remove(asset_code, diff["extra"])
+        return repaired
+
+    # --- Descente hiérarchique ----------------------------------------------
+
+    def run(self, repair=False):
+        """
+        Vérifie toutes les plages et descend dans celles qui divergent
+
+        Returns:
+            dict: pg_count, mongo_count, consistent, buckets (mois en écart),
+                  rows (écarts par type), repaired
+        """
+        pg_years = self.pg_digests()
+        mongo_years = self.mongo_digests()
+        pg_count = sum(d[0] for d in pg_years.values())
+        mongo_count = sum(d[0] for d in mongo_years.values())
+
+        bad_years = self._mismatches(pg_years, mongo_years)
+        logger.info(f"🔍 {len(bad_years)}/{len(set(pg_years) | set(mongo_years))} plages (actif, année) en écart")
+
+        bad_months = []
+        for code, year in bad_years:
+            pg_months = self.pg_digests(by_month=True, asset_code=code, year=int(year))
+            mongo_months = self.mongo_digests(by_month=True, asset_code=code, year=int(year))
+            bad_months += self._mismatches(pg_months, mongo_months)
+
+        rows = defaultdict(int)
+        repaired = 0
+        for code, month in bad_months:
+            diff = self.diff_month(code, month)
+            for kind, dates in diff.items():
+                rows[kind] += len(dates)
+            logger.warning(
+                f"⚠️ {code} {month}: {len(diff['missing'])} manquants, "
+                f"{len(diff['extra'])} en trop, {len(diff['different'])} différents"
+            )
+            if repair:
+                repaired += self.repair(code, diff)
+
+        if repair and bad_months:
+            logger.info(f"🔧 {repaired} documents réparés dans {len(bad_months)} mois")
+
+        return {
+            "pg_count": pg_count,
+            "mongo_count": mongo_count,
+            "consistent": not bad_months,
+            "buckets": [f"{code}:{month}" for code, month in bad_months],
+            "rows": dict(rows),
+            "repaired": repaired,
+            "checked_at": datetime.now().isoformat(),
+        }